@@ -0,0 +1,189 @@
+"""Keyset ("seek") pagination shared by the listing catalogue and the inbox.
+
+Apps subclass `KeysetPagination` to set their page size; the cursor format
+and seek logic live here so no app depends on another's pagination module.
+"""
+import datetime
+import json
+from base64 import b64decode, b64encode
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def estimate_count(queryset) -> int:
+    """Cheap row-count estimate for a queryset.
+
+    On Postgres we ask the planner (EXPLAIN) instead of running COUNT(*); other
+    backends (SQLite in dev/tests) fall back to an exact count.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return queryset.count()
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cur:
+        cur.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cur.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class _CursorEncoder(DjangoJSONEncoder):
+    """Keeps full microsecond precision for datetime keys (DjangoJSONEncoder truncates to ms)."""
+
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+class KeysetPagination(BasePagination):
+    """Keyset ("seek") pagination over the queryset's active ordering.
+
+    The cursor carries the sort-key values of the boundary row, so each page is a
+    single indexed range scan (`WHERE (key) > (last key) ... LIMIT n`) no matter
+    how deep the client has scrolled. `id` is appended as a tiebreaker when the
+    ordering does not already contain it.
+
+    Counting is opt-in via `?count=exact|estimate`; by default no COUNT(*) runs.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count = self.get_count(queryset, request)
+        rows = list(self.get_page_queryset(queryset, request))
+        cursor = self.cursor
+        reverse = bool(cursor and cursor['r'])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = cursor is not None
+        self.page = rows
+        return rows
+
+    def get_page_queryset(self, queryset, request):
+        """The unevaluated slice a page reads: its rows plus one lookahead row for `next`.
+
+        Also usable on its own, e.g. to build a validator from just the rows a
+        request would render.
+        """
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(queryset)
+        queryset = queryset.order_by(*self.ordering)
+
+        self.cursor = self.decode_cursor(request)
+        reverse = bool(self.cursor and self.cursor['r'])
+        if self.cursor:
+            queryset = queryset.filter(self._seek_filter(self.cursor['v'], reverse))
+        if reverse:
+            queryset = queryset.order_by(*[self._invert(o) for o in self.ordering])
+        return queryset[:self.page_size + 1]
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'count': self.count,
+            'results': data,
+        })
+
+    def get_page_size(self, request):
+        try:
+            return _positive_int(
+                request.query_params[self.page_size_query_param],
+                strict=True,
+                cutoff=self.max_page_size,
+            )
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def get_ordering(self, queryset):
+        ordering = [o for o in queryset.query.order_by if isinstance(o, str)]
+        if not ordering:
+            ordering = [o for o in (queryset.model._meta.ordering or []) if isinstance(o, str)]
+        if not any(o.lstrip('-') in ('id', 'pk') for o in ordering):
+            ordering.append('id')
+        return ordering
+
+    def get_count(self, queryset, request):
+        mode = request.query_params.get(self.count_query_param)
+        if mode == 'exact':
+            return queryset.count()
+        if mode == 'estimate':
+            return estimate_count(queryset)
+        return None
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self._link(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            # Seeked past the end; step back to the first page.
+            return remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+        return self._link(self.page[0], reverse=True)
+
+    # --- cursor helpers ---
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            padded = encoded + '=' * (-len(encoded) % 4)
+            payload = json.loads(b64decode(padded.encode('ascii'), altchars=b'-_').decode('utf-8'))
+            values = payload['v']
+            reverse = bool(payload.get('r'))
+            ordering = payload['o']
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+        # A cursor is only valid for the sort it was issued under
+        if ordering != self.ordering or not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return {'v': values, 'r': reverse}
+
+    def encode_cursor(self, row, reverse):
+        values = [getattr(row, o.lstrip('-')) for o in self.ordering]
+        payload = json.dumps({'o': self.ordering, 'v': values, 'r': int(reverse)}, cls=_CursorEncoder, separators=(',', ':'))
+        return b64encode(payload.encode('utf-8'), altchars=b'-_').decode('ascii').rstrip('=')
+
+    def _link(self, row, reverse):
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(row, reverse))
+
+    def _seek_filter(self, values, reverse):
+        # Lexicographic "row comes after the cursor" condition, expanded so mixed
+        # ASC/DESC keys work on every backend:
+        #   k1 > v1 OR (k1 = v1 AND k2 > v2) OR ...
+        cond = Q()
+        equal = {}
+        for order, value in zip(self.ordering, values):
+            field = order.lstrip('-')
+            descending = order.startswith('-')
+            lookup = 'lt' if descending != reverse else 'gt'
+            cond |= Q(**equal, **{f'{field}__{lookup}': value})
+            equal[field] = value
+        return cond
+
+    @staticmethod
+    def _invert(order):
+        return order[1:] if order.startswith('-') else f'-{order}'
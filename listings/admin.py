@@ -1,6 +1,6 @@
 from django.contrib import admin
-from .models import Category, Listing
+from .models import Category, ImageAsset, Listing
 
 admin.site.register(Category)
 admin.site.register(Listing)
-
+admin.site.register(ImageAsset)
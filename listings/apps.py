@@ -1,7 +1,7 @@
 from django.apps import AppConfig
 from django.core.cache import cache
 
-from django.db.models.signals import post_save, post_delete
+from django.db.models.signals import post_save, post_delete, pre_save
 from django.dispatch import receiver
 
 
@@ -10,12 +10,51 @@ class ListingsConfig(AppConfig):
     name = "listings"
 
     def ready(self):  # pragma: no cover
-        from .models import Category, Listing
+        from .models import Category, Listing, ListingAvailability
 
         @receiver([post_save, post_delete], sender=Category)
         def _invalidate_categories_cache(*args, **kwargs):
             cache.clear()  # conservative: clear all; can be refined to specific keys
 
+        @receiver(pre_save, sender=Listing)
+        def _remember_listing_category(sender, instance, raw=False, **kwargs):
+            # A category move must invalidate the old category's pages too
+            instance._previous_category_id = None
+            if instance.pk and not raw:
+                instance._previous_category_id = (
+                    Listing.objects.filter(pk=instance.pk).values_list('category_id', flat=True).first()
+                )
+
         @receiver([post_save, post_delete], sender=Listing)
-        def _invalidate_listings_cache(*args, **kwargs):
-            cache.clear()
+        def _invalidate_listing_pages(sender, instance, **kwargs):
+            from .result_cache import bump_for_category_ids
+            bump_for_category_ids([instance.category_id, getattr(instance, '_previous_category_id', None)])
+
+        @receiver([post_save, post_delete], sender=ListingAvailability)
+        def _invalidate_availability_pages(sender, instance, **kwargs):
+            # Pages filtered by availableFrom/availableTo depend on bookings
+            from .result_cache import bump_for_category_ids
+            bump_for_category_ids(Listing.objects.filter(pk=instance.listing_id).values_list('category_id', flat=True))
+
+        @receiver(post_save, sender='users.UserProfile')
+        def _invalidate_provider_listing_pages(sender, instance, created, **kwargs):
+            # Cached pages embed provider profile fields (name, city, roles)
+            if created:
+                return
+            from .result_cache import bump_for_provider
+            bump_for_provider(instance.user_id)
+
+        @receiver(post_save, sender='users.UserProfile')
+        def _sync_listing_cities(sender, instance, created, update_fields=None, **kwargs):
+            # Listings fall back to the provider's profile city; keep the derived column in step
+            if created or (update_fields is not None and 'city' not in update_fields):
+                return
+            from .cities import refresh_provider_cities
+            refresh_provider_cities(instance.user_id, instance.city)
+
+        @receiver(post_save, sender='users.UserProfile')
+        def _sync_listing_provider_tokens(sender, instance, created, update_fields=None, **kwargs):
+            if created or (update_fields is not None and 'provider_subchoice_tokens' not in update_fields):
+                return
+            from .provider_tokens import refresh_provider_tokens
+            refresh_provider_tokens(instance.user_id, instance.provider_subchoice_tokens)
@@ -0,0 +1,234 @@
+"""Range-based listing availability.
+
+Bookings are closed date ranges (`start_date`..`end_date`, both inclusive).
+Internally everything is a half-open `(start, end)` pair so adjacent bookings
+merge and lengths are plain subtraction. Calendars are answered with range
+arithmetic over the merged bookings of a window, never by expanding days.
+
+On Postgres the table also carries an exclusion constraint over
+`daterange(start_date, end_date, '[]')` (migration 0014), which both enforces
+no-overlap and provides the GiST range index used by availability search.
+"""
+import base64
+from datetime import date, timedelta
+
+from django.db import connections
+from django.db.models import Count, Exists, F, FilteredRelation, Func, Max, OuterRef, Q, Sum, Value
+from django.utils.dateparse import parse_date
+
+ONE_DAY = timedelta(days=1)
+MAX_MONTHS = 12
+OVERLAP_MESSAGE = 'Overlapping booking exists for this listing'
+# Name of the Postgres exclusion constraint (see migration 0014)
+EXCLUSION_CONSTRAINT = 'listing_avail_no_overlap'
+
+
+def active_statuses():
+    from .models import ListingAvailability
+    return (ListingAvailability.STATUS_TENTATIVE, ListingAvailability.STATUS_CONFIRMED)
+
+
+def enforced_by_database(using: str = 'default') -> bool:
+    return connections[using].vendor == 'postgresql'
+
+
+def add_months(day: date, months: int) -> date:
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def parse_month(value, default: date) -> date:
+    """First day of `YYYY-MM`, or of `default`'s month when missing/invalid."""
+    try:
+        year, month = map(int, str(value).split('-'))
+        return date(year, month, 1)
+    except (TypeError, ValueError):
+        return date(default.year, default.month, 1)
+
+
+def month_window(first_day: date, months: int = 1) -> tuple[date, date]:
+    """Half-open window covering `months` whole months from `first_day`."""
+    return first_day, add_months(first_day, max(1, min(int(months), MAX_MONTHS)))
+
+
+def merge_ranges(ranges) -> list[tuple[date, date]]:
+    """Sort and coalesce half-open ranges (overlapping or touching ones become one)."""
+    merged: list[tuple[date, date]] = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def booked_ranges(listing_ids, start: date, end: date, using: str = 'default') -> dict[int, list[tuple[date, date]]]:
+    """Merged active bookings per listing, clipped to the half-open window, in one query."""
+    from .models import ListingAvailability
+    rows = (
+        ListingAvailability.objects.using(using)
+        .filter(
+            listing_id__in=list(listing_ids),
+            status__in=active_statuses(),
+            start_date__lt=end,
+            end_date__gte=start,
+        )
+        .order_by('listing_id', 'start_date')
+        .values_list('listing_id', 'start_date', 'end_date')
+    )
+    per_listing: dict[int, list[tuple[date, date]]] = {}
+    for listing_id, booked_from, booked_to in rows:
+        per_listing.setdefault(listing_id, []).append((max(booked_from, start), min(booked_to + ONE_DAY, end)))
+    return {listing_id: merge_ranges(ranges) for listing_id, ranges in per_listing.items()}
+
+
+def is_range_free(listing_id, start: date, end: date, exclude_pk=None, using: str = 'default') -> bool:
+    """True when no active booking of the listing touches `start`..`end` (inclusive)."""
+    from .models import ListingAvailability
+    qs = ListingAvailability.objects.using(using).filter(
+        listing_id=listing_id,
+        status__in=active_statuses(),
+        start_date__lte=end,
+        end_date__gte=start,
+    )
+    if exclude_pk:
+        qs = qs.exclude(pk=exclude_pk)
+    return not qs.exists()
+
+
+class Calendar:
+    """Booked/free view of one listing over a half-open window."""
+
+    def __init__(self, start: date, end: date, booked=()):
+        self.start = start
+        self.end = end
+        self.booked = merge_ranges(booked)
+
+    @classmethod
+    def for_listing(cls, listing_id, start: date, end: date):
+        return cls(start, end, booked_ranges([listing_id], start, end).get(listing_id, []))
+
+    def free_ranges(self) -> list[tuple[date, date]]:
+        free, cursor = [], self.start
+        for booked_from, booked_to in self.booked:
+            if booked_from > cursor:
+                free.append((cursor, booked_from))
+            cursor = max(cursor, booked_to)
+        if cursor < self.end:
+            free.append((cursor, self.end))
+        return free
+
+    def booked_day_count(self) -> int:
+        return sum((end - start).days for start, end in self.booked)
+
+    def free_day_count(self) -> int:
+        return (self.end - self.start).days - self.booked_day_count()
+
+    def is_free(self, start: date, end: date) -> bool:
+        """`start`..`end` inclusive, within the window."""
+        stop = end + ONE_DAY
+        return not any(b_from < stop and start < b_to for b_from, b_to in self.booked)
+
+    def first_free(self, nights: int = 1, after: date | None = None):
+        """First date from which `nights` consecutive days are free, or None within the window."""
+        span = timedelta(days=max(1, nights))
+        floor = max(after or self.start, self.start)
+        for free_from, free_to in self.free_ranges():
+            begin = max(free_from, floor)
+            if free_to - begin >= span:
+                return begin
+        return None
+
+    def booked_days(self) -> list[str]:
+        return [
+            (start + timedelta(days=i)).isoformat()
+            for start, end in self.booked
+            for i in range((end - start).days)
+        ]
+
+
+def as_inclusive(ranges) -> list[list[str]]:
+    """Half-open ranges as inclusive `[first, last]` ISO pairs for API payloads."""
+    return [[start.isoformat(), (end - ONE_DAY).isoformat()] for start, end in ranges]
+
+
+def _daterange(lower, upper):
+    from django.contrib.postgres.fields import DateRangeField
+    return Func(lower, upper, Value('[]'), function='daterange', output_field=DateRangeField())
+
+
+def overlapping_bookings(start: date, end: date, using: str = 'default'):
+    """Active bookings touching `start`..`end` (inclusive) of the outer listing, for Exists()."""
+    from .models import ListingAvailability
+    qs = ListingAvailability.objects.filter(listing_id=OuterRef('pk'), status__in=active_statuses())
+    if enforced_by_database(using):
+        # Same expression as the exclusion constraint, so its GiST index serves the probe
+        from django.db.backends.postgresql.psycopg_any import DateRange
+        return qs.alias(booked=_daterange(F('start_date'), F('end_date'))).filter(
+            booked__overlap=DateRange(start, end, '[]'),
+        )
+    return qs.filter(start_date__lte=end, end_date__gte=start)
+
+
+def filter_available(queryset, start: date, end: date):
+    """Anti-join: keep listings with no active booking overlapping `start`..`end`."""
+    return queryset.filter(~Exists(overlapping_bookings(start, end, queryset.db)))
+
+
+def parse_date_range(raw_from, raw_to):
+    """(start, end) from `availableFrom`/`availableTo` strings, or None when unusable."""
+    try:
+        start = parse_date(raw_from or '')
+        end = parse_date(raw_to or '') if raw_to else start
+    except ValueError:
+        return None
+    if start is None or end is None or end < start:
+        return None
+    return start, end
+
+
+def batch_booked_ranges(listing_ids, start: date, end: date) -> dict[int, list[tuple[date, date]]]:
+    """Merged bookings for every *published* listing in `listing_ids`, in one LEFT JOIN query.
+
+    Listings without bookings map to []; unknown or unpublished ids are absent.
+    """
+    from .models import Listing
+    rows = (
+        Listing.objects.filter(id__in=list(listing_ids), status='published')
+        .annotate(window=FilteredRelation('availability', condition=Q(
+            availability__status__in=active_statuses(),
+            availability__start_date__lt=end,
+            availability__end_date__gte=start,
+        )))
+        .order_by('id', 'window__start_date')
+        .values_list('id', 'window__start_date', 'window__end_date')
+    )
+    per_listing: dict[int, list[tuple[date, date]]] = {}
+    for listing_id, booked_from, booked_to in rows:
+        ranges = per_listing.setdefault(listing_id, [])
+        if booked_from is not None:
+            ranges.append((max(booked_from, start), min(booked_to + ONE_DAY, end)))
+    return {listing_id: merge_ranges(ranges) for listing_id, ranges in per_listing.items()}
+
+
+def batch_version(listing_ids) -> tuple:
+    """Cheap validator for `batch_booked_ranges` (changes whenever any input booking or listing does)."""
+    from .models import Listing
+    row = Listing.objects.filter(id__in=list(listing_ids), status='published').aggregate(
+        listings=Count('id', distinct=True),
+        listing_ids=Sum('id', distinct=True),
+        bookings=Count('availability'),
+        last_booking=Max('availability__id'),
+        last_change=Max('availability__updated_at'),
+    )
+    return tuple(row[k] for k in ('listings', 'listing_ids', 'bookings', 'last_booking', 'last_change'))
+
+
+def encode_bitmap(ranges, start: date, end: date) -> str:
+    """Booked days as a base64 bitmap: bit i (LSB-first within each byte) is day `start + i`."""
+    bits = bytearray(((end - start).days + 7) // 8)
+    for booked_from, booked_to in ranges:
+        for i in range((booked_from - start).days, (booked_to - start).days):
+            bits[i // 8] |= 1 << (i % 8)
+    return base64.b64encode(bytes(bits)).decode('ascii')
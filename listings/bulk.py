@@ -0,0 +1,259 @@
+"""Bulk listing import/export (NDJSON or CSV).
+
+Import first spools the whole upload to a temp file and rejects unusable
+input (empty body, CSV without the required columns) with a 400. It then works
+in chunks, each committed before its report lines are written, and the report
+is returned only once every chunk is done. Categories and the owner's profile
+are resolved once per upload. Each chunk is validated with
+`ListingSerializer` (same rules as a single POST) and written with one
+`bulk_create`, and the derived columns (city, search document, image
+manifest, provider tokens, search terms) are filled in set-wise since
+`Listing.save()` is bypassed. Every rejected row is reported with its errors;
+good rows in the same chunk are still created.
+
+Export iterates the queryset with a server-side cursor and never holds more
+than one chunk in memory.
+"""
+import codecs
+import csv
+import json
+import tempfile
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+from . import cities, provider_tokens, search
+from .media_pipeline import manifest_for_images
+from .models import Category, Listing
+from .serializers import ListingSerializer
+
+FORMATS = ('ndjson', 'csv')
+READ_CHUNK_BYTES = 64 * 1024
+DEFAULT_CHUNK_SIZE = 500
+
+# Writable columns accepted by import; rating/status and the staff-curated
+# featured flag and badges are exported for reference but never imported
+IMPORT_FIELDS = (
+    'title',
+    'category',
+    'type_label',
+    'image',
+    'image_thumb',
+    'location',
+    'capacity',
+    'price_range',
+    'price_min',
+    'features',
+    'venue_attrs',
+    'attire_attrs',
+    'catering_attrs',
+    'rental_attrs',
+    'service_attrs',
+    'accessory_attrs',
+)
+EXPORT_FIELDS = ('id',) + IMPORT_FIELDS + ('badges', 'featured', 'status', 'rating', 'review_count', 'published_at')
+REQUIRED_COLUMNS = ('title', 'category')
+# Carried as JSON text inside CSV cells
+JSON_FIELDS = frozenset({
+    'features', 'badges', 'venue_attrs', 'attire_attrs', 'catering_attrs', 'rental_attrs',
+    'service_attrs', 'accessory_attrs',
+})
+
+
+class RowError(ValueError):
+    pass
+
+
+class ImportFormatError(ValueError):
+    """The upload as a whole is unusable; reported as a 400 before anything is written."""
+
+
+def detect_format(explicit=None, content_type=None, filename=None) -> str:
+    if explicit:
+        fmt = explicit.lower()
+        if fmt not in FORMATS:
+            raise ValueError(f"Unsupported format '{explicit}' (expected ndjson or csv)")
+        return fmt
+    if (content_type or '').split(';')[0].strip().lower() in ('text/csv', 'application/csv'):
+        return 'csv'
+    if (filename or '').lower().endswith('.csv'):
+        return 'csv'
+    return 'ndjson'
+
+
+def iter_text_lines(stream, chunk_bytes=READ_CHUNK_BYTES):
+    """Decode a binary stream (request body, uploaded file) into lines, one chunk at a time."""
+    decoder = codecs.getincrementaldecoder('utf-8-sig')(errors='replace')
+    pending = ''
+    while True:
+        chunk = stream.read(chunk_bytes)
+        if not chunk:
+            break
+        lines = (pending + decoder.decode(chunk)).split('\n')
+        pending = lines.pop()
+        for line in lines:
+            yield line + '\n'
+    tail = pending + decoder.decode(b'', final=True)
+    if tail:
+        yield tail
+
+
+def spool_input(stream, chunk_bytes=READ_CHUNK_BYTES):
+    """Copy the whole upload into a rewound temp file, so it is fully received before any write."""
+    spooled = tempfile.TemporaryFile()
+    while stream is not None:
+        chunk = stream.read(chunk_bytes)
+        if not chunk:
+            break
+        spooled.write(chunk)
+    if not spooled.tell():
+        spooled.close()
+        raise ImportFormatError('Empty upload')
+    spooled.seek(0)
+    return spooled
+
+
+def check_input(spooled, fmt):
+    """Reject a CSV whose header lacks the required columns; leaves the file rewound."""
+    if fmt == 'csv':
+        header = next(csv.reader(iter_text_lines(spooled)), [])
+        missing = [f for f in REQUIRED_COLUMNS if f not in {c.strip() for c in header}]
+        spooled.seek(0)
+        if missing:
+            raise ImportFormatError(f"CSV header is missing column(s): {', '.join(missing)}")
+
+
+def parse_rows(lines, fmt):
+    """Yield (row_number, dict | RowError) for each record; row numbers are 1-based data rows."""
+    if fmt == 'csv':
+        reader = csv.DictReader(lines)
+        for number, record in enumerate(reader, start=1):
+            row = {}
+            try:
+                for key, value in record.items():
+                    if key is None or value in (None, ''):
+                        continue
+                    row[key.strip()] = json.loads(value) if key.strip() in JSON_FIELDS else value
+            except ValueError as exc:
+                yield number, RowError(f"Invalid JSON in column '{key}': {exc}")
+                continue
+            yield number, row
+        return
+    number = 0
+    for line in lines:
+        if not line.strip():
+            continue
+        number += 1
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            yield number, RowError(f"Invalid JSON: {exc}")
+            continue
+        yield number, row if isinstance(row, dict) else RowError('Each line must be a JSON object')
+
+
+class ListingImporter:
+    """Create draft listings for `user` from parsed rows, chunk by chunk."""
+
+    def __init__(self, user, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.user = user
+        self.chunk_size = max(1, int(chunk_size))
+        self.categories = {c.slug: c for c in Category.objects.all()}
+        self.owner = provider_tokens.owner_profile(user.pk)
+        self.context = {'categories_by_slug': self.categories}
+
+    def run(self, rows):
+        """Yield one report entry per row ({'row', 'id'} or {'row', 'errors'}), then a summary."""
+        created = failed = 0
+        chunk = []
+        for item in rows:
+            chunk.append(item)
+            if len(chunk) >= self.chunk_size:
+                for entry in self._import_chunk(chunk):
+                    created, failed = (created + 1, failed) if 'id' in entry else (created, failed + 1)
+                    yield entry
+                chunk = []
+        if chunk:
+            for entry in self._import_chunk(chunk):
+                created, failed = (created + 1, failed) if 'id' in entry else (created, failed + 1)
+                yield entry
+        yield {'summary': {'created': created, 'failed': failed}}
+
+    def _validate(self, number, row):
+        if isinstance(row, RowError):
+            return None, {'row': number, 'errors': {'non_field_errors': [str(row)]}}
+        data = {k: v for k, v in row.items() if k in IMPORT_FIELDS}
+        serializer = ListingSerializer(data=data, context=self.context)
+        if not serializer.is_valid():
+            return None, {'row': number, 'errors': serializer.errors}
+        attrs = dict(serializer.validated_data)
+        category = attrs.pop('category', None) or {}
+        slug = category.get('slug') if isinstance(category, dict) else category
+        if slug not in self.categories:
+            return None, {'row': number, 'errors': {'category': ['Invalid category slug']}}
+        listing = Listing(**attrs, category=self.categories[slug], created_by=self.user, rating=0, review_count=0)
+        # Derived columns Listing.save() would have filled in
+        cities.apply_city(listing, self.owner['city'])
+        listing.search_document = search.build_search_document(listing)
+        return listing, None
+
+    def _import_chunk(self, chunk):
+        numbers, listings, report = [], [], []
+        for number, row in chunk:
+            listing, error = self._validate(number, row)
+            if error is not None:
+                report.append(error)
+            else:
+                numbers.append(number)
+                listings.append(listing)
+        if listings:
+            manifests = manifest_for_images(listing.image for listing in listings)
+            for listing in listings:
+                listing.image_manifest = manifests.get(listing.image, {})
+            with transaction.atomic():
+                Listing.objects.bulk_create(listings)
+                ids = [listing.pk for listing in listings]
+                provider_tokens.sync_listing_tokens(ids, self.owner['provider_subchoice_tokens'])
+                if not search.uses_tsvector():
+                    search.bulk_index_listing_terms(listings)
+            report.extend({'row': n, 'id': listing.pk} for n, listing in zip(numbers, listings))
+        return sorted(report, key=lambda entry: entry['row'])
+
+
+def export_rows(queryset, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield listings as import-compatible dicts without materializing the queryset."""
+    columns = [f for f in EXPORT_FIELDS if f != 'category'] + ['category__slug']
+    for values in queryset.order_by('id').values(*columns).iterator(chunk_size=chunk_size):
+        values['category'] = values.pop('category__slug')
+        yield {field: values[field] for field in EXPORT_FIELDS}
+
+
+class _Echo:
+    """File-like object whose write() returns the value, for streaming csv.writer output."""
+
+    def write(self, value):
+        return value
+
+
+def render_ndjson(rows):
+    for row in rows:
+        yield json.dumps(row, cls=DjangoJSONEncoder) + '\n'
+
+
+def write_report(entries):
+    """Spool NDJSON report entries to a rewound temp file as they are produced."""
+    report = tempfile.TemporaryFile()
+    for line in render_ndjson(entries):
+        report.write(line.encode('utf-8'))
+    report.seek(0)
+    return report
+
+
+def render_csv(rows, fields=EXPORT_FIELDS):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(fields)
+    for row in rows:
+        yield writer.writerow([
+            json.dumps(row[f], cls=DjangoJSONEncoder) if f in JSON_FIELDS else ('' if row[f] is None else row[f])
+            for f in fields
+        ])
@@ -0,0 +1,123 @@
+"""Incremental listing change feed (`/listings/changes/?since=`).
+
+Rows are read in `(updated_at, id)` order with a keyset seek on the matching
+index, and the opaque `next` cursor carries the last pair returned. Each entry
+is classified relative to the caller's `since`:
+
+- `created` / `published` / `updated` for published listings, with a compact
+  summary (clients fetch the detail endpoint for the full payload)
+- `unpublished` for listings that were public once but no longer are (id only)
+
+Drafts that were never published are not part of the feed. Rows modified
+within the last `LISTING_CHANGES_SETTLE_SECONDS` are held back, so a
+transaction that commits late with an earlier timestamp is not skipped.
+Deletions are not tracked.
+"""
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .media_urls import MediaURLResolver
+from .models import Listing
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 500
+SUMMARY_FIELDS = (
+    'id', 'title', 'category__slug', 'city', 'image', 'price_min', 'rating', 'review_count',
+    'featured', 'status', 'published_at', 'created_at', 'updated_at',
+)
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(updated_at, pk) -> str:
+    raw = json.dumps([updated_at.isoformat(), pk], separators=(',', ':')).encode('utf-8')
+    return urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_since(raw):
+    """(updated_at, id) from a feed cursor or an ISO-8601 timestamp; None for a full sync."""
+    if not raw:
+        return None
+    moment = parse_datetime(raw)
+    if moment is not None:
+        pk = 0
+    else:
+        try:
+            padded = raw + '=' * (-len(raw) % 4)
+            stamp, pk = json.loads(urlsafe_b64decode(padded.encode('ascii')).decode('utf-8'))
+            moment = parse_datetime(stamp)
+        except (TypeError, ValueError, UnicodeError):
+            raise InvalidCursor(raw)
+        if moment is None or not isinstance(pk, int):
+            raise InvalidCursor(raw)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment, dt_timezone.utc)
+    return moment, pk
+
+
+def settle_horizon():
+    return timezone.now() - timedelta(seconds=getattr(settings, 'LISTING_CHANGES_SETTLE_SECONDS', 2))
+
+
+def changed_rows(since, limit):
+    """Up to `limit` summary rows after `since` (plus one, to detect more)."""
+    qs = Listing.objects.filter(Q(status='published') | Q(published_at__isnull=False), updated_at__lte=settle_horizon())
+    if since is not None:
+        moment, pk = since
+        qs = qs.filter(Q(updated_at__gt=moment) | Q(updated_at=moment, id__gt=pk))
+    return list(qs.order_by('updated_at', 'id').values(*SUMMARY_FIELDS)[:limit + 1])
+
+
+def classify(row, moment) -> str:
+    if row['status'] != 'published':
+        return 'unpublished'
+    if moment is None or row['created_at'] > moment:
+        return 'created'
+    if row['published_at'] and row['published_at'] > moment:
+        return 'published'
+    return 'updated'
+
+
+def describe(row, moment, resolver) -> dict:
+    change = classify(row, moment)
+    entry = {'id': row['id'], 'change': change, 'status': row['status'], 'updated_at': row['updated_at']}
+    if change != 'unpublished':
+        entry.update({
+            'title': row['title'],
+            'category': row['category__slug'],
+            'city': row['city'],
+            'image': resolver.image(row['image']),
+            'price_min': row['price_min'],
+            'rating': row['rating'],
+            'review_count': row['review_count'],
+            'featured': row['featured'],
+        })
+    return entry
+
+
+def build_feed(raw_since, limit, request=None) -> dict:
+    """Feed page for the `since` cursor; `next` is always a cursor to poll with."""
+    since = decode_since(raw_since)
+    rows = changed_rows(since, limit)
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    moment = since[0] if since else None
+    resolver = MediaURLResolver(request)
+    resolver.prefetch(row['image'] for row in rows if row['status'] == 'published' and row['image'])
+    if rows:
+        next_cursor = encode_cursor(rows[-1]['updated_at'], rows[-1]['id'])
+    else:
+        next_cursor = encode_cursor(*since) if since else None
+    return {
+        'results': [describe(row, moment, resolver) for row in rows],
+        'next': next_cursor,
+        'has_more': has_more,
+    }
@@ -0,0 +1,55 @@
+"""Normalized listing city.
+
+`Listing.location` is free text ("Bole, Addis Ababa") and the provider profile
+carries a `city`. We derive one display city per listing plus a normalized
+`city_key` (casefolded, single-spaced) that the `city` filter and the city
+autocomplete query by prefix through a pattern index. The `city` filter also
+matches anywhere in `location` (neighborhoods such as "Bole"), served by a
+trigram index on Postgres rather than a sequential ILIKE scan.
+"""
+import re
+
+_SPACES_RE = re.compile(r'\s+')
+
+
+def normalize_city(value) -> str:
+    return _SPACES_RE.sub(' ', str(value or '')).strip().casefold()
+
+
+def derive_city(location, profile_city) -> str:
+    """Pick the display city for a listing.
+
+    The provider's profile city wins when the location is blank or mentions it;
+    otherwise the last comma-separated part of the location is used
+    ("Bole, Addis Ababa" -> "Addis Ababa").
+    """
+    location = _SPACES_RE.sub(' ', str(location or '')).strip()
+    profile_city = _SPACES_RE.sub(' ', str(profile_city or '')).strip()
+    if profile_city and (not location or normalize_city(profile_city) in normalize_city(location)):
+        return profile_city[:120]
+    parts = [p.strip() for p in location.split(',') if p.strip()]
+    return (parts[-1] if parts else '')[:120]
+
+
+def apply_city(listing, profile_city) -> None:
+    listing.city = derive_city(listing.location, profile_city)
+    listing.city_key = normalize_city(listing.city)
+
+
+def refresh_provider_cities(user_id, profile_city) -> int:
+    """Re-derive city for every listing owned by `user_id` (after a profile city change)."""
+    from django.utils import timezone
+
+    from .models import Listing
+    changed = []
+    now = timezone.now()
+    for listing in Listing.objects.filter(created_by_id=user_id).only('id', 'location', 'city', 'city_key'):
+        city = derive_city(listing.location, profile_city)
+        key = normalize_city(city)
+        if (city, key) != (listing.city, listing.city_key):
+            # bulk_update skips auto_now; the change feed reports `city`
+            listing.city, listing.city_key, listing.updated_at = city, key, now
+            changed.append(listing)
+    if changed:
+        Listing.objects.bulk_update(changed, ['city', 'city_key', 'updated_at'])
+    return len(changed)
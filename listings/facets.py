@@ -0,0 +1,87 @@
+"""Facet counts for the listing browser.
+
+One request returns every count the filter sidebar needs for the current
+filter set: categories, price buckets, rating thresholds, cities and provider
+role tokens. Price/rating buckets come from a single conditional aggregate;
+the three group-bys ride on the same filtered queryset. The result is cached
+under the listing page generations (see `result_cache`), so it is recomputed
+only after a listing in scope actually changes.
+"""
+from decimal import Decimal
+
+from django.db.models import Count, Min, Q
+
+from .models import ListingProviderToken
+
+# (key, min inclusive, max exclusive); keys double as SPA labels
+PRICE_BUCKETS = (
+    ('under-1000', None, Decimal('1000')),
+    ('1000-5000', Decimal('1000'), Decimal('5000')),
+    ('5000-10000', Decimal('5000'), Decimal('10000')),
+    ('10000-plus', Decimal('10000'), None),
+)
+# Cumulative thresholds, matching `?ratingGte=`
+RATING_THRESHOLDS = (Decimal('4.5'), Decimal('4.0'), Decimal('3.0'))
+
+MAX_CITIES = 20
+MAX_ROLE_TOKENS = 50
+
+
+def _price_q(low, high) -> Q:
+    q = Q()
+    if low is not None:
+        q &= Q(price_min__gte=low)
+    if high is not None:
+        q &= Q(price_min__lt=high)
+    return q
+
+
+def compute_facets(queryset) -> dict:
+    """Facet counts for an already-filtered listing queryset."""
+    qs = queryset.order_by()
+    aggregates = {'total': Count('id')}
+    for i, (_, low, high) in enumerate(PRICE_BUCKETS):
+        aggregates[f'price_{i}'] = Count('id', filter=_price_q(low, high))
+    for i, threshold in enumerate(RATING_THRESHOLDS):
+        aggregates[f'rating_{i}'] = Count('id', filter=Q(rating__gte=threshold))
+    totals = qs.aggregate(**aggregates)
+
+    categories = (
+        qs.values('category__slug')
+        .annotate(name=Min('category__name'), count=Count('id'))
+        .order_by('-count', 'category__slug')
+    )
+    cities = (
+        qs.exclude(city_key='')
+        .values('city_key')
+        .annotate(city=Min('city'), count=Count('id'))
+        .order_by('-count', 'city_key')[:MAX_CITIES]
+    )
+    roles = (
+        ListingProviderToken.objects.filter(listing__in=qs.values('id'))
+        .values('token')
+        .annotate(count=Count('listing_id'))
+        .order_by('-count', 'token')[:MAX_ROLE_TOKENS]
+    )
+    return {
+        'total': totals['total'],
+        'categories': [
+            {'slug': r['category__slug'], 'name': r['name'], 'count': r['count']}
+            for r in categories if r['category__slug']
+        ],
+        'price': [
+            {
+                'key': key,
+                'min': float(low) if low is not None else None,
+                'max': float(high) if high is not None else None,
+                'count': totals[f'price_{i}'],
+            }
+            for i, (key, low, high) in enumerate(PRICE_BUCKETS)
+        ],
+        'rating': [
+            {'gte': float(threshold), 'count': totals[f'rating_{i}']}
+            for i, threshold in enumerate(RATING_THRESHOLDS)
+        ],
+        'cities': [{'city': r['city'], 'count': r['count']} for r in cities],
+        'roles': [{'token': r['token'], 'count': r['count']} for r in roles],
+    }
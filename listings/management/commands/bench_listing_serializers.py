@@ -0,0 +1,81 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory
+
+from listings.models import Category, Listing
+from listings.serializers import ListingListSerializer, ListingSerializer
+from users.models import UserProfile
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark list serialization of listings: ListingSerializer (select_related category, created_by) "
+        "vs ListingListSerializer (select_related category, created_by__profile). Fixture rows are created "
+        "inside a transaction and rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100, help='Listings serialized per run.')
+        parser.add_argument('--repeat', type=int, default=20, help='Timed runs per serializer (best is reported).')
+
+    def handle(self, *args, **options):
+        rows = max(1, int(options['rows']))
+        repeat = max(1, int(options['repeat']))
+        try:
+            with transaction.atomic():
+                ids = self._make_fixture(rows)
+                request = APIRequestFactory().get('/api/v1/listings/')
+                before = self._run(
+                    lambda: ListingSerializer(
+                        list(Listing.objects.select_related('category', 'created_by').filter(id__in=ids)),
+                        many=True, context={'request': request},
+                    ).data,
+                    repeat,
+                )
+                after = self._run(
+                    lambda: ListingListSerializer(
+                        list(Listing.objects.select_related('category', 'created_by__profile').filter(id__in=ids)),
+                        many=True, context={'request': request},
+                    ).data,
+                    repeat,
+                )
+                raise _Rollback
+        except _Rollback:
+            pass
+        for label, (best_ms, queries) in (('ListingSerializer', before), ('ListingListSerializer', after)):
+            self.stdout.write(f"{label:<24} {rows} rows: {best_ms:8.2f} ms (best of {repeat}), {queries} queries")
+        self.stdout.write(self.style.SUCCESS(f"Speedup: {before[0] / after[0]:.1f}x"))
+
+    def _make_fixture(self, rows):
+        User = get_user_model()
+        category, _ = Category.objects.get_or_create(slug='bench-category', defaults={'name': 'Bench'})
+        ids = []
+        for i in range(rows):
+            user = User.objects.create_user(username=f'bench_provider_{i}_{time.monotonic_ns()}')
+            UserProfile.objects.filter(user=user).update(business_name=f'Bench {i}', city='Addis Ababa', country='ET')
+            listing = Listing.objects.create(
+                title=f'Bench listing {i}', category=category, image=f'uploads/bench-{i}.jpg',
+                image_thumb=f'thumbs/bench-{i}.jpg', location='Bole, Addis Ababa', price_min=1000 + i,
+                features=['Parking', 'Stage'], venue_attrs={'capacity': 300}, created_by=user, status='published',
+            )
+            ids.append(listing.id)
+        return ids
+
+    def _run(self, fn, repeat):
+        best = float('inf')
+        queries = 0
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as ctx:
+                start = time.perf_counter()
+                fn()
+                best = min(best, (time.perf_counter() - start) * 1000.0)
+            queries = len(ctx.captured_queries)
+        return best, queries
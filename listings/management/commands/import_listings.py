@@ -0,0 +1,33 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from listings import bulk
+
+
+class Command(BaseCommand):
+    help = "Bulk-create draft listings for a provider from an NDJSON or CSV file."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to import (.ndjson/.jsonl or .csv).')
+        parser.add_argument('--user', required=True, help='Owner username.')
+        parser.add_argument('--format', choices=bulk.FORMATS, help='Defaults to the file extension.')
+        parser.add_argument('--chunk-size', type=int, default=bulk.DEFAULT_CHUNK_SIZE, help='Rows validated and inserted per batch.')
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f"Unknown user '{options['user']}'")
+        fmt = bulk.detect_format(options.get('format'), filename=options['path'])
+        importer = bulk.ListingImporter(user, chunk_size=options['chunk_size'])
+        with open(options['path'], 'rb') as fh:
+            for entry in importer.run(bulk.parse_rows(bulk.iter_text_lines(fh), fmt)):
+                if 'errors' in entry:
+                    self.stderr.write(json.dumps(entry))
+                elif 'summary' in entry:
+                    summary = entry['summary']
+                    self.stdout.write(self.style.SUCCESS(
+                        f"Created {summary['created']} listing(s); {summary['failed']} row(s) rejected."
+                    ))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from listings.models import Listing
+from listings import search
+
+
+class Command(BaseCommand):
+    help = "Rebuild listing search documents (and the inverted term index on non-Postgres backends)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500, help='Listings processed per transaction.')
+
+    def handle(self, *args, **options):
+        chunk = max(1, int(options.get('chunk_size') or 500))
+        with_terms = not search.uses_tsvector()
+        total = 0
+        batch = []
+        for listing in Listing.objects.order_by('id').iterator(chunk_size=chunk):
+            listing.search_document = search.build_search_document(listing)
+            batch.append(listing)
+            if len(batch) >= chunk:
+                total += self._flush(batch, with_terms)
+                batch = []
+        if batch:
+            total += self._flush(batch, with_terms)
+        self.stdout.write(self.style.SUCCESS(f"Reindexed {total} listing(s)."))
+
+    def _flush(self, batch, with_terms):
+        with transaction.atomic():
+            Listing.objects.bulk_update(batch, ['search_document'])
+            if with_terms:
+                for listing in batch:
+                    search.index_listing_terms(listing)
+        return len(batch)
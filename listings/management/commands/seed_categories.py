@@ -1,5 +1,6 @@
 from django.core.management.base import BaseCommand
 from django.db import transaction
+from django.db.models.functions import Now
 from listings.models import Category, Listing
 
 
@@ -143,7 +144,7 @@ class Command(BaseCommand):
                 # Ensure placeholder exists
                 uncategorized, _ = Category.objects.get_or_create(slug="uncategorized", defaults={"name": "Uncategorized"})
                 # Reassign all listings to placeholder
-                affected = Listing.objects.exclude(category=uncategorized).update(category=uncategorized)
+                affected = Listing.objects.exclude(category=uncategorized).update(category=uncategorized, updated_at=Now())
                 self.stdout.write(self.style.WARNING(f"Reassigned {affected} listings to 'Uncategorized'."))
                 # Delete all categories except placeholder
                 Category.objects.exclude(pk=uncategorized.pk).delete()
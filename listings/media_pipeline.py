@@ -0,0 +1,139 @@
+"""Background generation of image variants for uploaded originals.
+
+The upload view stores the original and records an `ImageAsset`; everything
+that needs decoding runs in `listings.tasks.process_image_asset` so upload
+latency is one storage write. From a single decode of the original we write:
+
+- the legacy 400px JPEG thumbnail (`thumbs/<stem>.jpg`, kept for `image_thumb`)
+- width variants in WebP, and AVIF when the Pillow build can encode it
+  (`uploads/variants/<stem>-<width>.<ext>`)
+- a tiny inline WebP placeholder (LQIP data URI)
+
+The resulting manifest is stored on the asset and copied onto listings using
+the original (`Listing.image_manifest`), where serializers expose it as srcset.
+"""
+import base64
+import os
+from io import BytesIO
+
+from django.db.models import Q
+from django.db.models.functions import Now
+
+from .media_storage import get_media_storage
+
+THUMB_SIZE = (400, 400)
+THUMB_QUALITY = 80
+VARIANT_WIDTHS = (320, 640, 960, 1280, 1920)
+VARIANT_QUALITY = {'webp': 78, 'avif': 55}
+CONTENT_TYPES = {'webp': 'image/webp', 'avif': 'image/avif'}
+PLACEHOLDER_WIDTH = 16
+
+
+def variant_stem(path: str) -> str:
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def available_formats() -> list[str]:
+    """Modern formats this Pillow build can encode, best first."""
+    from PIL import Image, features
+    try:
+        import pillow_avif  # noqa: F401  (optional plugin for Pillow < 11)
+    except ImportError:
+        pass
+    Image.init()
+    formats = []
+    if 'AVIF' in Image.SAVE:
+        formats.append('avif')
+    if features.check('webp'):
+        formats.append('webp')
+    return formats
+
+
+def variant_widths(original_width: int) -> list[int]:
+    """Standard widths below the original, plus the original (capped) so there is always one."""
+    widths = {w for w in VARIANT_WIDTHS if w < original_width}
+    widths.add(min(original_width, VARIANT_WIDTHS[-1]))
+    return sorted(widths)
+
+
+def _encode(im, fmt: str, **options) -> bytes:
+    buf = BytesIO()
+    im.save(buf, format=fmt.upper(), **options)
+    return buf.getvalue()
+
+
+def _resized(im, width: int):
+    if width >= im.width:
+        return im
+    copy = im.copy()
+    copy.thumbnail((width, im.height))
+    return copy
+
+
+def make_thumbnail(im) -> bytes:
+    thumb = im.copy()
+    thumb.thumbnail(THUMB_SIZE)
+    if thumb.mode not in ('RGB', 'L'):
+        thumb = thumb.convert('RGB')
+    return _encode(thumb, 'jpeg', quality=THUMB_QUALITY)
+
+
+def make_placeholder(im) -> str:
+    tiny = _resized(im, PLACEHOLDER_WIDTH)
+    return 'data:image/webp;base64,' + base64.b64encode(_encode(tiny, 'webp', quality=30)).decode('ascii')
+
+
+def build_variants(asset, data: bytes, storage=None) -> dict:
+    """Write every variant of `asset` from its original bytes; returns the manifest."""
+    from PIL import Image, ImageOps
+    storage = storage or get_media_storage()
+    stem = variant_stem(asset.path)
+    with Image.open(BytesIO(data)) as opened:
+        im = ImageOps.exif_transpose(opened)
+        if im.mode not in ('RGB', 'RGBA'):
+            im = im.convert('RGBA' if 'A' in im.getbands() else 'RGB')
+        manifest = {
+            'thumb': storage.save(f"thumbs/{stem}.jpg", make_thumbnail(im), 'image/jpeg'),
+            'width': im.width,
+            'height': im.height,
+            'sources': {},
+        }
+        formats = available_formats()
+        for width in variant_widths(im.width):
+            resized = _resized(im, width)
+            for fmt in formats:
+                path = storage.save(
+                    f"uploads/variants/{stem}-{width}.{fmt}",
+                    _encode(resized, fmt, quality=VARIANT_QUALITY[fmt]),
+                    CONTENT_TYPES[fmt],
+                )
+                manifest['sources'].setdefault(fmt, []).append({'w': width, 'path': path})
+        if 'webp' in formats:
+            manifest['placeholder'] = make_placeholder(im)
+    return manifest
+
+
+def manifest_for_images(paths) -> dict:
+    """{original path: manifest} for ready assets among `paths` (one query)."""
+    from .models import ImageAsset
+    paths = {p for p in paths if p and p.startswith('uploads/')}
+    if not paths:
+        return {}
+    return dict(
+        ImageAsset.objects.filter(path__in=paths, status=ImageAsset.STATUS_READY).values_list('path', 'variants')
+    )
+
+
+def attach_to_listings(asset) -> int:
+    """Copy the manifest onto listings using this original (and fill a missing `image_thumb`)."""
+    from .models import Listing
+    from .result_cache import bump_for_category_ids
+    qs = Listing.objects.filter(image=asset.path)
+    category_ids = list(qs.values_list('category_id', flat=True))
+    updated = qs.update(image_manifest=asset.variants, updated_at=Now())
+    thumb = asset.variants.get('thumb')
+    if thumb:
+        qs.filter(Q(image_thumb__isnull=True) | Q(image_thumb='')).update(image_thumb=thumb, updated_at=Now())
+    if updated:
+        bump_for_category_ids(category_ids)
+    return updated
@@ -0,0 +1,205 @@
+"""Where uploaded media bytes live.
+
+`get_media_storage()` picks the backend from `MEDIA_STORAGE_BACKEND`
+(local | supabase | auto). Both backends expose the same small surface
+(`save`, `read`, `read_chunks`, `url`, and for direct uploads `create_upload_target`,
+`stat`, `delete`) so the upload views and the media tasks don't care which
+one is configured.
+"""
+import mimetypes
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+
+class MediaStorageError(Exception):
+    """Storage rejected or failed an operation; `status_code` is the HTTP status to surface."""
+
+    def __init__(self, detail, status_code=502, **extra):
+        super().__init__(detail)
+        self.detail = detail
+        self.status_code = status_code
+        self.extra = extra
+
+
+def resolve_backend() -> str:
+    backend = getattr(settings, 'MEDIA_STORAGE_BACKEND', 'local')
+    # 'auto': use Supabase when credentials are present, else local
+    if backend == 'auto':
+        configured = all([
+            getattr(settings, 'SUPABASE_URL', ''),
+            getattr(settings, 'SUPABASE_BUCKET', ''),
+            getattr(settings, 'SUPABASE_SERVICE_ROLE_KEY', ''),
+        ])
+        return 'supabase' if configured else 'local'
+    return 'supabase' if backend == 'supabase' else 'local'
+
+
+class LocalMediaStorage:
+    """MEDIA_ROOT via Django's default storage."""
+    name = 'local'
+
+    def save(self, path, content, content_type=None) -> str:
+        if isinstance(content, (bytes, bytearray)):
+            content = ContentFile(content)
+        return default_storage.save(path, content)
+
+    def read(self, path) -> bytes:
+        with default_storage.open(path, 'rb') as fh:
+            return fh.read()
+
+    def read_chunks(self, path, chunk_size):
+        """Yield the object's bytes in blocks of at most `chunk_size`."""
+        with default_storage.open(path, 'rb') as fh:
+            while True:
+                block = fh.read(chunk_size)
+                if not block:
+                    return
+                yield block
+
+    def create_upload_target(self, path, content_type, max_bytes, request=None) -> dict:
+        from django.urls import reverse
+
+        from .uploads import local_upload_token
+        url = reverse('image-direct-upload-local', args=[local_upload_token(path, content_type, max_bytes)])
+        return {
+            'method': 'PUT',
+            'url': request.build_absolute_uri(url) if request is not None else url,
+            'headers': {'Content-Type': content_type},
+        }
+
+    def stat(self, path):
+        """{'size', 'content_type'} of a stored object, or None when it does not exist."""
+        if not default_storage.exists(path):
+            return None
+        return {'size': default_storage.size(path), 'content_type': mimetypes.guess_type(path)[0] or ''}
+
+    def delete(self, path) -> None:
+        default_storage.delete(path)
+
+    def url(self, path, request=None) -> str:
+        if hasattr(default_storage, 'url'):
+            url = default_storage.url(path)
+        else:
+            url = f"{settings.MEDIA_URL}{path}"
+        return request.build_absolute_uri(url) if request is not None else url
+
+
+class SupabaseMediaStorage:
+    """Supabase Storage REST API using the service role key, over the shared pooled client."""
+    name = 'supabase'
+
+    def __init__(self):
+        from .storage_client import get_storage_client
+        self.base_url = getattr(settings, 'SUPABASE_URL', '')
+        self.bucket = getattr(settings, 'SUPABASE_BUCKET', '')
+        self.service_key = getattr(settings, 'SUPABASE_SERVICE_ROLE_KEY', '')
+        if not (self.base_url and self.bucket and self.service_key):
+            raise MediaStorageError('Supabase storage not fully configured', status_code=500)
+        self.http = get_storage_client()
+
+    def _object_endpoint(self, path) -> str:
+        return f"{self.base_url}/storage/v1/object/{self.bucket}/{path}"
+
+    def _auth(self) -> dict:
+        return {'Authorization': f"Bearer {self.service_key}"}
+
+    def save(self, path, content, content_type=None) -> str:
+        if hasattr(content, 'seek'):
+            # File objects are streamed by requests in small blocks (Content-Length from len())
+            content.seek(0)
+        resp = self.http.request(
+            'POST',
+            self._object_endpoint(path),
+            op='upload',
+            headers={**self._auth(), 'Content-Type': content_type or 'application/octet-stream'},
+            data=content,
+        )
+        if resp.status_code not in (200, 201):
+            raise MediaStorageError('Supabase upload failed', status_code=502, body=resp.text[:400], upstream_status=resp.status_code)
+        return path
+
+    def read(self, path) -> bytes:
+        resp = self.http.request('GET', self._object_endpoint(path), op='download', headers=self._auth())
+        if resp.status_code not in (200, 201):
+            raise MediaStorageError('Supabase download failed', status_code=502, upstream_status=resp.status_code)
+        return resp.content
+
+    def read_chunks(self, path, chunk_size):
+        """Yield the object's bytes in blocks of at most `chunk_size`, streamed off the response."""
+        import requests
+
+        resp = self.http.request('GET', self._object_endpoint(path), op='download', headers=self._auth(), stream=True)
+        with resp:
+            if resp.status_code not in (200, 201):
+                raise MediaStorageError('Supabase download failed', status_code=502, upstream_status=resp.status_code)
+            try:
+                yield from resp.iter_content(chunk_size)
+            except requests.RequestException as exc:
+                raise MediaStorageError(f'Supabase download interrupted: {exc}') from exc
+
+    def url(self, path, request=None) -> str:
+        return f"{self.base_url}/storage/v1/object/public/{self.bucket}/{path}"
+
+    def sign_urls(self, paths, expires_in) -> dict:
+        """{path: signed download URL} for many objects in one call (paths that failed are omitted)."""
+        resp = self.http.request(
+            'POST',
+            f"{self.base_url}/storage/v1/object/sign/{self.bucket}",
+            op='sign',
+            headers=self._auth(),
+            json={'expiresIn': expires_in, 'paths': list(paths)},
+        )
+        if resp.status_code not in (200, 201):
+            raise MediaStorageError('Failed to sign URL', status_code=502, body=resp.text[:400], upstream_status=resp.status_code)
+        signed = {}
+        for item in resp.json():
+            url = item.get('signedURL') or item.get('signedUrl')
+            if url and not item.get('error'):
+                signed[item['path']] = f"{self.base_url}/storage/v1{url}"
+        return signed
+
+    def create_upload_target(self, path, content_type, max_bytes, request=None) -> dict:
+        """Signed upload URL (valid for a single PUT); size/type are re-checked on finalize."""
+        resp = self.http.request(
+            'POST',
+            f"{self.base_url}/storage/v1/object/upload/sign/{self.bucket}/{path}",
+            op='sign',
+            headers=self._auth(),
+        )
+        if resp.status_code not in (200, 201):
+            raise MediaStorageError('Supabase upload signing failed', status_code=502, upstream_status=resp.status_code)
+        signed = resp.json().get('url') or ''
+        return {
+            'method': 'PUT',
+            'url': f"{self.base_url}/storage/v1{signed}",
+            'headers': {'Content-Type': content_type, 'x-upsert': 'false'},
+        }
+
+    def stat(self, path):
+        resp = self.http.request(
+            'HEAD',
+            f"{self.base_url}/storage/v1/object/authenticated/{self.bucket}/{path}",
+            op='stat',
+            headers=self._auth(),
+        )
+        if resp.status_code in (400, 404):
+            return None
+        if resp.status_code != 200:
+            raise MediaStorageError('Supabase lookup failed', status_code=502, upstream_status=resp.status_code)
+        return {
+            'size': int(resp.headers.get('Content-Length') or 0),
+            'content_type': resp.headers.get('Content-Type', ''),
+        }
+
+    def delete(self, path) -> None:
+        resp = self.http.request('DELETE', self._object_endpoint(path), op='delete', headers=self._auth())
+        if resp.status_code not in (200, 204):
+            raise MediaStorageError('Supabase delete failed', status_code=502, upstream_status=resp.status_code)
+
+
+def get_media_storage():
+    if resolve_backend() == 'supabase':
+        return SupabaseMediaStorage()
+    return LocalMediaStorage()
@@ -0,0 +1,130 @@
+import logging
+
+from django.conf import settings
+from django.utils.encoding import iri_to_uri
+
+from . import signed_urls
+from .media_storage import MediaStorageError
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LISTING_IMAGE = '/src/assets/luxury-wedding-hall.jpg'
+# Relative paths that live in the storage bucket (and need signing when it is private)
+STORAGE_PREFIXES = ('uploads/', 'thumbs/')
+
+
+def listing_media_paths(listing):
+    """Every stored path a listing's payload links to (original, thumbnail, srcset variants)."""
+    paths = [listing.image, listing.image_thumb]
+    for sources in (listing.image_manifest or {}).get('sources', {}).values():
+        paths.extend(source['path'] for source in sources)
+    return [p for p in paths if p]
+
+
+class MediaURLResolver:
+    """Turn stored image paths (uploads/..., thumbs/..., assets/..., media-relative) into URLs.
+
+    Settings and the request's absolute base are read once at construction, so a
+    resolver can be shared by every row serialized for one request. With a private
+    bucket, storage paths resolve to signed URLs; list serializers `prefetch()` the
+    whole page so that is one (cached) batch call rather than one call per image.
+    """
+
+    def __init__(self, request=None):
+        backend = getattr(settings, 'MEDIA_STORAGE_BACKEND', 'local')
+        supabase_url = getattr(settings, 'SUPABASE_URL', '')
+        bucket = getattr(settings, 'SUPABASE_BUCKET', '')
+        self.supabase_public_prefix = None
+        if backend in ('supabase', 'auto') and supabase_url and bucket:
+            self.supabase_public_prefix = f"{supabase_url}/storage/v1/object/public/{bucket}/"
+        self.private = self.supabase_public_prefix is not None and signed_urls.private_bucket_enabled()
+        # path -> signed URL, or None once signing was attempted and failed
+        self.signed = {}
+        self.assets_url = settings.BACKEND_ASSETS_URL
+        self.media_url = settings.MEDIA_URL
+        self.request = request
+        # scheme://host for root-relative paths; build_absolute_uri('/') ends with the slash
+        self.origin = request.build_absolute_uri('/')[:-1] if request is not None else None
+
+    @classmethod
+    def for_context(cls, context):
+        """One resolver per serializer context (i.e. per request), created lazily."""
+        resolver = context.get('_media_url_resolver')
+        if resolver is None:
+            resolver = cls(context.get('request'))
+            context['_media_url_resolver'] = resolver
+        return resolver
+
+    def prefetch(self, paths) -> None:
+        """Sign every not-yet-resolved storage path in one batch (no-op for public buckets)."""
+        if not self.private:
+            return
+        wanted = [p for p in dict.fromkeys(paths) if p.startswith(STORAGE_PREFIXES) and p not in self.signed]
+        if not wanted:
+            return
+        try:
+            signed = signed_urls.sign_paths(wanted)
+        except MediaStorageError as exc:
+            logger.warning("Signing %d media paths failed: %s", len(wanted), exc.detail)
+            signed = {}
+        self.signed.update({p: signed.get(p) for p in wanted})
+
+    def storage_url(self, path: str) -> str:
+        if self.private:
+            if path not in self.signed:
+                self.prefetch([path])
+            if self.signed.get(path):
+                return self.signed[path]
+        return f"{self.supabase_public_prefix}{path}"
+
+    def absolute(self, url: str) -> str:
+        if self.request is None or url.startswith(('http://', 'https://')):
+            return url
+        # Same fast case as HttpRequest.build_absolute_uri, minus the per-call urlsplit
+        if url.startswith('/') and not url.startswith('//') and '/./' not in url and '/../' not in url and '?' not in url:
+            return iri_to_uri(f"{self.origin}{url}")
+        return self.request.build_absolute_uri(url)
+
+    def image(self, raw) -> str:
+        url = (raw or '').strip()
+        if not url:
+            return DEFAULT_LISTING_IMAGE
+        # Pass through absolute or vite asset path
+        if url.startswith(('http://', 'https://', '/src/assets/')):
+            return url
+        # Supabase relative path (uploads/...) -> public or signed object URL
+        if self.supabase_public_prefix and url.startswith('uploads/'):
+            return self.storage_url(url)
+        # Backend assets path
+        if url.startswith(('assets/', '/assets/')):
+            path = url.lstrip('/')
+            return self.absolute(f"{self.assets_url}{path.split('assets/', 1)[-1]}")
+        # Treat as relative media path
+        return self.absolute(f"{self.media_url}{url.lstrip('/')}")
+
+    def thumb(self, raw):
+        thumb = (raw or '').strip()
+        if not thumb:
+            return None
+        if self.supabase_public_prefix and thumb.startswith('thumbs/'):
+            return self.storage_url(thumb)
+        if thumb.startswith('thumbs/'):
+            # Generated locally by the media pipeline
+            return self.absolute(f"{self.media_url}{thumb}")
+        return thumb
+
+    def srcset(self, manifest, fmt='webp'):
+        """`url 320w, url 640w, ...` for one format of an image manifest, or None."""
+        sources = (manifest or {}).get('sources', {}).get(fmt)
+        if not sources:
+            return None
+        return ', '.join(f"{self.image(s['path'])} {s['w']}w" for s in sources)
+
+    def sources(self, manifest):
+        """<picture> sources, best format first: [{'type': 'image/avif', 'srcset': ...}, ...]."""
+        out = []
+        for fmt, content_type in (('avif', 'image/avif'), ('webp', 'image/webp')):
+            srcset = self.srcset(manifest, fmt)
+            if srcset:
+                out.append({'type': content_type, 'srcset': srcset})
+        return out
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.6 on 2026-10-18 00:59
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0008_category_subchoices'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='listing',
+            name='listing_featured_rating_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='listing',
+            name='listing_rating_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='listing',
+            name='listing_price_min_idx',
+        ),
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(fields=['-featured', '-rating', 'id'], name='listing_feat_rating_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(fields=['-rating', 'id'], name='listing_rating_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(fields=['price_min', 'id'], name='listing_price_min_id_idx'),
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.2.6 on 2026-10-18 01:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+GIN_INDEX = 'listing_search_doc_gin'
+
+
+def create_search_index(apps, schema_editor):
+    # Expression must match listings.search.search_vector()
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        f'CREATE INDEX IF NOT EXISTS "{GIN_INDEX}" ON "listings_listing" '
+        f"USING gin (to_tsvector('simple'::regconfig, \"search_document\"))"
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP INDEX IF EXISTS "{GIN_INDEX}"')
+
+
+def backfill_search_documents(apps, schema_editor):
+    from listings.search import build_search_document, build_search_terms
+    Listing = apps.get_model('listings', 'Listing')
+    ListingSearchTerm = apps.get_model('listings', 'ListingSearchTerm')
+    db = schema_editor.connection.alias
+    with_terms = schema_editor.connection.vendor != 'postgresql'
+    for listing in Listing.objects.using(db).iterator(chunk_size=500):
+        Listing.objects.using(db).filter(pk=listing.pk).update(search_document=build_search_document(listing))
+        if with_terms:
+            ListingSearchTerm.objects.using(db).bulk_create([
+                ListingSearchTerm(listing_id=listing.pk, term=term, weight=min(weight, 32767))
+                for term, weight in build_search_terms(listing).items()
+            ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0009_listing_keyset_sort_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='listing',
+            name='search_document',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.CreateModel(
+            name='ListingSearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('weight', models.PositiveSmallIntegerField(default=1)),
+                ('listing', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='listings.listing')),
+            ],
+            options={
+                'unique_together': {('term', 'listing')},
+            },
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+        migrations.RunPython(backfill_search_documents, migrations.RunPython.noop),
+    ]
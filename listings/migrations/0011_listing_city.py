@@ -0,0 +1,69 @@
+# Generated by Django 5.2.6 on 2026-10-18 01:03
+
+from django.conf import settings
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+TRGM_INDEX = 'listing_city_key_trgm'
+
+
+def create_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        f'CREATE INDEX IF NOT EXISTS "{TRGM_INDEX}" ON "listings_listing" '
+        'USING gin ("city_key" gin_trgm_ops)'
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP INDEX IF EXISTS "{TRGM_INDEX}"')
+
+
+def backfill_cities(apps, schema_editor):
+    from listings.cities import derive_city, normalize_city
+    Listing = apps.get_model('listings', 'Listing')
+    UserProfile = apps.get_model('users', 'UserProfile')
+    db = schema_editor.connection.alias
+    profile_cities = dict(UserProfile.objects.using(db).exclude(city__isnull=True).values_list('user_id', 'city'))
+    batch = []
+    for listing in Listing.objects.using(db).only('id', 'location', 'created_by_id').iterator(chunk_size=500):
+        listing.city = derive_city(listing.location, profile_cities.get(listing.created_by_id))
+        listing.city_key = normalize_city(listing.city)
+        batch.append(listing)
+        if len(batch) >= 500:
+            Listing.objects.using(db).bulk_update(batch, ['city', 'city_key'])
+            batch = []
+    if batch:
+        Listing.objects.using(db).bulk_update(batch, ['city', 'city_key'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0010_listing_search_index'),
+        ('users', '0015_userprofile_provider_subchoices_tokens'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='listing',
+            name='city',
+            field=models.CharField(blank=True, default='', editable=False, max_length=120),
+        ),
+        migrations.AddField(
+            model_name='listing',
+            name='city_key',
+            field=models.CharField(blank=True, default='', editable=False, max_length=120),
+        ),
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(fields=['city_key'], name='listing_city_key_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+        migrations.RunPython(backfill_cities, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.6 on 2026-10-18 01:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_provider_tokens(apps, schema_editor):
+    Listing = apps.get_model('listings', 'Listing')
+    ListingProviderToken = apps.get_model('listings', 'ListingProviderToken')
+    UserProfile = apps.get_model('users', 'UserProfile')
+    db = schema_editor.connection.alias
+    tokens_by_user = {
+        user_id: {str(t).strip()[:255] for t in (tokens or []) if str(t).strip()}
+        for user_id, tokens in UserProfile.objects.using(db).values_list('user_id', 'provider_subchoice_tokens')
+    }
+    rows = []
+    for listing_id, user_id in Listing.objects.using(db).exclude(created_by__isnull=True).values_list('id', 'created_by_id').iterator():
+        rows.extend(ListingProviderToken(listing_id=listing_id, token=t) for t in tokens_by_user.get(user_id, ()))
+        if len(rows) >= 1000:
+            ListingProviderToken.objects.using(db).bulk_create(rows, ignore_conflicts=True)
+            rows = []
+    if rows:
+        ListingProviderToken.objects.using(db).bulk_create(rows, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0011_listing_city'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ListingProviderToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=255)),
+                ('listing', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='provider_tokens', to='listings.listing')),
+            ],
+            options={
+                'unique_together': {('token', 'listing')},
+            },
+        ),
+        migrations.RunPython(backfill_provider_tokens, migrations.RunPython.noop),
+    ]
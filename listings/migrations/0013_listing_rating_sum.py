@@ -0,0 +1,30 @@
+# Generated by Django 5.2.6 on 2026-10-18 01:16
+
+from django.db import migrations, models
+from django.db.models.functions import Round
+
+
+def backfill_rating_sum(apps, schema_editor):
+    # Seed the running sum from the current columns so existing ratings are kept;
+    # `recompute_listing_ratings` resyncs everything from the Review table.
+    Listing = apps.get_model('listings', 'Listing')
+    db = schema_editor.connection.alias
+    Listing.objects.using(db).filter(review_count__gt=0).update(
+        rating_sum=Round(models.F('rating') * models.F('review_count')),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0012_listing_provider_tokens'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='listing',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_rating_sum, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,66 @@
+from django.db import migrations
+
+CONSTRAINT = 'listing_avail_no_overlap'
+
+
+def check_no_overlapping_bookings(apps, schema_editor):
+    """Refuse to migrate while active bookings of one listing overlap.
+
+    Overlaps were possible before the constraint existed and would make ADD
+    CONSTRAINT fail with an opaque error. Which booking should give way is a
+    business decision, so the conflicting availability ids are reported and
+    the migration stops; resolve them (e.g. cancel one side) and re-run.
+    """
+    ListingAvailability = apps.get_model('listings', 'ListingAvailability')
+    active = (
+        ListingAvailability.objects.filter(status__in=('tentative', 'confirmed'))
+        .order_by('listing_id', 'start_date', 'id')
+        .values_list('id', 'listing_id', 'start_date', 'end_date')
+    )
+    conflicts = []
+    listing_id = latest = None
+    for pk, row_listing_id, start, end in active.iterator():
+        if row_listing_id != listing_id:
+            listing_id, latest = row_listing_id, None
+        # Sorted by start, so a row overlaps an earlier one exactly when it starts before the latest end so far
+        if latest is not None and start <= latest[1]:
+            conflicts.append((latest[0], pk))
+        if latest is None or end > latest[1]:
+            latest = (pk, end)
+    if conflicts:
+        pairs = ', '.join(f'{a}/{b}' for a, b in conflicts)
+        raise RuntimeError(
+            f'Cannot add {CONSTRAINT}: {len(conflicts)} overlapping pair(s) of active bookings in '
+            f'listings_listingavailability (conflicting ids: {pairs}). Cancel or move one side of each and re-run.'
+        )
+
+
+def create_exclusion_constraint(apps, schema_editor):
+    # Active bookings of one listing may not overlap; the constraint's GiST index
+    # (listing_id, daterange) also serves availability range queries.
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+    schema_editor.execute(
+        f'ALTER TABLE "listings_listingavailability" ADD CONSTRAINT "{CONSTRAINT}" '
+        f"EXCLUDE USING gist (\"listing_id\" WITH =, daterange(\"start_date\", \"end_date\", '[]') WITH &&) "
+        f"WHERE (\"status\" IN ('tentative', 'confirmed'))"
+    )
+
+
+def drop_exclusion_constraint(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'ALTER TABLE "listings_listingavailability" DROP CONSTRAINT IF EXISTS "{CONSTRAINT}"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0013_listing_rating_sum'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_no_overlapping_bookings, migrations.RunPython.noop),
+        migrations.RunPython(create_exclusion_constraint, drop_exclusion_constraint),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 01:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0015_image_asset'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='listing',
+            name='image_manifest',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
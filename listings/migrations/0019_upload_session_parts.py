@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 02:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0018_listing_timestamps'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='imageuploadsession',
+            name='parts',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
@@ -0,0 +1,31 @@
+from django.db import migrations
+
+TRGM_INDEX = 'listing_location_upper_trgm'
+
+
+def create_trigram_index(apps, schema_editor):
+    # `location__icontains` compiles to UPPER("location"::text) LIKE UPPER('%...%'),
+    # so the trigram index is on that expression
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        f'CREATE INDEX IF NOT EXISTS "{TRGM_INDEX}" ON "listings_listing" '
+        'USING gin (UPPER("location"::text) gin_trgm_ops)'
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP INDEX IF EXISTS "{TRGM_INDEX}"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0019_upload_session_parts'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
@@ -1,12 +1,14 @@
 from django.db import models
 from django.conf import settings
 from decimal import Decimal
+import uuid
 
 class Category(models.Model):
     name = models.CharField(max_length=100)
     slug = models.SlugField(max_length=100, unique=True)
     # Nested options per high-level category (e.g., gender -> roles). Flexible JSON to support future growth.
     subchoices = models.JSONField(default=dict, blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name_plural = "Categories"
@@ -21,10 +23,17 @@ class Listing(models.Model):
     # For Supabase/private bucket: store relative path; serializer expands to public/signed URL.
     image = models.CharField(max_length=500)
     image_thumb = models.CharField(max_length=500, blank=True, null=True)
+    # Responsive variants of `image` when it is a processed upload (see listings.media_pipeline)
+    image_manifest = models.JSONField(default=dict, blank=True, editable=False)
     rating = models.DecimalField(max_digits=3, decimal_places=2, default=Decimal('0.0'))
     review_count = models.PositiveIntegerField(default=0)
+    # Running total of review stars; rating = rating_sum / review_count (see reviews.aggregates)
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
     # Allow empty location for drafts; enforce later if needed on publish
     location = models.CharField(max_length=255, blank=True, null=True)
+    # Derived from location + provider profile city on save (see listings.cities)
+    city = models.CharField(max_length=120, blank=True, default='', editable=False)
+    city_key = models.CharField(max_length=120, blank=True, default='', editable=False)
     capacity = models.CharField(max_length=100, blank=True, null=True) # Allow null for non-venue items
     price_range = models.CharField(max_length=100, blank=True)
     price_min = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal('0.00'))
@@ -49,20 +58,80 @@ class Listing(models.Model):
     service_attrs = models.JSONField(default=dict, blank=True, null=True) # Renamed from specialty_attrs
     accessory_attrs = models.JSONField(default=dict, blank=True, null=True)
 
+    # Normalized text of the searchable fields; rebuilt on save (see listings.search)
+    search_document = models.TextField(blank=True, default='', editable=False)
+
+    # Bulk `.update()` paths must set `updated_at=Now()` themselves (auto_now only runs in save())
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        from . import cities, provider_tokens, search
+        update_fields = kwargs.get('update_fields')
+        derived = set()
+        owner = None
+        if update_fields is None or {'location', 'created_by'} & set(update_fields):
+            owner = provider_tokens.owner_profile(self.created_by_id)
+            cities.apply_city(self, owner['city'])
+            derived |= {'city', 'city_key'}
+        if update_fields is None or 'image' in update_fields:
+            from .media_pipeline import manifest_for_images
+            self.image_manifest = manifest_for_images([self.image]).get(self.image, {})
+            derived.add('image_manifest')
+        reindex = update_fields is None or bool(set(update_fields) & set(search.SEARCH_SOURCE_FIELDS))
+        if reindex:
+            self.search_document = search.build_search_document(self)
+            derived.add('search_document')
+        if self._state.adding and self.review_count and not self.rating_sum:
+            # Seeded/imported aggregates: keep rating_sum consistent so review deltas apply to it
+            self.rating_sum = int((Decimal(str(self.rating or 0)) * self.review_count).to_integral_value())
+        if update_fields:
+            kwargs['update_fields'] = {*update_fields, *derived, 'updated_at'}
+        super().save(*args, **kwargs)
+        if owner is not None:
+            provider_tokens.sync_listing_tokens([self.pk], owner['provider_subchoice_tokens'])
+        using = kwargs.get('using') or self._state.db or 'default'
+        if reindex and not search.uses_tsvector(using):
+            search.index_listing_terms(self, using=using)
+
     class Meta:
         indexes = [
-            models.Index(fields=["-featured", "-rating"], name="listing_featured_rating_idx"),
-            models.Index(fields=["rating"], name="listing_rating_idx"),
-            models.Index(fields=["price_min"], name="listing_price_min_idx"),
+            # Sort keys carry `id` as tiebreaker so keyset pagination seeks on the index
+            models.Index(fields=["-featured", "-rating", "id"], name="listing_feat_rating_id_idx"),
+            models.Index(fields=["-rating", "id"], name="listing_rating_id_idx"),
+            models.Index(fields=["price_min", "id"], name="listing_price_min_id_idx"),
             models.Index(fields=["category", "featured"], name="listing_category_featured_idx"),
             models.Index(fields=["status"], name="listing_status_idx"),
             models.Index(fields=["created_by"], name="listing_created_by_idx"),
+            # Prefix (LIKE 'x%') lookups for the city filter/autocomplete; pattern ops are Postgres-only
+            models.Index(fields=["city_key"], name="listing_city_key_idx", opclasses=["varchar_pattern_ops"]),
+            # Change feed seeks on (updated_at, id)
+            models.Index(fields=["updated_at", "id"], name="listing_updated_at_id_idx"),
         ]
 
 
+class ListingSearchTerm(models.Model):
+    """Inverted index row (term -> listing) used for search on non-Postgres backends."""
+    listing = models.ForeignKey(Listing, on_delete=models.CASCADE, related_name='search_terms')
+    term = models.CharField(max_length=64)
+    weight = models.PositiveSmallIntegerField(default=1)
+
+    class Meta:
+        unique_together = ('term', 'listing')
+
+
+class ListingProviderToken(models.Model):
+    """Owner's provider subchoice token copied per listing, for the `roles` filter (see listings.provider_tokens)."""
+    listing = models.ForeignKey(Listing, on_delete=models.CASCADE, related_name='provider_tokens')
+    token = models.CharField(max_length=255)
+
+    class Meta:
+        unique_together = ('token', 'listing')
+
+
 class ListingAvailability(models.Model):
     STATUS_TENTATIVE = 'tentative'
     STATUS_CONFIRMED = 'confirmed'
@@ -89,26 +158,82 @@ class ListingAvailability(models.Model):
 
     def clean(self):
         from django.core.exceptions import ValidationError
+        from . import availability
         if self.start_date > self.end_date:
             raise ValidationError('start_date must be <= end_date')
         # Skip overlap validation if canceled
         if self.status == self.STATUS_CANCELED:
             return
-        qs = ListingAvailability.objects.filter(
-            listing=self.listing,
-            status__in=[self.STATUS_TENTATIVE, self.STATUS_CONFIRMED],
-            start_date__lte=self.end_date,
-            end_date__gte=self.start_date,
-        )
-        if self.pk:
-            qs = qs.exclude(pk=self.pk)
-        if qs.exists():
-            raise ValidationError('Overlapping booking exists for this listing')
+        # Postgres enforces this with the exclusion constraint; save() maps the violation
+        if availability.enforced_by_database(self._state.db or 'default'):
+            return
+        if not availability.is_range_free(self.listing_id, self.start_date, self.end_date, exclude_pk=self.pk):
+            raise ValidationError(availability.OVERLAP_MESSAGE)
 
     def save(self, *args, **kwargs):
+        from django.core.exceptions import ValidationError
+        from django.db import IntegrityError, transaction
+        from . import availability
         self.full_clean()
-        return super().save(*args, **kwargs)
+        try:
+            with transaction.atomic(using=kwargs.get('using') or self._state.db or 'default'):
+                return super().save(*args, **kwargs)
+        except IntegrityError as exc:
+            if availability.EXCLUSION_CONSTRAINT in str(exc):
+                raise ValidationError(availability.OVERLAP_MESSAGE) from exc
+            raise
 
     def __str__(self):
         return f"{self.listing_id} {self.start_date}→{self.end_date} ({self.status})"
 
+
+
+class ImageAsset(models.Model):
+    """An uploaded original and the variants generated from it in the background."""
+    STATUS_PENDING = 'pending'
+    STATUS_PROCESSING = 'processing'
+    STATUS_READY = 'ready'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = (
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_PROCESSING, 'Processing'),
+        (STATUS_READY, 'Ready'),
+        (STATUS_FAILED, 'Failed'),
+    )
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='image_assets')
+    # Storage-relative path of the original (what listings store in `image`)
+    path = models.CharField(max_length=500, unique=True)
+    backend = models.CharField(max_length=20, default='local')
+    content_type = models.CharField(max_length=100, blank=True)
+    size = models.PositiveIntegerField(default=0)
+    status = models.CharField(max_length=12, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    # Generated outputs, e.g. {"thumb": "thumbs/<name>.jpg"}
+    variants = models.JSONField(default=dict, blank=True)
+    error = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.path} ({self.status})"
+
+
+class ImageUploadSession(models.Model):
+    """A resumable chunked upload: each received range is a part object in media storage until `size` is reached."""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='image_upload_sessions')
+    filename = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100)
+    size = models.PositiveIntegerField()
+    received = models.PositiveIntegerField(default=0)
+    # Storage paths of the accepted ranges, in order; only grows together with `received`
+    parts = models.JSONField(default=list, blank=True)
+    asset = models.OneToOneField(ImageAsset, on_delete=models.SET_NULL, null=True, blank=True, related_name='upload_session')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @property
+    def complete(self) -> bool:
+        return self.received >= self.size
+
+    def __str__(self):
+        return f"{self.filename} {self.received}/{self.size}"
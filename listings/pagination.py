@@ -0,0 +1,14 @@
+from rest_framework.pagination import PageNumberPagination
+
+from core.pagination import KeysetPagination
+
+
+class StandardResultsSetPagination(PageNumberPagination):
+    page_size = 12
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class ListingKeysetPagination(KeysetPagination):
+    """Opt-in cursor pagination for the listing catalogue (see core.pagination)."""
+    page_size = 12
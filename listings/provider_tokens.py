@@ -0,0 +1,48 @@
+"""Denormalized provider subchoice tokens per listing.
+
+`UserProfile.provider_subchoice_tokens` (e.g. ["Gender:Women", "Role:Stylist"])
+is copied into `ListingProviderToken` rows for each of the provider's listings,
+so the `roles` filter is one indexed semi-join
+(`id IN (SELECT listing_id ... WHERE token IN (...))`) instead of a JSON
+containment check per row through auth_user -> users_userprofile.
+"""
+
+
+def owner_profile(user_id) -> dict:
+    """City and tokens of a listing owner's profile (empty values when there is none)."""
+    empty = {'city': None, 'provider_subchoice_tokens': []}
+    if not user_id:
+        return empty
+    from users.models import UserProfile
+    row = UserProfile.objects.filter(user_id=user_id).values('city', 'provider_subchoice_tokens').first()
+    return row or empty
+
+
+def _clean(tokens) -> set[str]:
+    if not isinstance(tokens, (list, tuple)):
+        return set()
+    return {str(t).strip()[:255] for t in tokens if str(t).strip()}
+
+
+def sync_listing_tokens(listing_ids, tokens) -> None:
+    """Make the token rows of `listing_ids` equal `tokens` (diff-applied)."""
+    from .models import ListingProviderToken
+    listing_ids = list(listing_ids)
+    if not listing_ids:
+        return
+    desired = _clean(tokens)
+    existing: dict[int, set[str]] = {pk: set() for pk in listing_ids}
+    for listing_id, token in ListingProviderToken.objects.filter(listing_id__in=listing_ids).values_list('listing_id', 'token'):
+        existing[listing_id].add(token)
+    stale = [(pk, t) for pk, have in existing.items() for t in have - desired]
+    missing = [ListingProviderToken(listing_id=pk, token=t) for pk, have in existing.items() for t in desired - have]
+    if stale:
+        ListingProviderToken.objects.filter(listing_id__in={pk for pk, _ in stale}).exclude(token__in=desired).delete()
+    if missing:
+        ListingProviderToken.objects.bulk_create(missing, ignore_conflicts=True)
+
+
+def refresh_provider_tokens(user_id, tokens) -> None:
+    """Re-sync every listing owned by `user_id` after its profile tokens changed."""
+    from .models import Listing
+    sync_listing_tokens(Listing.objects.filter(created_by_id=user_id).values_list('id', flat=True), tokens)
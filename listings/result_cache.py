@@ -0,0 +1,150 @@
+"""Versioned cache for public listing result pages.
+
+Pages are cached under keys that embed generation counters:
+
+- `listings:gen:all`            bumped on any listing change (used by queries spanning categories)
+- `listings:gen:cat:<slug>`     bumped when a listing in that category changes
+
+Writes never delete cached pages; they bump the counters so every later read
+computes a fresh key, and the stale entries simply age out. Bumps happen
+immediately and again on commit, so a reader racing the writing transaction
+cannot pin pre-commit data under the new generation.
+"""
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .cities import normalize_city
+from .search import tokenize
+
+GLOBAL_GENERATION_KEY = 'listings:gen:all'
+CATEGORY_GENERATION_KEY = 'listings:gen:cat:{slug}'
+PAGE_KEY_PREFIX = 'listings:page:v1'
+
+# Params of the public listing search that may be served from cache
+LISTING_QUERY_PARAMS = frozenset({
+    'cat', 'city', 'minPrice', 'maxPrice', 'ratingGte', 'sort', 'roles', 'customization',
+    'search', 'page', 'page_size', 'cursor', 'count', 'availableFrom', 'availableTo',
+})
+
+
+def page_cache_ttl() -> int:
+    return int(getattr(settings, 'LISTING_PAGE_CACHE_TTL', 600) or 0)
+
+
+def _generation_keys(category_slugs) -> list[str]:
+    return [GLOBAL_GENERATION_KEY] + [CATEGORY_GENERATION_KEY.format(slug=s) for s in sorted(set(category_slugs)) if s]
+
+
+def _bump(keys) -> None:
+    for key in keys:
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Missing (never set or evicted): start from a fresh, never-reused value
+            cache.add(key, time.time_ns(), timeout=None)
+
+
+def bump_listing_generations(category_slugs=()) -> None:
+    """Invalidate cached pages for the given categories and every cross-category page."""
+    keys = _generation_keys(category_slugs)
+    _bump(keys)
+    transaction.on_commit(lambda: _bump(keys))
+
+
+def bump_for_category_ids(category_ids) -> None:
+    from .models import Category
+    ids = {pk for pk in category_ids if pk}
+    slugs = list(Category.objects.filter(pk__in=ids).values_list('slug', flat=True)) if ids else []
+    bump_listing_generations(slugs)
+
+
+def bump_for_provider(user_id) -> None:
+    """Invalidate pages that may include listings owned by `user_id` (profile-derived fields)."""
+    from .models import Listing
+    category_ids = set(Listing.objects.filter(created_by_id=user_id).values_list('category_id', flat=True).distinct())
+    if category_ids:
+        bump_for_category_ids(category_ids)
+
+
+def _generations(category_slug=None) -> list:
+    # Category-scoped pages depend only on their category's counter
+    keys = [CATEGORY_GENERATION_KEY.format(slug=category_slug)] if category_slug else [GLOBAL_GENERATION_KEY]
+    found = cache.get_many(keys)
+    missing = [k for k in keys if k not in found]
+    for key in missing:
+        cache.add(key, time.time_ns(), timeout=None)
+    if missing:
+        found.update(cache.get_many(missing))
+    return [found.get(k) for k in keys]
+
+
+def _number(raw) -> str:
+    try:
+        return repr(float(raw))
+    except (TypeError, ValueError):
+        return ''
+
+
+def normalize_listing_params(params, allowed):
+    """Canonical form of the listing query params, or None when a param outside `allowed` is present."""
+    if any(k not in allowed for k in params.keys()):
+        return None
+    # Only fold values the view itself treats as equivalent (e.g. city is normalized
+    # there too, but `cat` is matched verbatim and so stays verbatim here).
+    get = lambda k: params.get(k) or ''
+    roles = sorted({t.strip() for t in get('roles').split(',') if t.strip()})
+    normalized = {
+        'cat': get('cat'),
+        'city': normalize_city(get('city')),
+        'minPrice': _number(get('minPrice')) if get('minPrice') else '',
+        'maxPrice': _number(get('maxPrice')) if get('maxPrice') else '',
+        'ratingGte': _number(get('ratingGte')) if get('ratingGte') else '',
+        'sort': get('sort'),
+        'roles': ','.join(roles),
+        'customization': get('customization').lower(),
+        'search': ' '.join(tokenize(get('search'))),
+        'availableFrom': get('availableFrom'),
+        'availableTo': get('availableTo'),
+        'page': '' if get('page').strip() in ('', '1') else get('page').strip(),
+        'page_size': get('page_size').strip(),
+        'cursor': params.get('cursor'),
+        'count': get('count'),
+    }
+    # An empty ?cursor= (first keyset page) differs from no cursor at all
+    return {k: v for k, v in normalized.items() if v or (k == 'cursor' and v is not None)}
+
+
+def listing_page_cache_key(request, allowed, category_param='cat'):
+    """Versioned cache key for a public listing read, or None if it should not be cached."""
+    if request.method != 'GET' or page_cache_ttl() <= 0:
+        return None
+    normalized = normalize_listing_params(request.query_params, allowed)
+    if normalized is None:
+        return None
+    generations = _generations(normalized.get(category_param))
+    # Paginated payloads embed absolute next/previous links
+    basis = json.dumps([request.path, request.get_host(), request.scheme, normalized], sort_keys=True, separators=(',', ':'))
+    digest = hashlib.sha1(basis.encode('utf-8')).hexdigest()
+    return f"{PAGE_KEY_PREFIX}:{'.'.join(str(g) for g in generations)}:{digest}"
+
+
+class CachedListMixin:
+    """Serve anonymous-safe GET list responses from the versioned page cache."""
+    cache_query_params = LISTING_QUERY_PARAMS
+
+    def list(self, request, *args, **kwargs):
+        from rest_framework.response import Response
+        key = listing_page_cache_key(request, self.cache_query_params)
+        if key is not None:
+            cached = cache.get(key)
+            if cached is not None:
+                return Response(cached)
+        response = super().list(request, *args, **kwargs)
+        if key is not None and response.status_code == 200:
+            cache.set(key, response.data, page_cache_ttl())
+        return response
@@ -0,0 +1,169 @@
+"""Listing full-text search.
+
+Every listing keeps a normalized `search_document` (title, type label, location,
+features and the per-vertical `*_attrs` values) that is rebuilt on save.
+
+- Postgres: the document is matched through a GIN index on
+  `to_tsvector('simple', search_document)` with prefix tsquery terms
+  (`photo:*`) and ranked with `ts_rank`.
+- Other backends (SQLite in dev/tests): a small inverted index
+  (`ListingSearchTerm`: term -> listing, weight) is maintained alongside and
+  queried by term prefix lookups.
+
+Each query word matches as a prefix of an indexed word, so "photo" still
+finds "photography" as `icontains` used to.
+
+Either way a search is an index lookup, not an `ILIKE '%term%'` table scan.
+"""
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVectorField
+from django.db import connections
+from django.db.models import F, Func, OuterRef, Q, Subquery, Sum
+from rest_framework import filters
+
+# Fields whose change requires the document to be rebuilt
+SEARCH_SOURCE_FIELDS = (
+    'title',
+    'type_label',
+    'location',
+    'features',
+    'venue_attrs',
+    'attire_attrs',
+    'catering_attrs',
+    'rental_attrs',
+    'service_attrs',
+    'accessory_attrs',
+)
+
+# Per-field weights for the inverted index ranking (title matches rank first)
+FIELD_WEIGHTS = {'title': 4, 'type_label': 2, 'location': 2, 'features': 1}
+DEFAULT_WEIGHT = 1
+
+MAX_TERM_LENGTH = 64
+TSVECTOR_CONFIG = 'simple'
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(text: str) -> list[str]:
+    return [t for t in _TOKEN_RE.findall((text or '').lower()) if 1 < len(t) <= MAX_TERM_LENGTH]
+
+
+def _flatten(value) -> list[str]:
+    """Collect scalar values from nested JSON (keys are schema, not content)."""
+    if value is None or isinstance(value, bool):
+        return []
+    if isinstance(value, dict):
+        return [s for v in value.values() for s in _flatten(v)]
+    if isinstance(value, (list, tuple)):
+        return [s for v in value for s in _flatten(v)]
+    return [str(value)]
+
+
+def _field_texts(listing) -> list[tuple[str, str]]:
+    pairs = []
+    for name in SEARCH_SOURCE_FIELDS:
+        value = getattr(listing, name, None)
+        if name in FIELD_WEIGHTS and not isinstance(value, (list, dict)):
+            text = str(value or '')
+        else:
+            text = ' '.join(_flatten(value))
+        if text.strip():
+            pairs.append((name, text))
+    return pairs
+
+
+def build_search_document(listing) -> str:
+    return ' '.join(' '.join(tokenize(text)) for _, text in _field_texts(listing)).strip()
+
+
+def build_search_terms(listing) -> dict[str, int]:
+    """Map each distinct term to its weight (best field wins, repeats add up)."""
+    terms: dict[str, int] = {}
+    for name, text in _field_texts(listing):
+        weight = FIELD_WEIGHTS.get(name, DEFAULT_WEIGHT)
+        for term in tokenize(text):
+            terms[term] = terms.get(term, 0) + weight
+    return terms
+
+
+def uses_tsvector(using: str = 'default') -> bool:
+    return connections[using].vendor == 'postgresql'
+
+
+def index_listing_terms(listing, using: str = 'default') -> None:
+    """Refresh the inverted index rows for one listing (non-Postgres backends)."""
+    from .models import ListingSearchTerm
+    ListingSearchTerm.objects.using(using).filter(listing_id=listing.pk).delete()
+    ListingSearchTerm.objects.using(using).bulk_create([
+        ListingSearchTerm(listing_id=listing.pk, term=term, weight=min(weight, 32767))
+        for term, weight in build_search_terms(listing).items()
+    ])
+
+
+def bulk_index_listing_terms(listings, using: str = 'default') -> None:
+    """Index freshly inserted listings in one bulk insert (they have no rows to replace)."""
+    from .models import ListingSearchTerm
+    ListingSearchTerm.objects.using(using).bulk_create([
+        ListingSearchTerm(listing_id=listing.pk, term=term, weight=min(weight, 32767))
+        for listing in listings
+        for term, weight in build_search_terms(listing).items()
+    ], batch_size=1000)
+
+
+def search_vector():
+    # Must stay textually identical to the GIN expression index in the migration
+    return Func(
+        F('search_document'),
+        template=f"to_tsvector('{TSVECTOR_CONFIG}'::regconfig, %(expressions)s)",
+        output_field=SearchVectorField(),
+    )
+
+
+def search_listings(queryset, query: str):
+    """Filter `queryset` to listings matching every term of `query` (as a prefix), annotated with `search_rank`."""
+    terms = tokenize(query)
+    if not terms:
+        return queryset
+    distinct = sorted(set(terms))
+    if uses_tsvector(queryset.db):
+        # Tokens are \w+ only, so quoting them is enough to make the raw tsquery safe
+        ts_query = SearchQuery(' & '.join(f"'{term}':*" for term in distinct), config=TSVECTOR_CONFIG, search_type='raw')
+        vector = search_vector()
+        return queryset.alias(search_vec=vector).filter(search_vec=ts_query).annotate(
+            search_rank=SearchRank(vector, ts_query),
+        )
+
+    from .models import ListingSearchTerm
+    for term in distinct:
+        queryset = queryset.filter(id__in=ListingSearchTerm.objects.filter(term__startswith=term).values('listing_id'))
+    any_term = Q()
+    for term in distinct:
+        any_term |= Q(term__startswith=term)
+    rank = (
+        ListingSearchTerm.objects.filter(any_term, listing_id=OuterRef('pk'))
+        .values('listing_id')
+        .annotate(rank=Sum('weight'))
+        .values('rank')
+    )
+    return queryset.annotate(search_rank=Subquery(rank[:1]))
+
+
+class ListingSearchFilter(filters.BaseFilterBackend):
+    """`?search=` backed by the listing search index.
+
+    Results are ranked by relevance unless the client picked an explicit sort.
+    """
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '')
+        if not query.strip():
+            return queryset
+        queryset = search_listings(queryset, query)
+        if 'search_rank' in queryset.query.annotations:
+            params = request.query_params
+            if not params.get('sort') and not params.get('ordering'):
+                queryset = queryset.order_by('-search_rank', 'id')
+        return queryset
@@ -1,7 +1,20 @@
 from rest_framework import serializers
-from django.conf import settings
-from .models import Category, Listing, ListingAvailability
-from django.db import IntegrityError, transaction
+from .models import Category, ImageAsset, Listing, ListingAvailability
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import IntegrityError, models, transaction
+from .media_urls import MediaURLResolver, listing_media_paths
+
+
+class ListingMediaListSerializer(serializers.ListSerializer):
+    """Collects every row's stored media paths first, so private-bucket URLs are signed in one batch."""
+
+    def to_representation(self, data):
+        rows = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        MediaURLResolver.for_context(self.context).prefetch(
+            path for listing in rows for path in listing_media_paths(listing)
+        )
+        return super().to_representation(rows)
+
 
 class CategorySerializer(serializers.ModelSerializer):
     key = serializers.CharField(source='slug')
@@ -53,6 +66,9 @@ class ListingSerializer(serializers.ModelSerializer):
             'provider_city',
             'provider_country',
         ]
+        # Maintained from reviews (see reviews.aggregates), never by the provider
+        read_only_fields = ['rating', 'review_count']
+        list_serializer_class = ListingMediaListSerializer
 
     def validate(self, attrs):
         # Enforce attire-bridal attribute schema basics according to roadmap
@@ -65,7 +81,11 @@ class ListingSerializer(serializers.ModelSerializer):
                 slug = raw.get('slug')
             elif isinstance(raw, str):
                 slug = raw
-            if slug:
+            categories = self.context.get('categories_by_slug')
+            if slug and categories is not None:
+                # Bulk import resolves categories once for the whole upload
+                category_obj = categories.get(slug)
+            elif slug:
                 try:
                     category_obj = Category.objects.filter(slug=slug).first()
                 except Exception:
@@ -113,33 +133,7 @@ class ListingSerializer(serializers.ModelSerializer):
         return super().validate(attrs)
 
     def _represent_image(self, instance: Listing):
-        url = (instance.image or '').strip()
-        if not url:
-            return '/src/assets/luxury-wedding-hall.jpg'
-        # Pass through absolute or vite asset path
-        if url.startswith(('http://', 'https://', '/src/assets/')):
-            return url
-        # If using Supabase and we stored a relative path (uploads/...) build public URL
-        from django.conf import settings as dj_settings
-        backend = getattr(dj_settings, 'MEDIA_STORAGE_BACKEND', 'local')
-        supabase_url = getattr(dj_settings, 'SUPABASE_URL', '')
-        bucket = getattr(dj_settings, 'SUPABASE_BUCKET', '')
-        if backend in ('supabase', 'auto') and supabase_url and bucket and url.startswith('uploads/'):
-            return f"{supabase_url}/storage/v1/object/public/{bucket}/{url}"
-        request = self.context.get('request')
-        # Backend assets path
-        if url.startswith(('assets/', '/assets/')):
-            path = url.lstrip('/')
-            abs_url = f"{settings.BACKEND_ASSETS_URL}{path.split('assets/', 1)[-1]}"
-            if request:
-                return request.build_absolute_uri(abs_url)
-            return abs_url
-        # Treat as relative media path
-        media_path = url.lstrip('/')
-        abs_url = f"{settings.MEDIA_URL}{media_path}"
-        if request:
-            return request.build_absolute_uri(abs_url)
-        return abs_url
+        return MediaURLResolver.for_context(self.context).image(instance.image)
 
     def create(self, validated_data):
         # validated_data['category'] will be {'slug': 'value'} because of source mapping
@@ -173,9 +167,9 @@ class ListingSerializer(serializers.ModelSerializer):
                     except Category.DoesNotExist:
                         raise serializers.ValidationError({'category': 'Invalid category slug'})
             validated_data['category'] = category
-        # Ensure defaults for immutable provider-managed fields
-        validated_data.setdefault('rating', 0)
-        validated_data.setdefault('review_count', 0)
+        # Review aggregates start empty; reviews.aggregates maintains them from here
+        validated_data['rating'] = 0
+        validated_data['review_count'] = 0
         request = self.context.get('request')
         if request and request.user and request.user.is_authenticated:
             validated_data['created_by'] = request.user
@@ -208,24 +202,71 @@ class ListingSerializer(serializers.ModelSerializer):
         return None
 
     def to_representation(self, instance: Listing):
+        resolver = MediaURLResolver.for_context(self.context)
+        # Detail views: sign every path in one batch (a no-op when the list serializer already did)
+        resolver.prefetch(listing_media_paths(instance))
         data = super().to_representation(instance)
         # Re-map image to fully-qualified/normalized path like previous get_image implementation
-        data['image'] = self._represent_image(instance)
-        thumb = (instance.image_thumb or '').strip()
-        if thumb:
-            from django.conf import settings as dj_settings
-            supabase_url = getattr(dj_settings, 'SUPABASE_URL', '')
-            bucket = getattr(dj_settings, 'SUPABASE_BUCKET', '')
-            backend = getattr(dj_settings, 'MEDIA_STORAGE_BACKEND', 'local')
-            if backend in ('supabase','auto') and supabase_url and bucket and thumb.startswith('thumbs/'):
-                data['image_thumb'] = f"{supabase_url}/storage/v1/object/public/{bucket}/{thumb}"  # For private bucket you may issue a fresh signed URL elsewhere
-            else:
-                data['image_thumb'] = thumb
-        else:
-            data['image_thumb'] = None
+        data['image'] = resolver.image(instance.image)
+        data['image_thumb'] = resolver.thumb(instance.image_thumb)
+        data['image_srcset'] = resolver.srcset(instance.image_manifest)
+        data['image_sources'] = resolver.sources(instance.image_manifest)
+        data['image_placeholder'] = (instance.image_manifest or {}).get('placeholder')
         return data
 
 
+class ListingListSerializer(serializers.BaseSerializer):
+    """Read-only fast path for listing list endpoints.
+
+    Emits the same payload as `ListingSerializer` but builds each row as a plain
+    dict: no per-row field binding, URL config resolved once per request, and the
+    provider profile read from `select_related('created_by__profile')`.
+    """
+    _rating = serializers.DecimalField(max_digits=3, decimal_places=2)
+    _price_min = serializers.DecimalField(max_digits=10, decimal_places=2)
+    _published_at = serializers.DateTimeField()
+
+    class Meta:
+        list_serializer_class = ListingMediaListSerializer
+
+    def to_representation(self, instance: Listing):
+        resolver = MediaURLResolver.for_context(self.context)
+        user = instance.created_by
+        profile = getattr(user, 'profile', None) if user is not None else None
+        return {
+            'id': instance.id,
+            'title': instance.title,
+            'category': instance.category.slug,
+            'type_label': instance.type_label,
+            'image': resolver.image(instance.image),
+            'image_thumb': resolver.thumb(instance.image_thumb),
+            'rating': self._rating.to_representation(instance.rating),
+            'review_count': instance.review_count,
+            'location': instance.location,
+            'capacity': instance.capacity,
+            'price_range': instance.price_range,
+            'price_min': self._price_min.to_representation(instance.price_min),
+            'features': instance.features,
+            'badges': instance.badges,
+            'featured': instance.featured,
+            'venue_attrs': instance.venue_attrs,
+            'attire_attrs': instance.attire_attrs,
+            'catering_attrs': instance.catering_attrs,
+            'rental_attrs': instance.rental_attrs,
+            'service_attrs': instance.service_attrs,
+            'accessory_attrs': instance.accessory_attrs,
+            'status': instance.status,
+            'published_at': self._published_at.to_representation(instance.published_at) if instance.published_at else None,
+            'created_by': instance.created_by_id,
+            'provider_name': (getattr(profile, 'business_name', None) or user.username) if user is not None else None,
+            'provider_city': getattr(profile, 'city', None),
+            'provider_country': getattr(profile, 'country', None),
+            'image_srcset': resolver.srcset(instance.image_manifest),
+            'image_sources': resolver.sources(instance.image_manifest),
+            'image_placeholder': (instance.image_manifest or {}).get('placeholder'),
+        }
+
+
 class ListingAvailabilitySerializer(serializers.ModelSerializer):
     listing = serializers.PrimaryKeyRelatedField(read_only=True)
 
@@ -245,4 +286,28 @@ class ListingAvailabilitySerializer(serializers.ModelSerializer):
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             validated_data['created_by'] = request.user
-        return super().create(validated_data)
+        try:
+            return super().create(validated_data)
+        except DjangoValidationError as exc:
+            # Model-level overlap check (or DB exclusion constraint) -> 400, not 500
+            raise serializers.ValidationError(exc.messages)
+
+
+class ImageAssetSerializer(serializers.ModelSerializer):
+    url = serializers.SerializerMethodField()
+    thumb_path = serializers.SerializerMethodField()
+    thumb_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ImageAsset
+        fields = ['id', 'status', 'path', 'url', 'thumb_path', 'thumb_url', 'variants', 'error', 'created_at', 'updated_at']
+        read_only_fields = fields
+
+    def get_url(self, obj: ImageAsset):
+        return MediaURLResolver.for_context(self.context).image(obj.path)
+
+    def get_thumb_path(self, obj: ImageAsset):
+        return (obj.variants or {}).get('thumb')
+
+    def get_thumb_url(self, obj: ImageAsset):
+        return MediaURLResolver.for_context(self.context).thumb(self.get_thumb_path(obj))
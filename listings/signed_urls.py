@@ -0,0 +1,70 @@
+"""Signed download URLs for private Supabase buckets.
+
+`sign_paths()` answers from the cache where it can and signs every remaining
+path with a single batch call to storage. Each signature is cached for
+`SUPABASE_SIGNED_URL_TTL` minus `SUPABASE_SIGNED_URL_REFRESH_MARGIN`, so a
+cached URL (or a cached result page embedding it) always has at least the
+margin left before it expires.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .media_storage import SupabaseMediaStorage
+
+KEY_PREFIX = 'media:signed'
+
+
+def private_bucket_enabled() -> bool:
+    return bool(
+        getattr(settings, 'SUPABASE_PRIVATE_BUCKET', False)
+        and getattr(settings, 'MEDIA_STORAGE_BACKEND', 'local') in ('supabase', 'auto')
+        and getattr(settings, 'SUPABASE_URL', '')
+        and getattr(settings, 'SUPABASE_BUCKET', '')
+    )
+
+
+def signed_url_ttl() -> int:
+    return int(getattr(settings, 'SUPABASE_SIGNED_URL_TTL', 3600))
+
+
+def cache_timeout() -> int:
+    ttl = signed_url_ttl()
+    margin = int(getattr(settings, 'SUPABASE_SIGNED_URL_REFRESH_MARGIN', 900))
+    # Never cache past half the lifetime when the margin is misconfigured
+    return max(ttl - margin, ttl // 2)
+
+
+def signature_epoch():
+    """Changes whenever cached signatures may have been reissued; None for public buckets.
+
+    Folded into conditional-GET validators so a 304 never pins URLs that are about to expire.
+    """
+    if not private_bucket_enabled():
+        return None
+    return int(time.time()) // cache_timeout()
+
+
+def _key(path: str) -> str:
+    # TTL in the key so changing it doesn't serve signatures issued under the old one
+    return f"{KEY_PREFIX}:{signed_url_ttl()}:{path}"
+
+
+def sign_paths(paths, storage=None) -> dict:
+    """{path: signed URL} for every signable path, with at most one storage call.
+
+    Raises MediaStorageError when the batch call fails; paths storage refused are omitted.
+    """
+    wanted = list(dict.fromkeys(p for p in paths if p))
+    if not wanted:
+        return {}
+    cached = cache.get_many([_key(p) for p in wanted])
+    signed = {p: cached[_key(p)] for p in wanted if _key(p) in cached}
+    missing = [p for p in wanted if p not in signed]
+    if missing:
+        fresh = (storage or SupabaseMediaStorage()).sign_urls(missing, signed_url_ttl())
+        if fresh:
+            cache.set_many({_key(p): url for p, url in fresh.items()}, cache_timeout())
+        signed.update(fresh)
+    return signed
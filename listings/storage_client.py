@@ -0,0 +1,131 @@
+"""Shared HTTP client for the media storage service (Supabase Storage).
+
+One `requests.Session` per process keeps TLS connections to storage alive and
+pooled instead of opening one per call. Every request names an operation,
+which picks its (connect, read) timeout and whether it may be retried:
+idempotent operations get a bounded number of retries with exponential
+backoff on connection errors and 502/503/504. A circuit breaker counts
+consecutive failures across all operations; once `STORAGE_BREAKER_THRESHOLD`
+is reached, calls fail fast with a 503 `MediaStorageError` for
+`STORAGE_BREAKER_COOLDOWN` seconds before a single trial call is let through.
+"""
+import os
+import random
+import threading
+import time
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+from .media_storage import MediaStorageError
+
+CONNECT_TIMEOUT = 3.05
+# operation -> (read timeout seconds, retries)
+OPERATIONS = {
+    'upload': (30, 0),  # request bodies are streamed once; the Celery task retries whole jobs
+    'download': (15, 2),
+    'sign': (5, 2),
+    'stat': (5, 2),
+    'delete': (5, 2),
+}
+RETRY_STATUSES = frozenset({502, 503, 504})
+BACKOFF_BASE = 0.2
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker: closed -> open (fail fast) -> half-open (one trial) -> closed."""
+
+    def __init__(self, threshold, cooldown, clock=time.monotonic):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self.half_open = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            now = self.clock()
+            if now - self.opened_at < self.cooldown:
+                return False
+            # Half-open: this caller is the single trial. Restarting the cooldown keeps every
+            # concurrent caller failing fast until it reports back (or, if it never does,
+            # until another cooldown has passed).
+            self.opened_at = now
+            self.half_open = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.half_open = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            if self.half_open:
+                # Failed trial: straight back to open
+                self.opened_at = self.clock()
+                self.half_open = False
+                return
+            self.failures += 1
+            if self.failures >= self.threshold:
+                self.opened_at = self.clock()
+
+
+class StorageClient:
+    def __init__(self):
+        self.session = requests.Session()
+        pool_size = getattr(settings, 'STORAGE_HTTP_POOL_SIZE', 10)
+        # Retries are handled in request() so they share the breaker's accounting
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.breaker = CircuitBreaker(
+            getattr(settings, 'STORAGE_BREAKER_THRESHOLD', 5),
+            getattr(settings, 'STORAGE_BREAKER_COOLDOWN', 30),
+        )
+
+    def request(self, method, url, op, **kwargs) -> requests.Response:
+        """Send one storage request; returns the response (any status) or raises MediaStorageError."""
+        read_timeout, retries = OPERATIONS[op]
+        kwargs.setdefault('timeout', (CONNECT_TIMEOUT, read_timeout))
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                raise MediaStorageError('Storage temporarily unavailable', status_code=503)
+            try:
+                resp = self.session.request(method, url, **kwargs)
+            except requests.RequestException as exc:
+                self.breaker.record_failure()
+                if attempt >= retries:
+                    raise MediaStorageError(f'Storage {op} error: {exc}') from exc
+            else:
+                if resp.status_code not in RETRY_STATUSES:
+                    self.breaker.record_success()
+                    return resp
+                self.breaker.record_failure()
+                if attempt >= retries:
+                    return resp
+            time.sleep(BACKOFF_BASE * 2 ** attempt * (1 + random.random()))
+            attempt += 1
+
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+
+def get_storage_client() -> StorageClient:
+    """The process-wide client (recreated after fork so workers never share sockets)."""
+    global _client, _client_pid
+    pid = os.getpid()
+    if _client is None or _client_pid != pid:
+        with _client_lock:
+            if _client is None or _client_pid != pid:
+                _client, _client_pid = StorageClient(), pid
+    return _client
@@ -0,0 +1,60 @@
+import logging
+
+from celery import shared_task
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(bind=True, max_retries=3)
+def process_image_asset(self, asset_id: int) -> str:
+    """Generate the variants of an uploaded original and mark the asset ready (or failed)."""
+    from .media_pipeline import attach_to_listings, build_variants
+    from .media_storage import MediaStorageError, get_media_storage
+    from .models import ImageAsset
+
+    asset = ImageAsset.objects.filter(pk=asset_id).first()
+    if asset is None or asset.status == ImageAsset.STATUS_READY:
+        return "skipped"
+    ImageAsset.objects.filter(pk=asset_id).update(status=ImageAsset.STATUS_PROCESSING)
+    try:
+        storage = get_media_storage()
+        asset.variants = build_variants(asset, storage.read(asset.path), storage=storage)
+    except MediaStorageError as exc:
+        # Storage hiccup: retry with backoff, then give up
+        if not self.request.called_directly and self.request.retries < self.max_retries:
+            ImageAsset.objects.filter(pk=asset_id).update(status=ImageAsset.STATUS_PENDING)
+            raise self.retry(exc=exc, countdown=5 * 2 ** self.request.retries)
+        logger.warning("Image variants failed for asset %s: %s", asset_id, exc)
+        ImageAsset.objects.filter(pk=asset_id).update(status=ImageAsset.STATUS_FAILED, error=str(exc)[:255])
+        return "failed"
+    except Exception as exc:  # undecodable image and similar: not retryable
+        logger.exception("Image variants failed for asset %s", asset_id)
+        ImageAsset.objects.filter(pk=asset_id).update(status=ImageAsset.STATUS_FAILED, error=str(exc)[:255])
+        return "failed"
+    asset.status = ImageAsset.STATUS_READY
+    asset.error = ''
+    asset.save(update_fields=['variants', 'status', 'error', 'updated_at'])
+    attach_to_listings(asset)
+    return "ready"
+
+
+@shared_task(bind=True)
+def purge_stale_upload_sessions(self) -> str:
+    """Drop unfinished resumable uploads (and their stored parts) older than UPLOAD_SESSION_TTL_HOURS."""
+    from datetime import timedelta
+
+    from django.conf import settings
+    from django.utils import timezone
+
+    from .media_storage import get_media_storage
+    from .models import ImageUploadSession
+    from .uploads import discard_parts
+
+    cutoff = timezone.now() - timedelta(hours=getattr(settings, 'UPLOAD_SESSION_TTL_HOURS', 24))
+    stale = list(ImageUploadSession.objects.filter(asset__isnull=True, updated_at__lt=cutoff))
+    storage = get_media_storage() if any(s.parts for s in stale) else None
+    for session in stale:
+        if session.parts:
+            discard_parts(session.parts, storage)
+    ImageUploadSession.objects.filter(pk__in=[s.pk for s in stale]).delete()
+    return f"purged {len(stale)}"
@@ -1,9 +1,22 @@
-from django.test import TestCase
+from datetime import date
+import io
+import os
+import shutil
+import tempfile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase, override_settings
 from django.contrib.auth import get_user_model
-from rest_framework.test import APIClient
+from rest_framework.test import APIClient, APIRequestFactory
 from django.urls import reverse
-from listings.models import Category, Listing
+from listings.availability import Calendar
+from listings.serializers import ListingListSerializer, ListingSerializer
+from listings.models import Category, ImageAsset, ImageUploadSession, Listing, ListingAvailability
 from users.models import UserProfile
+from urllib.parse import parse_qs, urlparse
+from unittest import mock
+import requests
+import base64
+import json
 
 
 User = get_user_model()
@@ -49,10 +62,14 @@ class ListingOwnershipTests(TestCase):
 			'image': 'http://example.com/x.jpg',
 			'location': 'City',
 			'price_min': '1000.00',
+			# Review aggregates are not provider-writable
+			'rating': '5.00',
+			'review_count': 1000,
 		}, format='json')
 		self.assertEqual(resp.status_code, 201, resp.content)
 		data = resp.json()
 		self.assertEqual(data['status'], 'draft')
+		self.assertEqual((data['rating'], data['review_count']), ('0.00', 0))
 		self.assertIsNone(data['published_at'])
 		self.assertIsNotNone(data['created_by'])
 
@@ -193,3 +210,742 @@ class ListingAvailabilityTests(TestCase):
 		self.listing.save(update_fields=['status'])
 		mv = self.client.get(reverse('listing-availability-month', args=[self.listing.id]), {'month': '2025-10'})
 		self.assertEqual(mv.status_code, 404)
+
+
+	def test_multi_month_calendar(self):
+		ListingAvailability.objects.create(listing=self.listing, start_date=date(2025, 10, 30), end_date=date(2025, 11, 2))
+		ListingAvailability.objects.create(listing=self.listing, start_date=date(2025, 11, 3), end_date=date(2025, 11, 3), status='tentative')
+		ListingAvailability.objects.create(listing=self.listing, start_date=date(2025, 11, 10), end_date=date(2025, 11, 12), status='canceled')
+		data = self.client.get(reverse('listing-availability-month', args=[self.listing.id]), {'month': '2025-10', 'months': 2}).json()
+		self.assertEqual(data['until'], '2025-11-30')
+		self.assertEqual(data['booked_ranges'], [['2025-10-30', '2025-11-03']])
+		self.assertEqual(data['booked'][:2], ['2025-10-30', '2025-10-31'])
+		self.assertEqual(data['free_days'], 61 - 5)
+		self.assertEqual(data['first_free'], '2025-10-01')
+
+
+	def test_search_by_free_date_range(self):
+		other = Listing.objects.create(title='Hall B', category=self.category, image='x', created_by=self.provider, status='published')
+		ListingAvailability.objects.create(listing=self.listing, start_date=date(2025, 12, 5), end_date=date(2025, 12, 7), status='tentative')
+		ListingAvailability.objects.create(listing=other, start_date=date(2025, 12, 1), end_date=date(2025, 12, 2), status='canceled')
+
+		def ids(**params):
+			return sorted(r['id'] for r in self.client.get(reverse('listing-list'), params).json()['results'])
+
+		both = sorted([self.listing.id, other.id])
+		self.assertEqual(ids(availableFrom='2025-12-07', availableTo='2025-12-09'), [other.id])
+		self.assertEqual(ids(availableFrom='2025-12-08', availableTo='2025-12-09'), both)
+		self.assertEqual(ids(availableFrom='2025-12-06'), [other.id])
+		self.assertEqual(ids(availableFrom='2025-12-09', availableTo='2025-12-01'), both)
+		# New booking invalidates the cached page
+		ListingAvailability.objects.create(listing=other, start_date=date(2025, 12, 9), end_date=date(2025, 12, 9))
+		self.assertEqual(ids(availableFrom='2025-12-08', availableTo='2025-12-09'), [self.listing.id])
+
+	def test_batch_calendars_with_etag(self):
+		other = Listing.objects.create(title='Hall B', category=self.category, image='x', created_by=self.provider, status='published')
+		draft = Listing.objects.create(title='Draft', category=self.category, image='x', created_by=self.provider)
+		ListingAvailability.objects.create(listing=self.listing, start_date=date(2025, 9, 28), end_date=date(2025, 10, 2))
+		ListingAvailability.objects.create(listing=self.listing, start_date=date(2025, 10, 3), end_date=date(2025, 10, 3), status='tentative')
+		url = reverse('listing-availability-batch')
+		params = {'ids': f'{self.listing.id},{other.id},{draft.id}', 'month': '2025-10'}
+		with self.assertNumQueries(2):
+			resp = self.client.get(url, params)
+		self.assertEqual(resp.json()['listings'], {str(self.listing.id): [['2025-10-01', '2025-10-03']], str(other.id): []})
+		bitmap = self.client.get(url, {**params, 'encoding': 'bitmap'}).json()['listings'][str(self.listing.id)]
+		self.assertEqual(base64.b64decode(bitmap)[:1], bytes([0b111]))
+
+		with self.assertNumQueries(1):
+			cached = self.client.get(url, params, HTTP_IF_NONE_MATCH=resp['ETag'])
+		self.assertEqual(cached.status_code, 304)
+		ListingAvailability.objects.create(listing=other, start_date=date(2025, 10, 20), end_date=date(2025, 10, 21))
+		self.assertEqual(self.client.get(url, params, HTTP_IF_NONE_MATCH=resp['ETag']).status_code, 200)
+
+class AvailabilityCalendarTests(SimpleTestCase):
+	def setUp(self):
+		# Half-open: booked Oct 3-4 and Oct 5-6 (touching) plus Oct 10
+		self.calendar = Calendar(date(2025, 10, 1), date(2025, 11, 1), [
+			(date(2025, 10, 5), date(2025, 10, 7)),
+			(date(2025, 10, 3), date(2025, 10, 5)),
+			(date(2025, 10, 10), date(2025, 10, 11)),
+		])
+
+	def test_ranges_merge_and_complement(self):
+		self.assertEqual(self.calendar.booked, [(date(2025, 10, 3), date(2025, 10, 7)), (date(2025, 10, 10), date(2025, 10, 11))])
+		self.assertEqual(self.calendar.free_ranges()[:2], [(date(2025, 10, 1), date(2025, 10, 3)), (date(2025, 10, 7), date(2025, 10, 10))])
+		self.assertEqual(self.calendar.free_day_count(), 31 - 5)
+
+	def test_is_free_and_first_free(self):
+		self.assertTrue(self.calendar.is_free(date(2025, 10, 7), date(2025, 10, 9)))
+		self.assertFalse(self.calendar.is_free(date(2025, 10, 9), date(2025, 10, 10)))
+		self.assertEqual(self.calendar.first_free(nights=3), date(2025, 10, 7))
+		self.assertEqual(self.calendar.first_free(nights=4), date(2025, 10, 11))
+		self.assertEqual(self.calendar.first_free(after=date(2025, 10, 4)), date(2025, 10, 7))
+		self.assertIsNone(self.calendar.first_free(nights=40))
+
+class ListingKeysetPaginationTests(TestCase):
+	def setUp(self):
+		self.client = APIClient()
+		self.category = Category.objects.create(name='Venue Hall', slug='venue-hall')
+		for i in range(7):
+			Listing.objects.create(
+				title=f'Hall {i}', category=self.category, image='x', location='Addis',
+				price_min=100 * (i % 3), rating=i % 4, featured=(i % 2 == 0), status='published',
+			)
+
+	def walk(self, params):
+		ids = []
+		resp = self.client.get(reverse('listing-list'), {**params, 'cursor': '', 'page_size': 3})
+		while True:
+			self.assertEqual(resp.status_code, 200, resp.content)
+			body = resp.json()
+			ids.extend(r['id'] for r in body['results'])
+			if not body['next']:
+				return ids, body
+			resp = self.client.get(body['next'])
+
+	def test_cursor_pages_match_offset_ordering(self):
+		for sort in ('featured', 'price-asc', 'price-desc', 'rating-desc'):
+			full = self.client.get(reverse('listing-list'), {'sort': sort, 'page_size': 100}).json()['results']
+			ids, _ = self.walk({'sort': sort})
+			self.assertEqual(ids, [r['id'] for r in full], sort)
+
+	def test_previous_link_returns_prior_page(self):
+		first = self.client.get(reverse('listing-list'), {'cursor': '', 'page_size': 3}).json()
+		self.assertIsNone(first['previous'])
+		second = self.client.get(first['next']).json()
+		back = self.client.get(second['previous']).json()
+		self.assertEqual([r['id'] for r in back['results']], [r['id'] for r in first['results']])
+
+	def test_count_is_opt_in(self):
+		resp = self.client.get(reverse('listing-list'), {'cursor': ''})
+		self.assertIsNone(resp.json()['count'])
+		resp = self.client.get(reverse('listing-list'), {'cursor': '', 'count': 'exact'})
+		self.assertEqual(resp.json()['count'], 7)
+		resp = self.client.get(reverse('listing-list'), {'cursor': '', 'count': 'estimate'})
+		self.assertIsInstance(resp.json()['count'], int)
+
+	def test_invalid_or_foreign_cursor_rejected(self):
+		resp = self.client.get(reverse('listing-list'), {'cursor': 'garbage'})
+		self.assertEqual(resp.status_code, 404)
+		first = self.client.get(reverse('listing-list'), {'cursor': '', 'page_size': 3}).json()
+		cursor = parse_qs(urlparse(first['next']).query)['cursor'][0]
+		self.assertEqual(self.client.get(reverse('listing-list'), {'cursor': cursor}).status_code, 200)
+		resp = self.client.get(reverse('listing-list'), {'cursor': cursor, 'sort': 'price-asc'})
+		self.assertEqual(resp.status_code, 404)
+
+
+class ListingSearchTests(TestCase):
+	def setUp(self):
+		self.client = APIClient()
+		self.category = Category.objects.create(name='Venue Hall', slug='venue-hall')
+		self.garden = Listing.objects.create(
+			title='Garden Pavilion', category=self.category, image='x', location='Addis Ababa',
+			features=['Outdoor', 'Parking'], status='published',
+		)
+		self.hall = Listing.objects.create(
+			title='Grand Hall', category=self.category, image='x', location='Adama',
+			features=['Garden view'], venue_attrs={'style': 'Ballroom', 'amenities': ['Stage']}, status='published',
+		)
+
+	def search(self, q, **extra):
+		resp = self.client.get(reverse('listing-list'), {'search': q, **extra})
+		self.assertEqual(resp.status_code, 200, resp.content)
+		return [r['id'] for r in resp.json()['results']]
+
+	def test_matches_title_features_location_and_attrs(self):
+		self.assertEqual(self.search('parking'), [self.garden.id])
+		self.assertEqual(self.search('ababa'), [self.garden.id])
+		self.assertEqual(self.search('ballroom stage'), [self.hall.id])
+		self.assertEqual(self.search('nothing-here'), [])
+
+	def test_title_match_ranks_first(self):
+		self.assertEqual(self.search('garden'), [self.garden.id, self.hall.id])
+
+	def test_partial_words_match_as_prefixes(self):
+		self.assertEqual(self.search('pavil'), [self.garden.id])
+		self.assertEqual(self.search('ball sta'), [self.hall.id])
+		self.assertEqual(self.search('gard park'), [self.garden.id])
+
+	def test_index_follows_updates(self):
+		self.hall.title = 'Riverside Hall'
+		self.hall.save()
+		self.assertEqual(self.search('riverside'), [self.hall.id])
+		self.assertEqual(self.search('grand'), [])
+
+
+class ListingCityTests(TestCase):
+	def setUp(self):
+		self.client = APIClient()
+		self.provider = User.objects.create_user(username='prov3', password='pass123')
+		self.profile = UserProfile.objects.get(user=self.provider)
+		self.profile.city = 'Addis Ababa'
+		self.profile.save()
+		self.category = Category.objects.create(name='Venue Hall', slug='venue-hall')
+
+	def make(self, title, location):
+		return Listing.objects.create(title=title, category=self.category, image='x', location=location, created_by=self.provider, status='published')
+
+	def test_city_derived_from_location_and_profile(self):
+		self.assertEqual(self.make('A', 'Bole,  Addis Ababa').city, 'Addis Ababa')
+		self.assertEqual(self.make('B', '').city, 'Addis Ababa')
+		other = self.make('C', 'Kebele 4, Bishoftu')
+		self.assertEqual((other.city, other.city_key), ('Bishoftu', 'bishoftu'))
+
+	def test_city_filter_is_prefix_on_normalized_city(self):
+		a = self.make('A', 'Bole, Addis Ababa')
+		self.make('B', 'Bishoftu')
+		resp = self.client.get(reverse('listing-list'), {'city': '  ADDIS  '})
+		self.assertEqual([r['id'] for r in resp.json()['results']], [a.id])
+		# Neighborhoods in the free-text location still match
+		resp = self.client.get(reverse('listing-list'), {'city': 'bole'})
+		self.assertEqual([r['id'] for r in resp.json()['results']], [a.id])
+		resp = self.client.get(reverse('listing-list'), {'location__icontains': 'Bishof'})
+		self.assertEqual([r['title'] for r in resp.json()['results']], ['B'])
+
+	def test_profile_city_change_updates_listings(self):
+		listing = self.make('A', '')
+		before = listing.updated_at
+		self.profile.city = 'Adama'
+		self.profile.save(update_fields=['city'])
+		listing.refresh_from_db()
+		self.assertEqual(listing.city_key, 'adama')
+		# Bumped so the change feed reports the new city
+		self.assertGreater(listing.updated_at, before)
+
+	def test_autocomplete(self):
+		self.make('A', 'Bole, Addis Ababa')
+		self.make('B', 'Addis Ababa')
+		self.make('C', 'Adama')
+		resp = self.client.get(reverse('listing-city-autocomplete'), {'q': 'ad'})
+		self.assertEqual(resp.json(), [{'city': 'Addis Ababa', 'count': 2}, {'city': 'Adama', 'count': 1}])
+		resp = self.client.get(reverse('listing-city-autocomplete'), {'q': 'ababa'})
+		self.assertEqual(resp.json(), [{'city': 'Addis Ababa', 'count': 2}])
+
+
+class ListingRolesFilterTests(TestCase):
+	def setUp(self):
+		self.client = APIClient()
+		self.category = Category.objects.create(name='Beauty', slug='beauty')
+		self.stylist = User.objects.create_user(username='stylist', password='pass123')
+		self.photographer = User.objects.create_user(username='photo', password='pass123')
+		for user, tokens in ((self.stylist, ['Gender:Women', 'Role:Stylist']), (self.photographer, ['Role:Photographer'])):
+			prof = UserProfile.objects.get(user=user)
+			prof.provider_subchoice_tokens = tokens
+			prof.save(update_fields=['provider_subchoice_tokens'])
+		self.a = Listing.objects.create(title='Styling', category=self.category, image='x', created_by=self.stylist, status='published')
+		self.b = Listing.objects.create(title='Photos', category=self.category, image='x', created_by=self.photographer, status='published')
+
+	def ids(self, roles):
+		resp = self.client.get(reverse('listing-list'), {'roles': roles})
+		return sorted(r['id'] for r in resp.json()['results'])
+
+	def test_roles_filter_or_semantics(self):
+		self.assertEqual(self.ids('Role:Stylist'), [self.a.id])
+		self.assertEqual(self.ids('Role:Stylist,Role:Photographer'), sorted([self.a.id, self.b.id]))
+		self.assertEqual(self.ids('Role:Unknown'), [])
+
+	def test_profile_token_change_resyncs_listings(self):
+		prof = UserProfile.objects.get(user=self.photographer)
+		prof.provider_subchoice_tokens = ['Role:Videographer']
+		prof.save(update_fields=['provider_subchoice_tokens'])
+		self.assertEqual(self.ids('Role:Photographer'), [])
+		self.assertEqual(self.ids('Role:Videographer'), [self.b.id])
+
+
+class ConditionalGetTests(TestCase):
+	def setUp(self):
+		self.client = APIClient()
+		self.category = Category.objects.create(name='Venues', slug='venues')
+		self.user = User.objects.create_user(username='etagprov', password='pass123')
+		self.listing = Listing.objects.create(title='Hall', category=self.category, image='x', created_by=self.user, status='published')
+
+	def test_listing_detail_304_until_changed(self):
+		url = reverse('listing-detail', args=[self.listing.id])
+		first = self.client.get(url)
+		self.assertEqual(first['Cache-Control'], 'private, no-cache')
+		with self.assertNumQueries(1):
+			self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+		UserProfile.objects.filter(user=self.user).update(business_name='Grand Events')
+		changed = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+		self.assertEqual((changed.status_code, changed.json()['provider_name']), (200, 'Grand Events'))
+		# Hidden listings still 404 rather than 304
+		Listing.objects.filter(pk=self.listing.pk).update(status='draft')
+		self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=changed['ETag']).status_code, 404)
+
+	def test_categories_shared_validator(self):
+		url = reverse('category-list')
+		etag = self.client.get(url)['ETag']
+		self.client.force_authenticate(self.user)
+		self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+		Category.objects.create(name='Attire', slug='attire')
+		self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+@override_settings(LISTING_CHANGES_SETTLE_SECONDS=0)
+class ListingChangeFeedTests(TestCase):
+	def setUp(self):
+		self.client = APIClient()
+		self.category = Category.objects.create(name='Venues', slug='venues')
+		self.user = User.objects.create_user(username='feedprov', password='pass123')
+
+	def feed(self, since=None, **params):
+		if since:
+			params['since'] = since
+		resp = self.client.get(reverse('listing-changes'), params)
+		self.assertEqual(resp.status_code, 200, resp.content)
+		return resp.json()
+
+	def test_feed_follows_lifecycle(self):
+		from django.utils import timezone
+		live = Listing.objects.create(title='Hall', category=self.category, image='x', created_by=self.user, status='published')
+		draft = Listing.objects.create(title='Tent', category=self.category, image='x', created_by=self.user)
+		first = self.feed()
+		self.assertEqual([(e['id'], e['change']) for e in first['results']], [(live.id, 'created')])
+		self.assertEqual(first['results'][0]['category'], 'venues')
+		cursor = first['next']
+		self.assertEqual(self.feed(cursor)['results'], [])
+
+		since = timezone.now().isoformat()
+		draft.status = 'published'
+		draft.published_at = timezone.now()
+		draft.save(update_fields=['status', 'published_at'])
+		live.title = 'Grand Hall'
+		live.save(update_fields=['title'])
+		page = self.feed(cursor)
+		# The draft was created after the cursor, so it is new to this client
+		self.assertEqual([(e['id'], e['change']) for e in page['results']], [(draft.id, 'created'), (live.id, 'updated')])
+		self.assertEqual(page['results'][1]['title'], 'Grand Hall')
+		self.assertEqual([e['change'] for e in self.feed(since)['results']], ['published', 'updated'])
+
+		cursor = page['next']
+		from reviews.models import Review
+		Review.objects.create(listing=live, rating=5, text='Great')
+		draft.status = 'draft'
+		draft.save(update_fields=['status'])
+		page = self.feed(cursor, limit=1)
+		self.assertEqual(([(e['id'], e['change']) for e in page['results']], page['has_more']), ([(live.id, 'updated')], True))
+		self.assertEqual(page['results'][0]['review_count'], 1)
+		page = self.feed(page['next'])
+		self.assertEqual(page['results'], [{'id': draft.id, 'change': 'unpublished', 'status': 'draft', 'updated_at': page['results'][0]['updated_at']}])
+
+	def test_invalid_since(self):
+		self.assertEqual(self.client.get(reverse('listing-changes'), {'since': 'nope'}).status_code, 400)
+
+
+class ListingPageCacheTests(TestCase):
+	def setUp(self):
+		self.client = APIClient()
+		self.venues = Category.objects.create(name='Venues', slug='venues')
+		self.attire = Category.objects.create(name='Attire', slug='attire')
+		self.user = User.objects.create_user(username='cacheprov', password='pass123')
+		prof = UserProfile.objects.get(user=self.user)
+		prof.role = UserProfile.ROLE_PROVIDER
+		prof.save(update_fields=['role'])
+		self.hall = Listing.objects.create(title='Hall', category=self.venues, image='x', created_by=self.user, status='published', featured=True)
+
+	def ids(self, url, params=None):
+		data = self.client.get(url, params or {}).json()
+		rows = data['results'] if isinstance(data, dict) else data
+		return sorted(r['id'] for r in rows)
+
+	def test_repeat_request_served_from_cache(self):
+		url = reverse('listing-list')
+		self.ids(url, {'cat': 'venues', 'city': 'Addis'})
+		with self.assertNumQueries(0):
+			self.ids(url, {'city': ' ADDIS ', 'cat': 'venues'})
+
+	def test_publish_visible_immediately(self):
+		draft = Listing.objects.create(title='Gown', category=self.venues, image='x', created_by=self.user, status='draft', featured=True)
+		self.assertEqual(self.ids(reverse('listing-list')), [self.hall.id])
+		self.assertEqual(self.ids(reverse('featured-listing-list')), [self.hall.id])
+		self.client.force_authenticate(User.objects.get(pk=self.user.pk))
+		resp = self.client.patch(reverse('listing-publish', args=[draft.id]), {})
+		self.assertEqual(resp.status_code, 200, resp.content)
+		self.client.force_authenticate(None)
+		self.assertEqual(self.ids(reverse('listing-list')), sorted([self.hall.id, draft.id]))
+		self.assertEqual(self.ids(reverse('featured-listing-list')), sorted([self.hall.id, draft.id]))
+
+	def test_other_category_pages_stay_cached(self):
+		url = reverse('listing-list')
+		self.ids(url, {'cat': 'venues'})
+		Listing.objects.create(title='Suit', category=self.attire, image='x', created_by=self.user, status='published')
+		with self.assertNumQueries(0):
+			self.assertEqual(self.ids(url, {'cat': 'venues'}), [self.hall.id])
+
+	def test_category_move_invalidates_old_category(self):
+		url = reverse('listing-list')
+		self.assertEqual(self.ids(url, {'cat': 'venues'}), [self.hall.id])
+		self.hall.category = self.attire
+		self.hall.save()
+		self.assertEqual(self.ids(url, {'cat': 'venues'}), [])
+		self.assertEqual(self.ids(url, {'cat': 'attire'}), [self.hall.id])
+
+
+class ListingFacetsTests(TestCase):
+	def setUp(self):
+		self.client = APIClient()
+		self.venues = Category.objects.create(name='Venues', slug='venues')
+		self.attire = Category.objects.create(name='Attire', slug='attire')
+		self.user = User.objects.create_user(username='facetprov', password='pass123')
+		prof = UserProfile.objects.get(user=self.user)
+		prof.provider_subchoice_tokens = ['Role:Planner']
+		prof.save(update_fields=['provider_subchoice_tokens'])
+		common = {'image': 'x', 'created_by': self.user, 'status': 'published'}
+		Listing.objects.create(title='Hall', category=self.venues, location='Addis Ababa', price_min=800, rating=4.8, **common)
+		Listing.objects.create(title='Garden', category=self.venues, location='Bahir Dar', price_min=6000, rating=4.2, **common)
+		Listing.objects.create(title='Gown', category=self.attire, location='Addis Ababa', price_min=2000, rating=3.5, **common)
+		Listing.objects.create(title='Draft', category=self.attire, image='x', created_by=self.user, price_min=100)
+
+	def facets(self, **params):
+		resp = self.client.get(reverse('listing-facets'), params)
+		self.assertEqual(resp.status_code, 200)
+		return resp.json()
+
+	def test_counts_for_all_published(self):
+		data = self.facets()
+		self.assertEqual(data['total'], 3)
+		self.assertEqual({c['slug']: c['count'] for c in data['categories']}, {'venues': 2, 'attire': 1})
+		self.assertEqual([p['count'] for p in data['price']], [1, 1, 1, 0])
+		self.assertEqual([r['count'] for r in data['rating']], [1, 2, 3])
+		self.assertEqual(data['cities'][0], {'city': 'Addis Ababa', 'count': 2})
+		self.assertEqual(data['roles'], [{'token': 'Role:Planner', 'count': 3}])
+
+	def test_counts_follow_filters_and_listing_changes(self):
+		data = self.facets(city='addis', maxPrice='5000')
+		self.assertEqual(data['total'], 2)
+		self.assertEqual({c['slug']: c['count'] for c in data['categories']}, {'venues': 1, 'attire': 1})
+		Listing.objects.create(title='Veil', category=self.attire, location='Addis Ababa', price_min=50, image='x', created_by=self.user, status='published')
+		self.assertEqual(self.facets(city='addis', maxPrice='5000')['total'], 3)
+
+
+class ListingBulkImportExportTests(TestCase):
+	def setUp(self):
+		self.client = APIClient()
+		self.category = Category.objects.create(name='Rentals', slug='rentals')
+		self.user = User.objects.create_user(username='bulkprov', password='pass123')
+		prof = UserProfile.objects.get(user=self.user)
+		prof.role = UserProfile.ROLE_PROVIDER
+		prof.city = 'Addis Ababa'
+		prof.provider_subchoice_tokens = ['Role:Rentals']
+		prof.save()
+		self.client.force_authenticate(User.objects.get(pk=self.user.pk))
+
+	def report(self, resp):
+		self.assertEqual(resp.status_code, 200)
+		return [json.loads(line) for line in b''.join(resp.streaming_content).decode().splitlines()]
+
+	def test_ndjson_import_reports_per_row(self):
+		body = '\n'.join([
+			json.dumps({'title': 'Chairs', 'category': 'rentals', 'image': 'x', 'price_min': '10', 'features': ['stackable']}),
+			json.dumps({'title': 'No category', 'category': 'nope', 'image': 'x'}),
+			'{broken',
+			json.dumps({'title': 'Tables', 'category': 'rentals', 'image': 'x', 'rating': 5}),
+		])
+		resp = self.client.post(reverse('listing-import') + '?chunk_size=2', body, content_type='application/x-ndjson')
+		lines = self.report(resp)
+		self.assertEqual(lines[-1], {'summary': {'created': 2, 'failed': 2}})
+		self.assertEqual([l['row'] for l in lines[:-1]], [1, 2, 3, 4])
+		self.assertIn('category', lines[1]['errors'])
+		chairs = Listing.objects.get(pk=lines[0]['id'])
+		self.assertEqual((chairs.status, chairs.created_by_id, chairs.city_key), ('draft', self.user.id, 'addis ababa'))
+		self.assertEqual(list(chairs.provider_tokens.values_list('token', flat=True)), ['Role:Rentals'])
+		self.assertEqual(Listing.objects.get(pk=lines[3]['id']).rating, 0)
+
+	def test_import_rejects_unusable_input_before_writing(self):
+		resp = self.client.post(reverse('listing-import'), b'', content_type='application/x-ndjson')
+		self.assertEqual(resp.status_code, 400)
+		resp = self.client.post(reverse('listing-import'), b'name,price\nChairs,10\n', content_type='text/csv')
+		self.assertEqual(resp.status_code, 400)
+		self.assertIn('title', resp.json()['detail'])
+		self.assertFalse(Listing.objects.exists())
+
+	def test_import_ignores_staff_curated_fields(self):
+		body = json.dumps({'title': 'Chairs', 'category': 'rentals', 'image': 'x', 'featured': True, 'badges': ['Top Rated']})
+		lines = self.report(self.client.post(reverse('listing-import'), body, content_type='application/x-ndjson'))
+		chairs = Listing.objects.get(pk=lines[0]['id'])
+		self.assertEqual((chairs.featured, chairs.badges), (False, []))
+
+	def test_csv_export_round_trips_through_import(self):
+		Listing.objects.create(title='Linens', category=self.category, image='x', created_by=self.user, features=['white'], rental_attrs={'deposit': 50})
+		resp = self.client.get(reverse('my-listings-export'), {'as': 'csv'})
+		self.assertEqual(resp.status_code, 200)
+		exported = b''.join(resp.streaming_content)
+		lines = self.report(self.client.post(reverse('listing-import'), exported, content_type='text/csv'))
+		self.assertEqual(lines[-1], {'summary': {'created': 1, 'failed': 0}})
+		copy = Listing.objects.get(pk=lines[0]['id'])
+		self.assertEqual((copy.title, copy.features, copy.rental_attrs), ('Linens', ['white'], {'deposit': 50}))
+		ndjson = b''.join(self.client.get(reverse('my-listings-export')).streaming_content).decode().splitlines()
+		self.assertEqual(len(ndjson), 2)
+
+
+@override_settings(
+	MEDIA_STORAGE_BACKEND='supabase', SUPABASE_URL='https://sb.test', SUPABASE_BUCKET='media',
+	SUPABASE_SERVICE_ROLE_KEY='service', SUPABASE_PRIVATE_BUCKET=True,
+)
+class PrivateBucketSignedURLTests(TestCase):
+	def setUp(self):
+		from django.core.cache import cache
+		cache.clear()
+		self.client = APIClient()
+		category = Category.objects.create(name='Venues', slug='venues')
+		user = User.objects.create_user(username='signer', password='pass123')
+		for i in range(3):
+			Listing.objects.create(
+				title=f'Hall {i}', category=category, image=f'uploads/h{i}.jpg', image_thumb=f'thumbs/h{i}.jpg',
+				created_by=user, status='published',
+			)
+
+	def patched_session(self):
+		from listings.storage_client import get_storage_client
+		client = get_storage_client()
+		client.breaker.record_success()
+		return mock.patch.object(client.session, 'request')
+
+	def fake_sign(self, method, url, headers=None, json=None, timeout=None):
+		resp = mock.Mock(status_code=200)
+		resp.json.return_value = [{'path': p, 'signedURL': f'/object/sign/media/{p}?token=t', 'error': None} for p in json['paths']]
+		return resp
+
+	def test_page_signed_in_one_batch_and_cached(self):
+		with self.patched_session() as post:
+			post.side_effect = self.fake_sign
+			rows = self.client.get(reverse('listing-list')).json()['results']
+			self.assertEqual(post.call_count, 1)
+			self.assertEqual(len(post.call_args.kwargs['json']['paths']), 6)
+			self.assertTrue(all(r['image'].startswith('https://sb.test/storage/v1/object/sign/media/uploads/') for r in rows))
+			self.assertTrue(all(r['image_thumb'].endswith('?token=t') for r in rows))
+			# A different page (not in the page cache) reuses the cached signatures
+			self.client.get(reverse('listing-list'), {'page_size': 2})
+			self.assertEqual(post.call_count, 1)
+
+	def test_detail_signed_in_one_batch(self):
+		listing = Listing.objects.get(title='Hall 0')
+		with self.patched_session() as post:
+			post.side_effect = self.fake_sign
+			data = self.client.get(reverse('listing-detail', args=[listing.pk])).json()
+		self.assertEqual(post.call_count, 1)
+		self.assertEqual(post.call_args.kwargs['json']['paths'], ['uploads/h0.jpg', 'thumbs/h0.jpg'])
+		self.assertTrue(data['image_thumb'].endswith('?token=t'))
+
+	def test_signing_failure_falls_back_to_object_url(self):
+		with self.patched_session() as post:
+			post.return_value = mock.Mock(status_code=500, text='down')
+			rows = self.client.get(reverse('listing-list')).json()['results']
+		self.assertEqual(post.call_count, 1)
+		self.assertTrue(rows[0]['image'].startswith('https://sb.test/storage/v1/object/public/media/uploads/'))
+
+
+class StorageClientTests(SimpleTestCase):
+	def setUp(self):
+		from listings.storage_client import StorageClient
+		self.client = StorageClient()
+		sleep = mock.patch('listings.storage_client.time.sleep')
+		sleep.start()
+		self.addCleanup(sleep.stop)
+
+	def test_idempotent_calls_retry_then_succeed(self):
+		with mock.patch.object(self.client.session, 'request', side_effect=[mock.Mock(status_code=503), mock.Mock(status_code=200)]) as send:
+			self.assertEqual(self.client.request('GET', 'https://sb.test/x', op='download').status_code, 200)
+		self.assertEqual(send.call_count, 2)
+		self.assertEqual(send.call_args.kwargs['timeout'], (3.05, 15))
+		self.assertEqual(self.client.breaker.failures, 0)
+
+	def test_uploads_are_not_retried(self):
+		with mock.patch.object(self.client.session, 'request', return_value=mock.Mock(status_code=503)) as send:
+			self.assertEqual(self.client.request('POST', 'https://sb.test/x', op='upload', data=b'x').status_code, 503)
+		self.assertEqual(send.call_count, 1)
+
+	def test_breaker_fails_fast_then_half_opens(self):
+		from listings.media_storage import MediaStorageError
+		from listings.storage_client import CircuitBreaker
+		now = [0.0]
+		self.client.breaker = CircuitBreaker(threshold=3, cooldown=30, clock=lambda: now[0])
+		with mock.patch.object(self.client.session, 'request', side_effect=requests.ConnectionError('refused')) as send:
+			with self.assertRaises(MediaStorageError):
+				self.client.request('GET', 'https://sb.test/x', op='download')  # 3 attempts -> open
+			with self.assertRaises(MediaStorageError) as ctx:
+				self.client.request('GET', 'https://sb.test/x', op='download')
+			self.assertEqual((send.call_count, ctx.exception.status_code), (3, 503))
+			now[0] = 31.0
+			send.side_effect = None
+			send.return_value = mock.Mock(status_code=200)
+			self.assertEqual(self.client.request('GET', 'https://sb.test/x', op='download').status_code, 200)
+		self.assertIsNone(self.client.breaker.opened_at)
+
+	def test_half_open_lets_exactly_one_trial_through(self):
+		from listings.storage_client import CircuitBreaker
+		now = [0.0]
+		breaker = CircuitBreaker(threshold=1, cooldown=30, clock=lambda: now[0])
+		breaker.record_failure()
+		now[0] = 31.0
+		# First caller after the cooldown is the trial; concurrent callers still fail fast
+		self.assertEqual([breaker.allow() for _ in range(3)], [True, False, False])
+		breaker.record_failure()
+		now[0] = 45.0
+		self.assertFalse(breaker.allow())
+		now[0] = 62.0
+		self.assertTrue(breaker.allow())
+		breaker.record_success()
+		self.assertEqual([breaker.allow() for _ in range(2)], [True, True])
+
+	@override_settings(SUPABASE_URL='https://sb.test', SUPABASE_BUCKET='media', SUPABASE_SERVICE_ROLE_KEY='service')
+	def test_supabase_delete_raises_on_failure(self):
+		from listings.media_storage import MediaStorageError, SupabaseMediaStorage
+		storage = SupabaseMediaStorage()
+		with mock.patch.object(storage.http.session, 'request', return_value=mock.Mock(status_code=400)):
+			with self.assertRaises(MediaStorageError):
+				storage.delete('uploads/a.jpg')
+
+	@override_settings(SUPABASE_URL='https://sb.test', SUPABASE_BUCKET='media', SUPABASE_SERVICE_ROLE_KEY='service')
+	def test_supabase_parts_are_assembled_from_streamed_blocks(self):
+		from listings.media_storage import SupabaseMediaStorage
+		from listings.uploads import assemble_parts
+		storage = SupabaseMediaStorage()
+		parts = {'p/0': [b'ab', b'cd'], 'p/1': [b'ef']}
+
+		def respond(method, url, **kwargs):
+			resp = mock.MagicMock(status_code=200)
+			resp.iter_content.side_effect = lambda size: iter(parts[url.rsplit('media/', 1)[1]])
+			return resp
+
+		with mock.patch.object(storage.http.session, 'request', side_effect=respond) as send:
+			with assemble_parts(['p/0', 'p/1'], storage) as assembled:
+				self.assertEqual(assembled.read(), b'abcdef')
+		self.assertTrue(all(call.kwargs['stream'] for call in send.call_args_list))
+
+
+class ImageUploadPipelineTests(TestCase):
+	def setUp(self):
+		self.media_root = tempfile.mkdtemp()
+		self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+		override = override_settings(MEDIA_ROOT=self.media_root, MEDIA_STORAGE_BACKEND='local')
+		override.enable()
+		self.addCleanup(override.disable)
+		self.client = APIClient()
+		self.user = User.objects.create_user(username='uploader', password='pass123')
+		self.client.force_authenticate(self.user)
+
+	def png(self, size=(900, 600)):
+		from PIL import Image
+		buf = io.BytesIO()
+		Image.new('RGB', size, (200, 120, 80)).save(buf, format='PNG')
+		return SimpleUploadedFile('photo.png', buf.getvalue(), content_type='image/png')
+
+	def test_upload_returns_before_variants_then_task_fills_them(self):
+		with self.captureOnCommitCallbacks(execute=False) as callbacks:
+			resp = self.client.post(reverse('image-upload'), {'file': self.png()}, format='multipart')
+		self.assertEqual(resp.status_code, 201, resp.content)
+		body = resp.json()
+		self.assertEqual((body['status'], body['thumb_path']), ('pending', None))
+		self.assertEqual(len(callbacks), 1)
+		category = Category.objects.create(name='Venues', slug='venues')
+		listing = Listing.objects.create(title='Hall', category=category, image=body['path'], created_by=self.user)
+
+		from listings.tasks import process_image_asset
+		self.assertEqual(process_image_asset(body['id']), 'ready')
+		status_resp = self.client.get(body['status_url']).json()
+		self.assertEqual(status_resp['status'], 'ready')
+		self.assertTrue(status_resp['thumb_path'].startswith('thumbs/'))
+		self.assertTrue(os.path.exists(os.path.join(self.media_root, status_resp['thumb_path'])))
+		listing.refresh_from_db()
+		self.assertEqual(listing.image_thumb, status_resp['thumb_path'])
+		# 900px original -> 320/640/900 WebP variants plus an inline placeholder
+		self.assertEqual([v['w'] for v in listing.image_manifest['sources']['webp']], [320, 640, 900])
+		detail = self.client.get(reverse('listing-detail', args=[listing.id])).json()
+		self.assertRegex(detail['image_srcset'], r'^http://testserver/media/uploads/variants/\w+-320\.webp 320w, .+ 900w$')
+		self.assertEqual(detail['image_sources'][-1]['type'], 'image/webp')
+		self.assertTrue(detail['image_placeholder'].startswith('data:image/webp;base64,'))
+		# Listings created after processing pick the manifest up on save
+		later = Listing.objects.create(title='Hall 2', category=category, image=body['path'], created_by=self.user)
+		self.assertEqual(later.image_manifest, listing.image_manifest)
+
+	def test_status_is_private_to_owner(self):
+		resp = self.client.post(reverse('image-upload'), {'file': self.png()}, format='multipart')
+		self.client.force_authenticate(User.objects.create_user(username='other', password='pass123'))
+		self.assertEqual(self.client.get(resp.json()['status_url']).status_code, 404)
+
+	def test_resumable_upload_in_ranges(self):
+		data = self.png().read()
+		half = len(data) // 2
+		start = self.client.post(reverse('image-upload-sessions'), {'filename': 'big.png', 'content_type': 'image/png', 'size': len(data)}, format='json')
+		self.assertEqual(start.status_code, 201, start.content)
+		url = start.json()['upload_url']
+		# A body-less PUT is refused instead of reading from a missing stream
+		self.assertEqual(self.client.put(url).status_code, 411)
+		first = self.client.put(url, data[:half], content_type='application/octet-stream', HTTP_CONTENT_RANGE=f'bytes 0-{half - 1}/{len(data)}')
+		self.assertEqual((first.status_code, first.json()['received']), (202, half))
+		# Each range is kept as a part in media storage, not on the worker's disk
+		session = ImageUploadSession.objects.get()
+		self.assertEqual(len(session.parts), 1)
+		self.assertTrue(os.path.exists(os.path.join(self.media_root, session.parts[0])))
+		# Re-sending from the wrong offset is refused with the offset to resume from
+		wrong = self.client.put(url, data[:half], content_type='application/octet-stream', HTTP_CONTENT_RANGE=f'bytes 0-{half - 1}/{len(data)}')
+		self.assertEqual((wrong.status_code, wrong.json()['received']), (409, half))
+		with self.captureOnCommitCallbacks(execute=False) as callbacks:
+			done = self.client.put(url, data[half:], content_type='application/octet-stream', HTTP_CONTENT_RANGE=f'bytes {half}-{len(data) - 1}/{len(data)}')
+		self.assertEqual(done.status_code, 201, done.content)
+		self.assertEqual(len(callbacks), 1)
+		with open(os.path.join(self.media_root, done.json()['path']), 'rb') as fh:
+			self.assertEqual(fh.read(), data)
+		parts_dir = os.path.join(self.media_root, 'upload-parts')
+		self.assertEqual([f for _, _, files in os.walk(parts_dir) for f in files], [])
+		self.assertEqual(self.client.get(url).json()['received'], len(data))
+
+	def test_direct_upload_issue_put_finalize(self):
+		data = self.png().read()
+		issued = self.client.post(reverse('image-direct-uploads'), {'filename': 'a.png', 'content_type': 'image/png', 'size': len(data)}, format='json')
+		self.assertEqual(issued.status_code, 201, issued.content)
+		body = issued.json()
+		self.assertEqual(body['upload']['method'], 'PUT')
+		# The target authorizes by its signature alone, like a storage presigned URL
+		put = APIClient().put(body['upload']['url'], data, content_type='image/png')
+		self.assertEqual(put.status_code, 201, put.content)
+		self.assertEqual(APIClient().put(body['upload']['url'], data, content_type='image/png').status_code, 409)
+		with self.captureOnCommitCallbacks(execute=False) as callbacks:
+			done = self.client.post(body['finalize_url'], {'token': body['token']}, format='json')
+		self.assertEqual(done.status_code, 201, done.content)
+		self.assertEqual((done.json()['path'], done.json()['status']), (body['path'], 'pending'))
+		self.assertEqual(len(callbacks), 1)
+		# Retried finalize returns the same asset
+		again = self.client.post(body['finalize_url'], {'token': body['token']}, format='json')
+		self.assertEqual((again.status_code, again.json()['id']), (200, done.json()['id']))
+
+	def test_direct_upload_finalize_rejects_missing_foreign_or_oversized(self):
+		issued = self.client.post(reverse('image-direct-uploads'), {'filename': 'a.png', 'content_type': 'image/png', 'size': 10}, format='json').json()
+		self.assertEqual(self.client.post(issued['finalize_url'], {'token': issued['token']}, format='json').status_code, 409)
+		other = APIClient()
+		other.force_authenticate(User.objects.create_user(username='other', password='pass123'))
+		self.assertEqual(other.post(issued['finalize_url'], {'token': issued['token']}, format='json').status_code, 400)
+		with override_settings(MAX_UPLOAD_IMAGE_MB=0.001):
+			APIClient().put(issued['upload']['url'], b'x' * 2048, content_type='image/png')
+			resp = self.client.post(issued['finalize_url'], {'token': issued['token']}, format='json')
+		self.assertEqual(resp.status_code, 413)
+		self.assertFalse(os.path.exists(os.path.join(self.media_root, issued['path'])))
+		self.assertFalse(ImageAsset.objects.exists())
+
+	def test_upload_session_rejects_oversized_declaration(self):
+		resp = self.client.post(reverse('image-upload-sessions'), {'filename': 'x.png', 'content_type': 'image/png', 'size': 50 * 1024 * 1024}, format='json')
+		self.assertEqual(resp.status_code, 413)
+
+
+class ListingListSerializerTests(TestCase):
+	def setUp(self):
+		self.category, _ = Category.objects.get_or_create(name='Venue Hall', slug='venue-hall')
+		self.provider = User.objects.create_user(username='prov_fast', password='pass')
+		UserProfile.objects.filter(user=self.provider).update(business_name='Fast Co', city='Adama', country='ET')
+		self.anon_owner = User.objects.create_user(username='no_business', password='pass')
+		images = ['', 'http://cdn.example.com/a.jpg', 'assets/hero.jpg', 'uploads/b.jpg', '/media/c.jpg']
+		for i, image in enumerate(images):
+			Listing.objects.create(
+				title=f'L{i}', category=self.category, image=image, image_thumb='thumbs/t.jpg' if i % 2 else '',
+				rating='4.5', price_min=1234, features=['x'], created_by=self.provider if i % 2 else self.anon_owner,
+			)
+		Listing.objects.create(title='Orphan', category=self.category, image='x', published_at='2025-01-02T03:04:05Z')
+
+	def test_matches_model_serializer_output(self):
+		request = APIRequestFactory().get('/api/v1/listings/')
+		expected = ListingSerializer(Listing.objects.order_by('id'), many=True, context={'request': request}).data
+		qs = Listing.objects.select_related('category', 'created_by__profile').order_by('id')
+		with self.assertNumQueries(1):
+			actual = ListingListSerializer(qs, many=True, context={'request': request}).data
+		self.assertEqual(list(actual), [dict(row) for row in expected])
@@ -0,0 +1,162 @@
+"""Bounded-memory upload handling.
+
+Multipart uploads are spooled to disk by Django above
+`FILE_UPLOAD_MAX_MEMORY_SIZE` and handed to storage as file objects, so they
+are streamed rather than read into memory. Large files can instead use a
+resumable session (`ImageUploadSession`): the client PUTs byte ranges, each
+spooled from the request stream in fixed-size blocks and saved as a part object
+in media storage (shared by every web worker, so consecutive ranges may land on
+different hosts). The finished parts are concatenated and stored once.
+
+Direct uploads skip the app servers entirely: `DirectUploadCreateView` asks the
+storage backend for a signed upload target and hands the client a signed
+token, which `DirectUploadFinalizeView` exchanges for an `ImageAsset` after
+checking the stored object. The local backend signs URLs to
+`LocalDirectUploadView` so dev and tests speak the same protocol.
+"""
+import mimetypes
+import os
+import re
+import tempfile
+import uuid
+
+from django.conf import settings
+from django.core import signing
+from django.core.files import File
+from django.core.files.storage import default_storage
+
+from .media_storage import MediaStorageError
+
+STREAM_CHUNK_BYTES = 64 * 1024
+_CONTENT_RANGE_RE = re.compile(r'^bytes (\d+)-(\d+)/(\d+|\*)$')
+PART_PREFIX = 'upload-parts'
+DIRECT_UPLOAD_SALT = 'listings.direct-upload'
+LOCAL_UPLOAD_SALT = 'listings.direct-upload.local'
+
+
+def allowed_image_types():
+    return getattr(settings, 'ALLOWED_IMAGE_TYPES', {'image/jpeg', 'image/png', 'image/webp'})
+
+
+def max_upload_bytes() -> int:
+    return int(getattr(settings, 'MAX_UPLOAD_IMAGE_MB', 5) * 1024 * 1024)
+
+
+def check_image_upload(content_type, size):
+    """(payload, status) describing why an upload is refused, or None when it is acceptable."""
+    allowed_types = allowed_image_types()
+    if content_type not in allowed_types:
+        return {'detail': 'Unsupported image type', 'allowed': list(allowed_types)}, 415
+    max_mb = getattr(settings, 'MAX_UPLOAD_IMAGE_MB', 5)
+    size_mb = size / (1024 * 1024)
+    if size_mb > max_mb:
+        return {'detail': f'File too large ({size_mb:.2f}MB > {max_mb}MB)'}, 413
+    return None
+
+
+def unique_upload_path(filename, content_type=None) -> str:
+    """`uploads/<uuid><ext>`; the extension follows `content_type` when given, else the filename."""
+    ext = (content_type and mimetypes.guess_extension(content_type)) or os.path.splitext(filename or '')[1].lower() or '.jpg'
+    return f"uploads/{uuid.uuid4().hex}{ext}"
+
+
+def part_path(session, start) -> str:
+    """Storage key for one received range; unique per attempt so a retried range never collides."""
+    return f"{PART_PREFIX}/{session.pk}/{start:012d}-{uuid.uuid4().hex[:8]}"
+
+
+def parse_content_range(header):
+    """(start, end_inclusive, total | None) from `Content-Range: bytes a-b/N`, or None."""
+    match = _CONTENT_RANGE_RE.match((header or '').strip())
+    if not match:
+        return None
+    start, end, total = match.groups()
+    return int(start), int(end), None if total == '*' else int(total)
+
+
+def spool_chunk(stream, length):
+    """(temp file, bytes written) holding up to `length` bytes of `stream`, copied in blocks and rewound."""
+    tmp = tempfile.TemporaryFile()
+    written = 0
+    while written < length:
+        block = stream.read(min(STREAM_CHUNK_BYTES, length - written))
+        if not block:
+            break
+        tmp.write(block)
+        written += len(block)
+    tmp.seek(0)
+    return tmp, written
+
+
+def assemble_parts(paths, storage):
+    """Temp file (rewound) with the given part objects concatenated in order, copied in blocks."""
+    tmp = tempfile.TemporaryFile()
+    for path in paths:
+        for block in storage.read_chunks(path, STREAM_CHUNK_BYTES):
+            tmp.write(block)
+    tmp.seek(0)
+    return tmp
+
+
+def discard_parts(paths, storage) -> None:
+    for path in paths:
+        try:
+            storage.delete(path)
+        except MediaStorageError:
+            # Left for the bucket's lifecycle rules; the session row is what counts
+            pass
+
+
+def direct_upload_ttl() -> int:
+    return int(getattr(settings, 'DIRECT_UPLOAD_TTL', 900))
+
+
+def direct_upload_token(user, storage, path, content_type) -> str:
+    """Signed claim that `user` may finalize `path`; checked by DirectUploadFinalizeView."""
+    return signing.dumps(
+        {'path': path, 'type': content_type, 'owner': user.pk, 'backend': storage.name},
+        salt=DIRECT_UPLOAD_SALT,
+    )
+
+
+def read_direct_upload_token(token, user):
+    """Claims of a direct upload token issued to `user`, or None when invalid/expired/someone else's."""
+    try:
+        claims = signing.loads(str(token or ''), salt=DIRECT_UPLOAD_SALT, max_age=direct_upload_ttl())
+    except signing.BadSignature:
+        return None
+    return claims if claims.get('owner') == user.pk else None
+
+
+def local_upload_token(path, content_type, max_bytes) -> str:
+    return signing.dumps({'path': path, 'type': content_type, 'max': max_bytes}, salt=LOCAL_UPLOAD_SALT)
+
+
+def read_local_upload_token(token):
+    try:
+        return signing.loads(token, salt=LOCAL_UPLOAD_SALT, max_age=direct_upload_ttl())
+    except signing.BadSignature:
+        return None
+
+
+def store_local_stream(path, stream, length) -> None:
+    """Write exactly `path` in default storage from `length` bytes of `stream`, in blocks.
+
+    Raises FileExistsError when the object already exists (signed URLs are single use).
+    """
+    if default_storage.exists(path):
+        raise FileExistsError(path)
+    with tempfile.TemporaryFile() as tmp:
+        remaining = length
+        while remaining > 0:
+            block = stream.read(min(STREAM_CHUNK_BYTES, remaining))
+            if not block:
+                break
+            tmp.write(block)
+            remaining -= len(block)
+        tmp.seek(0)
+        saved = default_storage.save(path, File(tmp))
+    if saved != path:
+        # Lost a race with a concurrent PUT of the same URL
+        default_storage.delete(saved)
+        raise FileExistsError(path)
@@ -2,25 +2,49 @@ from django.urls import path
 from .views import (
     CategoryListView,
     ListingListView,
+    ListingCityAutocompleteView,
+    ListingFacetsView,
     FeaturedListingListView,
     ListingDetailView,
+    ListingChangesView,
     MyListingListView,
+    MyListingExportView,
+    ListingImportView,
     PublishListingView,
     ImageUploadView,
+    ImageAssetDetailView,
+    DirectUploadCreateView,
+    DirectUploadFinalizeView,
+    LocalDirectUploadView,
+    ImageUploadSessionCreateView,
+    ImageUploadSessionView,
     ListingAvailabilityCreateView,
     ListingAvailabilityMonthView,
+    ListingAvailabilityBatchView,
     SubchoicesUnionView,
 )
 
 urlpatterns = [
     path('categories/', CategoryListView.as_view(), name='category-list'),
     path('listings/', ListingListView.as_view(), name='listing-list'),
+    path('listings/cities/', ListingCityAutocompleteView.as_view(), name='listing-city-autocomplete'),
+    path('listings/facets/', ListingFacetsView.as_view(), name='listing-facets'),
     path('listings/featured/', FeaturedListingListView.as_view(), name='featured-listing-list'),
+    path('listings/changes/', ListingChangesView.as_view(), name='listing-changes'),
     path('listings/<int:pk>/', ListingDetailView.as_view(), name='listing-detail'),
     path('listings/mine/', MyListingListView.as_view(), name='my-listings'),
+    path('listings/mine/export/', MyListingExportView.as_view(), name='my-listings-export'),
+    path('listings/import/', ListingImportView.as_view(), name='listing-import'),
     path('listings/<int:pk>/publish/', PublishListingView.as_view(), name='listing-publish'),
     path('listings/<int:pk>/availability/', ListingAvailabilityCreateView.as_view(), name='listing-availability-create'),
     path('listings/<int:pk>/availability/month/', ListingAvailabilityMonthView.as_view(), name='listing-availability-month'),
+    path('listings/availability/batch/', ListingAvailabilityBatchView.as_view(), name='listing-availability-batch'),
     path('media/upload/', ImageUploadView.as_view(), name='image-upload'),
+    path('media/<int:pk>/', ImageAssetDetailView.as_view(), name='image-asset-detail'),
+    path('media/uploads/', ImageUploadSessionCreateView.as_view(), name='image-upload-sessions'),
+    path('media/uploads/<uuid:pk>/', ImageUploadSessionView.as_view(), name='image-upload-session'),
+    path('media/direct-uploads/', DirectUploadCreateView.as_view(), name='image-direct-uploads'),
+    path('media/direct-uploads/finalize/', DirectUploadFinalizeView.as_view(), name='image-direct-upload-finalize'),
+    path('media/direct-uploads/local/<str:token>/', LocalDirectUploadView.as_view(), name='image-direct-upload-local'),
     path('categories/subchoices-union/', SubchoicesUnionView.as_view(), name='categories-subchoices-union'),
 ]
@@ -1,117 +1,150 @@
+from datetime import date
+
 from rest_framework import generics, filters, permissions, views
 from rest_framework.parsers import MultiPartParser, FormParser
-from django.utils.decorators import method_decorator
-from django.views.decorators.cache import cache_page
 from django.core.cache import cache
 from django_filters.rest_framework import DjangoFilterBackend
-from .models import Category, Listing, ListingAvailability
+from .models import Category, ImageAsset, ImageUploadSession, Listing, ListingAvailability, ListingProviderToken
 from django.db import models
-from .serializers import CategorySerializer, ListingSerializer, ListingAvailabilitySerializer
-from core.permissions import IsProviderOwnerOrReadOnly
+from .serializers import CategorySerializer, ImageAssetSerializer, ListingSerializer, ListingListSerializer, ListingAvailabilitySerializer
+from core.permissions import IsProviderOrReadOnly, IsProviderOwnerOrReadOnly
 from django.utils import timezone
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework.pagination import PageNumberPagination
+from .pagination import StandardResultsSetPagination, ListingKeysetPagination
+from .search import ListingSearchFilter, search_listings
+from .cities import normalize_city
+from .result_cache import CachedListMixin, listing_page_cache_key, page_cache_ttl
+from .facets import compute_facets
+from . import availability, bulk, changes, uploads
+from django.core.files import File
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
 from django.conf import settings
-from django.db.models import Q
-import uuid
-import os
-from django.core.files.storage import default_storage
-from django.core.files.base import ContentFile
-import requests
-
-class StandardResultsSetPagination(PageNumberPagination):
-    page_size = 12
-    page_size_query_param = 'page_size'
-    max_page_size = 100
-
-class CategoryListView(generics.ListAPIView):
+from django.db import transaction
+from django.urls import reverse
+from .media_storage import MediaStorageError, get_media_storage
+from .signed_urls import sign_paths, signature_epoch
+from core.conditional import ConditionalGetMixin, make_etag
+from .tasks import process_image_asset
+
+def filter_listings(qs, params):
+    """Apply the listing browser's filter params (everything except sort/search/paging)."""
+    # Map SPA params 1:1 per roadmap
+    cat = params.get('cat')  # category slug
+    city = params.get('city')  # city prefix, or anywhere in the free-text location (neighborhoods)
+    min_price = params.get('minPrice')
+    max_price = params.get('maxPrice')
+    rating_gte = params.get('ratingGte')
+    customization_contains = params.get('customization')  # single customization option token
+    roles = params.get('roles')  # comma-separated flattened tokens, e.g., Gender:Women,Role:Photographer
+    available_from = params.get('availableFrom')  # YYYY-MM-DD; availableTo defaults to the same day
+    available_to = params.get('availableTo')
+
+    if cat:
+        qs = qs.filter(category__slug=cat)
+    city_term = normalize_city(city)
+    if city_term:
+        # Prefix hits use the city_key pattern index, infix ones the location trigram index
+        qs = qs.filter(models.Q(city_key__startswith=city_term) | models.Q(location__icontains=city_term))
+    if rating_gte:
+        try:
+            qs = qs.filter(rating__gte=float(rating_gte))
+        except ValueError:
+            pass
+    if min_price:
+        try:
+            qs = qs.filter(price_min__gte=float(min_price))
+        except ValueError:
+            pass
+    if max_price:
+        try:
+            qs = qs.filter(price_min__lte=float(max_price))
+        except ValueError:
+            pass
+
+    # Attribute contains filtering (attire customization options)
+    if customization_contains:
+        qs = qs.filter(attire_attrs__customizationOptions__icontains=customization_contains)
+
+    # Roles/subchoices filter via provider profile tokens (OR semantics)
+    if roles:
+        tokens = [t.strip() for t in roles.split(',') if t.strip()]
+        if tokens:
+            # Semi-join on the denormalized (token, listing) index
+            qs = qs.filter(id__in=ListingProviderToken.objects.filter(token__in=tokens).values('listing_id'))
+
+    # Free for the whole date range: anti-join against active bookings
+    if available_from:
+        dates = availability.parse_date_range(available_from, available_to)
+        if dates:
+            qs = availability.filter_available(qs, *dates)
+    return qs
+
+
+class CategoryListView(ConditionalGetMixin, generics.ListAPIView):
     queryset = Category.objects.all().order_by('name')
     serializer_class = CategorySerializer
-    
-    # Cache categories, low-cardinality and rarely-changing
-    @method_decorator(cache_page(60 * 60))  # 1 hour
-    def dispatch(self, *args, **kwargs):
-        return super().dispatch(*args, **kwargs)
+    conditional_per_user = False
+
+    def get_etag_basis(self, request, *args, **kwargs):
+        # Deletes lower the count; every other change moves the newest updated_at
+        return self.get_queryset().aggregate(count=models.Count('id'), last=models.Max('updated_at'))
 
-class ListingListView(generics.ListCreateAPIView):
+class ListingListView(CachedListMixin, generics.ListCreateAPIView):
     serializer_class = ListingSerializer
     pagination_class = StandardResultsSetPagination
-    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, filters.SearchFilter]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, ListingSearchFilter]
     permission_classes = [IsProviderOwnerOrReadOnly]
     
     # Mapping frontend query params to Django filter lookups
     filterset_fields = {
         'category__slug': ['exact'],
         'location': ['icontains'],
+        'city_key': ['exact', 'startswith'],
         'rating': ['gte'],
         # More complex filters like price range or capacity may need a custom filter class
     }
     
-    search_fields = ['title', 'features']
+    # ?search= is served by the listing search index (see listings.search), ranked by relevance
     
     # Mapping frontend sort values to Django ordering
     ordering_fields = ['rating', 'featured'] # Add more as needed, e.g., a price field
+
+    def get_serializer_class(self):
+        # Reads go through the dict-building fast path; writes keep full validation
+        if self.request is not None and self.request.method == 'GET':
+            return ListingListSerializer
+        return ListingSerializer
+
+    @property
+    def paginator(self):
+        # Opt-in keyset mode: any request carrying ?cursor= (even empty for the first page)
+        if not hasattr(self, '_paginator'):
+            if ListingKeysetPagination.cursor_query_param in self.request.query_params:
+                self._paginator = ListingKeysetPagination()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
     
     def get_queryset(self):
         # Base public queryset = published listings only
-        qs = Listing.objects.select_related('category', 'created_by').filter(status='published').order_by('-featured', '-rating')
+        # Every sort ends in `id` so keyset cursors have a unique, index-backed key
+        qs = Listing.objects.select_related('category', 'created_by__profile').filter(status='published').order_by('-featured', '-rating', 'id')
 
         params = self.request.query_params
-        # Map SPA params 1:1 per roadmap
-        cat = params.get('cat')  # category slug
-        city = params.get('city')  # substring search on location
-        min_price = params.get('minPrice')
-        max_price = params.get('maxPrice')
-        rating_gte = params.get('ratingGte')
+        qs = filter_listings(qs, params)
         sort = params.get('sort')
-        customization_contains = params.get('customization')  # single customization option token
-        roles = params.get('roles')  # comma-separated flattened tokens, e.g., Gender:Women,Role:Photographer
-
-        if cat:
-            qs = qs.filter(category__slug=cat)
-        if city:
-            qs = qs.filter(location__icontains=city)
-        if rating_gte:
-            try:
-                qs = qs.filter(rating__gte=float(rating_gte))
-            except ValueError:
-                pass
-        if min_price:
-            try:
-                qs = qs.filter(price_min__gte=float(min_price))
-            except ValueError:
-                pass
-        if max_price:
-            try:
-                qs = qs.filter(price_min__lte=float(max_price))
-            except ValueError:
-                pass
-
-        # Attribute contains filtering (attire customization options)
-        if customization_contains:
-            qs = qs.filter(attire_attrs__customizationOptions__icontains=customization_contains)
-
-        # Roles/subchoices filter via provider profile tokens (OR semantics)
-        if roles:
-            tokens = [t.strip() for t in roles.split(',') if t.strip()]
-            if tokens:
-                cond = Q()
-                for tok in tokens:
-                    # JSONB contains list operator: array contains given single-item array
-                    cond |= Q(created_by__profile__provider_subchoice_tokens__contains=[tok])
-                if cond:
-                    qs = qs.filter(cond)
 
         # Sorting
         if sort == 'featured':
-            qs = qs.order_by('-featured', '-rating')
+            qs = qs.order_by('-featured', '-rating', 'id')
         elif sort == 'price-asc':
-            qs = qs.order_by('price_min')
+            qs = qs.order_by('price_min', 'id')
         elif sort == 'price-desc':
-            qs = qs.order_by('-price_min')
+            qs = qs.order_by('-price_min', '-id')
         elif sort == 'rating-desc':
-            qs = qs.order_by('-rating')
+            qs = qs.order_by('-rating', 'id')
 
         return qs
 
@@ -122,6 +155,57 @@ class ListingListView(generics.ListCreateAPIView):
         else:
             serializer.save()
 
+class ListingCityAutocompleteView(views.APIView):
+    """City suggestions for the listing browser: `?q=add&limit=10`.
+
+    Prefix matches on the normalized city come first (btree pattern index);
+    for longer inputs we top up with infix matches (trigram index on Postgres).
+    """
+    permission_classes = [permissions.AllowAny]
+    max_limit = 25
+
+    def get(self, request):
+        prefix = normalize_city(request.query_params.get('q'))
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', 10)), self.max_limit))
+        except ValueError:
+            limit = 10
+        base = Listing.objects.filter(status='published').exclude(city_key='')
+
+        def suggest(qs, n):
+            return list(
+                qs.values('city_key')
+                .annotate(city=models.Min('city'), count=models.Count('id'))
+                .order_by('-count', 'city_key')[:n]
+            )
+
+        rows = suggest(base.filter(city_key__startswith=prefix) if prefix else base, limit)
+        if prefix and len(prefix) >= 3 and len(rows) < limit:
+            seen = [r['city_key'] for r in rows]
+            rows += suggest(base.filter(city_key__contains=prefix).exclude(city_key__in=seen), limit - len(rows))
+        return Response([{'city': r['city'], 'count': r['count']} for r in rows])
+
+class ListingFacetsView(views.APIView):
+    """Sidebar counts for the listing browser, for the same filter params as `ListingListView`."""
+    permission_classes = [permissions.AllowAny]
+    facet_query_params = frozenset({
+        'cat', 'city', 'minPrice', 'maxPrice', 'ratingGte', 'roles', 'customization', 'search',
+        'availableFrom', 'availableTo',
+    })
+
+    def get(self, request):
+        key = listing_page_cache_key(request, self.facet_query_params)
+        if key is not None:
+            cached = cache.get(key)
+            if cached is not None:
+                return Response(cached)
+        qs = filter_listings(Listing.objects.filter(status='published'), request.query_params)
+        qs = search_listings(qs, request.query_params.get('search', ''))
+        data = compute_facets(qs)
+        if key is not None:
+            cache.set(key, data, page_cache_ttl())
+        return Response(data)
+
 class SubchoicesUnionView(views.APIView):
     permission_classes = [permissions.AllowAny]
 
@@ -189,20 +273,27 @@ class SubchoicesUnionView(views.APIView):
         result = {g: sorted(list(vals)) for g, vals in union.items()}
         return Response(result)
 
-class FeaturedListingListView(generics.ListAPIView):
-    queryset = Listing.objects.select_related('category', 'created_by').filter(featured=True, status='published')
-    serializer_class = ListingSerializer
+class FeaturedListingListView(CachedListMixin, generics.ListAPIView):
+    queryset = Listing.objects.select_related('category', 'created_by__profile').filter(featured=True, status='published')
+    serializer_class = ListingListSerializer
     pagination_class = None # No pagination for featured items
-    
-    # Small list; cache for short TTL (5 minutes)
-    @method_decorator(cache_page(60 * 5))
-    def dispatch(self, *args, **kwargs):
-        return super().dispatch(*args, **kwargs)
+    # Versioned cache: invalidated by any listing change, so publishes show up immediately
+    cache_query_params = frozenset()
 
-class ListingDetailView(generics.RetrieveAPIView):
-    queryset = Listing.objects.select_related('category', 'created_by')
+class ListingDetailView(ConditionalGetMixin, generics.RetrieveAPIView):
+    queryset = Listing.objects.select_related('category', 'created_by__profile')
     serializer_class = ListingSerializer
     permission_classes = [IsProviderOwnerOrReadOnly]
+    # The row version plus the joined values the payload renders, which live on other rows
+    etag_fields = (
+        'updated_at', 'category__slug', 'created_by__username', 'created_by__profile__business_name',
+        'created_by__profile__city', 'created_by__profile__country',
+    )
+
+    def get_etag_basis(self, request, *args, **kwargs):
+        row = self.get_queryset().filter(pk=kwargs.get('pk')).values_list(*self.etag_fields).first()
+        # Unknown/hidden listing: let the normal 404 path answer
+        return None if row is None else [row, signature_epoch()]
 
     def get_queryset(self):
         qs = super().get_queryset()
@@ -213,8 +304,28 @@ class ListingDetailView(generics.RetrieveAPIView):
         return qs.filter(status='published')
 
 
+class ListingChangesView(views.APIView):
+    """Listings created/updated/published/unpublished after `?since=` (cursor or ISO timestamp).
+
+    Poll with the returned `next`; `?limit=` caps the page (default 100, max 500).
+    See `listings.changes` for the entry format.
+    """
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request):
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', changes.DEFAULT_LIMIT)), changes.MAX_LIMIT))
+        except ValueError:
+            limit = changes.DEFAULT_LIMIT
+        try:
+            feed = changes.build_feed(request.query_params.get('since'), limit, request)
+        except changes.InvalidCursor:
+            return Response({'detail': 'since must be a feed cursor or an ISO-8601 timestamp'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(feed)
+
+
 class MyListingListView(generics.ListAPIView):
-    serializer_class = ListingSerializer
+    serializer_class = ListingListSerializer
     pagination_class = StandardResultsSetPagination
     permission_classes = [IsProviderOwnerOrReadOnly]
 
@@ -222,7 +333,65 @@ class MyListingListView(generics.ListAPIView):
         user = self.request.user
         if not user.is_authenticated:
             return Listing.objects.none()
-        return Listing.objects.select_related('category', 'created_by').filter(created_by=user).order_by('-id')
+        return Listing.objects.select_related('category', 'created_by__profile').filter(created_by=user).order_by('-id')
+
+
+class ListingImportView(views.APIView):
+    """Bulk-create draft listings from NDJSON or CSV.
+
+    Send the file as the raw body (`Content-Type: application/x-ndjson` or `text/csv`)
+    or as multipart field `file`; `?as=csv|ndjson` overrides detection. The import runs
+    to completion before the response starts; the body is an NDJSON report: one line per
+    row (`{"row", "id"}` or `{"row", "errors"}`) followed by a `{"summary": ...}` line.
+    """
+    permission_classes = [IsProviderOrReadOnly]
+    parser_classes = [MultiPartParser]
+
+    def post(self, request):
+        upload = request.FILES.get('file') if request.content_type.startswith('multipart/') else None
+        try:
+            fmt = bulk.detect_format(
+                request.query_params.get('as'),
+                upload.content_type if upload else request.content_type,
+                upload.name if upload else None,
+            )
+        except ValueError as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        if request.content_type.startswith('multipart/') and upload is None:
+            return Response({'detail': 'No file provided'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            chunk_size = int(request.query_params.get('chunk_size', bulk.DEFAULT_CHUNK_SIZE))
+        except ValueError:
+            chunk_size = bulk.DEFAULT_CHUNK_SIZE
+        try:
+            source = bulk.spool_input(upload or request.stream)
+        except bulk.ImportFormatError as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        with source:
+            try:
+                bulk.check_input(source, fmt)
+            except bulk.ImportFormatError as exc:
+                return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+            importer = bulk.ListingImporter(request.user, chunk_size=min(chunk_size, 1000))
+            report = bulk.write_report(importer.run(bulk.parse_rows(bulk.iter_text_lines(source), fmt)))
+        return FileResponse(report, content_type='application/x-ndjson')
+
+
+class MyListingExportView(views.APIView):
+    """Stream the caller's listings as NDJSON (default) or CSV (`?as=csv`), import-compatible."""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        fmt = (request.query_params.get('as') or 'ndjson').lower()
+        if fmt not in bulk.FORMATS:
+            return Response({'detail': 'Unsupported format'}, status=status.HTTP_400_BAD_REQUEST)
+        rows = bulk.export_rows(Listing.objects.filter(created_by=request.user))
+        if fmt == 'csv':
+            response = StreamingHttpResponse(bulk.render_csv(rows), content_type='text/csv')
+        else:
+            response = StreamingHttpResponse(bulk.render_ndjson(rows), content_type='application/x-ndjson')
+        response['Content-Disposition'] = f'attachment; filename="listings.{fmt}"'
+        return response
 
 
 class PublishListingView(generics.UpdateAPIView):
@@ -242,12 +411,61 @@ class PublishListingView(generics.UpdateAPIView):
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
+def store_uploaded_image(request, content, filename, content_type, size):
+    """Write an accepted upload to media storage once, record its ImageAsset and queue variants.
+
+    `content` is a file object; storage backends stream it. Returns the 201 response.
+    """
+    try:
+        storage = get_media_storage()
+        relative_path = storage.save(uploads.unique_upload_path(filename), content, content_type)
+    except MediaStorageError as exc:
+        return Response({'detail': exc.detail, **exc.extra}, status=exc.status_code)
+    return register_image_asset(request, storage, relative_path, content_type, size)
+
+
+def register_image_asset(request, storage, relative_path, content_type, size):
+    """Record an original already in storage as an ImageAsset and queue its variants; 201 response."""
+    if storage.name == 'supabase' and getattr(settings, 'SUPABASE_PRIVATE_BUCKET', False):
+        try:
+            url = sign_paths([relative_path], storage=storage).get(relative_path)
+        except MediaStorageError as exc:
+            return Response({'detail': exc.detail, **exc.extra}, status=exc.status_code)
+        if not url:
+            return Response({'detail': 'Failed to sign URL'}, status=502)
+    else:
+        url = storage.url(relative_path, request)
+
+    asset = ImageAsset.objects.create(
+        owner=request.user,
+        path=relative_path,
+        backend=storage.name,
+        content_type=content_type or '',
+        size=size,
+    )
+    transaction.on_commit(lambda: process_image_asset.delay(asset.pk))
+    return Response({
+        'id': asset.pk,
+        'url': url,
+        'path': relative_path,
+        # Filled in by the background task; poll status_url
+        'thumb_path': None,
+        'status': asset.status,
+        'status_url': request.build_absolute_uri(reverse('image-asset-detail', args=[asset.pk])),
+    }, status=201)
+
+
 class ImageUploadView(views.APIView):
-    """Upload an image and return its public URL.
+    """Upload an image and return its URL; variants are generated in the background.
 
     Strategy:
-    - If MEDIA_STORAGE_BACKEND == 'supabase': upload via Supabase Storage REST API using service role key.
-    - Else: save to local MEDIA_ROOT under uploads/ and return served URL.
+    - The original is written once to the configured media storage (Supabase Storage REST API
+      with the service role key, or local MEDIA_ROOT under uploads/), streamed from the
+      parser's upload file rather than read into memory.
+    - An ImageAsset records it and `listings.tasks.process_image_asset` builds the thumbnail
+      after commit. Poll `status_url` (ImageAssetDetailView) for `thumb_path`/variants.
+    - Large files can use the resumable session endpoints instead (ImageUploadSession*View).
+    - Clients that can PUT straight to storage should prefer DirectUpload*View.
     """
     permission_classes = [permissions.IsAuthenticated]
     # Enable handling of multipart/form-data for file uploads (global settings only allow JSONParser)
@@ -257,103 +475,242 @@ class ImageUploadView(views.APIView):
         file_obj = request.FILES.get('file')
         if not file_obj:
             return Response({'detail': 'No file provided (expected field name `file`)'}, status=400)
+        refused = uploads.check_image_upload(file_obj.content_type, file_obj.size)
+        if refused:
+            return Response(refused[0], status=refused[1])
+        return store_uploaded_image(request, file_obj, file_obj.name, file_obj.content_type, file_obj.size)
 
-        # Validate content type
-        allowed_types = getattr(settings, 'ALLOWED_IMAGE_TYPES', {'image/jpeg', 'image/png', 'image/webp'})
-        if file_obj.content_type not in allowed_types:
-            return Response({'detail': 'Unsupported image type', 'allowed': list(allowed_types)}, status=415)
-        # Validate size
-        max_mb = getattr(settings, 'MAX_UPLOAD_IMAGE_MB', 5)
-        size_mb = file_obj.size / (1024 * 1024)
-        if size_mb > max_mb:
-            return Response({'detail': f'File too large ({size_mb:.2f}MB > {max_mb}MB)'}, status=413)
-
-        backend = getattr(settings, 'MEDIA_STORAGE_BACKEND', 'local')
-        # Allow an 'auto' mode: if Supabase creds present, use supabase, else local
-        if backend == 'auto':
-            if all([
-                getattr(settings, 'SUPABASE_URL', ''),
-                getattr(settings, 'SUPABASE_BUCKET', ''),
-                getattr(settings, 'SUPABASE_SERVICE_ROLE_KEY', ''),
-            ]):
-                backend = 'supabase'
-            else:
-                backend = 'local'
-        filename_root, ext = os.path.splitext(file_obj.name)
-        if not ext:
-            ext = '.jpg'
-        unique_name = f"{uuid.uuid4().hex}{ext.lower()}"
-
-        if backend == 'supabase':
-            supabase_url = getattr(settings, 'SUPABASE_URL', '')
-            bucket = getattr(settings, 'SUPABASE_BUCKET', '')
-            service_key = getattr(settings, 'SUPABASE_SERVICE_ROLE_KEY', '')
-            if not (supabase_url and bucket and service_key):
-                return Response({'detail': 'Supabase storage not fully configured'}, status=500)
-            storage_endpoint = f"{supabase_url}/storage/v1/object/{bucket}/uploads/{unique_name}"
-            try:
-                resp = requests.post(
-                    storage_endpoint,
-                    headers={
-                        'Authorization': f"Bearer {service_key}",
-                        'Content-Type': file_obj.content_type or 'application/octet-stream',
-                    },
-                    data=file_obj.read(),
-                    timeout=15,
-                )
-            except requests.RequestException as exc:
-                return Response({'detail': f'Upload error: {exc}'}, status=502)
-            if resp.status_code not in (200, 201):
-                return Response({'detail': 'Supabase upload failed', 'status_code': resp.status_code, 'body': resp.text[:400]}, status=502)
-            # Return both full public URL (for immediate preview) and relative path (recommended to store in DB)
-            relative_path = f"uploads/{unique_name}"
-            private_bucket = getattr(settings, 'SUPABASE_PRIVATE_BUCKET', False)
-            if private_bucket:
-                # Generate signed URL via Supabase storage API
-                signed_ttl = getattr(settings, 'SUPABASE_SIGNED_URL_TTL', 3600)
-                sign_endpoint = f"{supabase_url}/storage/v1/object/sign/{bucket}/{relative_path}"
-                try:
-                    sign_resp = requests.post(sign_endpoint, headers={'Authorization': f'Bearer {service_key}', 'Content-Type': 'application/json'}, json={'expiresIn': signed_ttl})
-                    if sign_resp.status_code not in (200, 201):
-                        return Response({'detail': 'Failed to sign URL', 'status_code': sign_resp.status_code, 'body': sign_resp.text[:400]}, status=502)
-                    signed_data = sign_resp.json()
-                    public_url = signed_data.get('signedURL') or signed_data.get('signedUrl') or ''
-                except requests.RequestException as exc:
-                    return Response({'detail': f'Failed to sign URL: {exc}'}, status=502)
-            else:
-                public_url = f"{supabase_url}/storage/v1/object/public/{bucket}/{relative_path}"
 
-            # Create a thumbnail (only for public or private; store as uploads/thumbs/<uuid>.jpg)
-            thumb_relative = None
-            try:
-                from io import BytesIO
-                from PIL import Image
-                # Need original bytes again; re-download if needed when file_obj already consumed
-                # For simplicity, assume we can re-fetch from Supabase just uploaded
-                get_endpoint = f"{supabase_url}/storage/v1/object/{bucket}/{relative_path}"
-                img_resp = requests.get(get_endpoint, headers={'Authorization': f'Bearer {service_key}'}, timeout=10)
-                if img_resp.status_code in (200, 201):
-                    im = Image.open(BytesIO(img_resp.content))
-                    im.thumbnail((400, 400))
-                    buf = BytesIO()
-                    im.save(buf, format='JPEG', quality=80)
-                    thumb_name = f"thumbs/{unique_name.rsplit('.',1)[0]}.jpg"
-                    put_thumb_endpoint = f"{supabase_url}/storage/v1/object/{bucket}/{thumb_name}"
-                    put_resp = requests.post(put_thumb_endpoint, headers={'Authorization': f'Bearer {service_key}', 'Content-Type': 'image/jpeg'}, data=buf.getvalue(), timeout=15)
-                    if put_resp.status_code in (200, 201):
-                        thumb_relative = thumb_name
-            except Exception:
-                pass  # Fail silently for thumbnail
-
-            return Response({'url': public_url, 'path': relative_path, 'thumb_path': thumb_relative}, status=201)
-
-        # Local fallback
-        saved_path = default_storage.save(f"uploads/{unique_name}", ContentFile(file_obj.read()))
-        if hasattr(default_storage, 'url'):
-            url = request.build_absolute_uri(default_storage.url(saved_path))
+class ImageUploadSessionCreateView(views.APIView):
+    """Start a resumable upload: `{"filename", "content_type", "size"}` -> session id and upload_url.
+
+    Then PUT raw bytes to `upload_url`, optionally in pieces with `Content-Range: bytes a-b/size`;
+    GET it to learn how many bytes were received after an interruption.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        filename = str(request.data.get('filename') or '')[:255]
+        content_type = str(request.data.get('content_type') or '')
+        try:
+            size = int(request.data.get('size'))
+        except (TypeError, ValueError):
+            return Response({'detail': 'size (bytes) required'}, status=400)
+        if size <= 0:
+            return Response({'detail': 'size must be positive'}, status=400)
+        refused = uploads.check_image_upload(content_type, size)
+        if refused:
+            return Response(refused[0], status=refused[1])
+        session = ImageUploadSession.objects.create(owner=request.user, filename=filename, content_type=content_type, size=size)
+        return Response(self.describe(request, session), status=201)
+
+    @staticmethod
+    def describe(request, session):
+        return {
+            'id': str(session.pk),
+            'size': session.size,
+            'received': session.received,
+            'upload_url': request.build_absolute_uri(reverse('image-upload-session', args=[session.pk])),
+        }
+
+
+class ImageUploadSessionView(views.APIView):
+    """GET progress, PUT the next byte range, DELETE to abandon a resumable upload."""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_session(self, request, pk, lock=False):
+        qs = ImageUploadSession.objects.filter(owner=request.user)
+        if lock:
+            qs = qs.select_for_update()
+        return generics.get_object_or_404(qs, pk=pk)
+
+    def get(self, request, pk):
+        session = self.get_session(request, pk)
+        return Response(ImageUploadSessionCreateView.describe(request, session))
+
+    def put(self, request, pk):
+        # Lock only while checking the offset; the body is streamed with no transaction open
+        with transaction.atomic():
+            session = self.get_session(request, pk, lock=True)
+            if session.asset_id:
+                return Response({'detail': 'Upload already completed', 'asset': session.asset_id}, status=409)
+            if not session.complete:
+                start, length, refused = self.check_range(request, session)
+                if refused:
+                    return refused
+        if session.complete:
+            # Every byte is in; a previous attempt failed while storing the result
+            return self.finish(request, session)
+
+        chunk, written = uploads.spool_chunk(request.stream, length)
+        if not written:
+            chunk.close()
+            return Response(ImageUploadSessionCreateView.describe(request, session), status=202)
+        try:
+            storage = get_media_storage()
+            with chunk:
+                part = storage.save(uploads.part_path(session, start), File(chunk), 'application/octet-stream')
+        except MediaStorageError as exc:
+            return Response({'detail': exc.detail, **exc.extra}, status=exc.status_code)
+        parts = session.parts + [part]
+        # Only counts if nobody else advanced the session meanwhile
+        accepted = ImageUploadSession.objects.filter(pk=session.pk, received=start, asset__isnull=True).update(
+            received=start + written, parts=parts, updated_at=timezone.now(),
+        )
+        if not accepted:
+            uploads.discard_parts([part], storage)
+            session.refresh_from_db(fields=['received'])
+            return Response({'detail': 'Unexpected offset', 'received': session.received}, status=409)
+        session.received, session.parts = start + written, parts
+        if not session.complete:
+            return Response(ImageUploadSessionCreateView.describe(request, session), status=202)
+        return self.finish(request, session, storage)
+
+    @staticmethod
+    def check_range(request, session):
+        """(start, length, None) for the range this PUT carries, or (None, None, error response)."""
+        if not request.META.get('CONTENT_LENGTH'):
+            return None, None, Response({'detail': 'Content-Length required'}, status=411)
+        if request.stream is None:
+            return None, None, Response({'detail': 'Empty request body'}, status=400)
+        content_range = request.headers.get('Content-Range')
+        if content_range:
+            parsed = uploads.parse_content_range(content_range)
+            if parsed is None:
+                return None, None, Response({'detail': 'Malformed Content-Range'}, status=400)
+            start, end, total = parsed
+            if total not in (None, session.size) or end >= session.size:
+                return None, None, Response({'detail': 'Range exceeds declared size'}, status=416)
+            length = end - start + 1
         else:
-            url = request.build_absolute_uri(f"{settings.MEDIA_URL}{saved_path}")
-        return Response({'url': url, 'path': saved_path}, status=201)
+            start, length = session.received, session.size - session.received
+        if start != session.received:
+            # Client must resume from what we actually have
+            return None, None, Response({'detail': 'Unexpected offset', 'received': session.received}, status=409)
+        return start, length, None
+
+    def finish(self, request, session, storage=None):
+        """Concatenate the parts into the final upload and record its ImageAsset."""
+        try:
+            storage = storage or get_media_storage()
+            assembled = uploads.assemble_parts(session.parts, storage)
+        except MediaStorageError as exc:
+            return Response({'detail': exc.detail, **exc.extra}, status=exc.status_code)
+        with assembled:
+            response = store_uploaded_image(request, File(assembled), session.filename, session.content_type, session.size)
+        if response.status_code == 201:
+            ImageUploadSession.objects.filter(pk=session.pk).update(asset_id=response.data['id'], parts=[])
+            uploads.discard_parts(session.parts, storage)
+        return response
+
+    def delete(self, request, pk):
+        session = self.get_session(request, pk)
+        if session.parts:
+            uploads.discard_parts(session.parts, get_media_storage())
+        session.delete()
+        return Response(status=204)
+
+
+class DirectUploadCreateView(views.APIView):
+    """Issue a direct-to-storage upload target: `{"filename", "content_type", "size"}`.
+
+    The client sends the bytes to `upload.url` (with `upload.method`/`upload.headers`), never
+    through this app, then POSTs `token` to `finalize_url`. With the local backend the target
+    is LocalDirectUploadView, which stands in for the storage service.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        content_type = str(request.data.get('content_type') or '')
+        try:
+            size = int(request.data.get('size'))
+        except (TypeError, ValueError):
+            return Response({'detail': 'size (bytes) required'}, status=400)
+        if size <= 0:
+            return Response({'detail': 'size must be positive'}, status=400)
+        refused = uploads.check_image_upload(content_type, size)
+        if refused:
+            return Response(refused[0], status=refused[1])
+        relative_path = uploads.unique_upload_path(request.data.get('filename'), content_type)
+        try:
+            storage = get_media_storage()
+            target = storage.create_upload_target(relative_path, content_type, uploads.max_upload_bytes(), request)
+        except MediaStorageError as exc:
+            return Response({'detail': exc.detail, **exc.extra}, status=exc.status_code)
+        return Response({
+            'path': relative_path,
+            'upload': target,
+            'token': uploads.direct_upload_token(request.user, storage, relative_path, content_type),
+            'expires_in': uploads.direct_upload_ttl(),
+            'finalize_url': request.build_absolute_uri(reverse('image-direct-upload-finalize')),
+        }, status=201)
+
+
+class DirectUploadFinalizeView(views.APIView):
+    """Verify a directly uploaded object (exists, allowed type, within size) and queue its variants."""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        claims = uploads.read_direct_upload_token(request.data.get('token'), request.user)
+        if claims is None:
+            return Response({'detail': 'Invalid or expired upload token'}, status=400)
+        relative_path = claims['path']
+        existing = ImageAsset.objects.filter(path=relative_path, owner=request.user).first()
+        if existing is not None:
+            # Finalize is idempotent: a retried call returns the asset already registered
+            return Response(ImageAssetSerializer(existing, context={'request': request}).data)
+        try:
+            storage = get_media_storage()
+            if storage.name != claims['backend']:
+                return Response({'detail': 'Media storage changed since the upload was issued'}, status=409)
+            info = storage.stat(relative_path)
+            if info is None:
+                return Response({'detail': 'Upload not found in storage'}, status=409)
+            content_type = (info['content_type'] or claims['type']).split(';')[0].strip()
+            refused = uploads.check_image_upload(content_type, info['size'])
+            if refused is None and content_type != claims['type']:
+                refused = {'detail': 'Stored content type does not match the issued upload'}, 415
+            if refused:
+                storage.delete(relative_path)
+                return Response(refused[0], status=refused[1])
+        except MediaStorageError as exc:
+            return Response({'detail': exc.detail, **exc.extra}, status=exc.status_code)
+        return register_image_asset(request, storage, relative_path, content_type, info['size'])
+
+
+class LocalDirectUploadView(views.APIView):
+    """Local stand-in for a storage presigned PUT: the signed token in the URL is the only credential."""
+    authentication_classes = []
+    permission_classes = [permissions.AllowAny]
+
+    def put(self, request, token):
+        claims = uploads.read_local_upload_token(token)
+        if claims is None:
+            return Response({'detail': 'Invalid or expired upload URL'}, status=403)
+        if (request.content_type or '').split(';')[0].strip() != claims['type']:
+            return Response({'detail': 'Content-Type does not match the signed upload'}, status=415)
+        try:
+            length = int(request.headers.get('Content-Length') or 0)
+        except ValueError:
+            length = 0
+        if length <= 0:
+            return Response({'detail': 'Content-Length required'}, status=411)
+        if length > claims['max']:
+            return Response({'detail': 'Upload exceeds the signed size limit'}, status=413)
+        try:
+            uploads.store_local_stream(claims['path'], request.stream, length)
+        except FileExistsError:
+            return Response({'detail': 'Upload URL already used'}, status=409)
+        return Response(status=201)
+
+
+class ImageAssetDetailView(generics.RetrieveAPIView):
+    """Processing status and variant paths of one of the caller's uploads."""
+    serializer_class = ImageAssetSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return ImageAsset.objects.filter(owner=self.request.user)
 
 
 class ListingAvailabilityCreateView(generics.CreateAPIView):
@@ -377,43 +734,75 @@ class ListingAvailabilityMonthView(views.APIView):
     permission_classes = [permissions.AllowAny]
 
     def get(self, request, pk):
-        # Accept ?month=YYYY-MM else current month
-        from datetime import date, timedelta
-        month_param = request.query_params.get('month')
-        today = date.today()
-        if month_param:
-            try:
-                year, month = map(int, month_param.split('-'))
-                first_day = date(year, month, 1)
-            except Exception:
-                first_day = date(today.year, today.month, 1)
-        else:
-            first_day = date(today.year, today.month, 1)
-        # Compute last day of month
-        if first_day.month == 12:
-            next_month = date(first_day.year + 1, 1, 1)
-        else:
-            next_month = date(first_day.year, first_day.month + 1, 1)
-        last_day = next_month - timedelta(days=1)
-
-        listing = generics.get_object_or_404(Listing, pk=pk, status='published')
-        # Fetch overlapping bookings
-        bookings = ListingAvailability.objects.filter(
-            listing=listing,
-            status__in=[ListingAvailability.STATUS_TENTATIVE, ListingAvailability.STATUS_CONFIRMED],
-            start_date__lte=last_day,
-            end_date__gte=first_day,
-        ).only('start_date', 'end_date')
-        booked_dates = set()
-        for b in bookings:
-            cur = b.start_date
-            while cur <= b.end_date and cur <= last_day:
-                if cur >= first_day:
-                    booked_dates.add(cur.isoformat())
-                cur += timedelta(days=1)
+        # Accept ?month=YYYY-MM else current month; ?months=N (<= 12) spans several months
+        from datetime import date
+        first_day = availability.parse_month(request.query_params.get('month'), date.today())
+        try:
+            months = int(request.query_params.get('months', 1))
+        except ValueError:
+            months = 1
+        start, end = availability.month_window(first_day, months)
+
+        listing = generics.get_object_or_404(Listing.objects.only('id'), pk=pk, status='published')
+        calendar = availability.Calendar.for_listing(listing.id, start, end)
+        first_free = calendar.first_free()
         return Response({
             'listing': listing.id,
             'month': first_day.strftime('%Y-%m'),
-            'booked': sorted(booked_dates),
+            'until': (end - availability.ONE_DAY).isoformat(),
+            'booked': calendar.booked_days(),
+            'booked_ranges': availability.as_inclusive(calendar.booked),
+            'free_ranges': availability.as_inclusive(calendar.free_ranges()),
+            'free_days': calendar.free_day_count(),
+            'first_free': first_free.isoformat() if first_free else None,
         })
 
+
+
+class ListingAvailabilityBatchView(views.APIView):
+    """Calendars for many listings at once: `?ids=1,2,3&month=YYYY-MM&months=N&encoding=ranges|bitmap`.
+
+    `ranges` (default) gives inclusive booked `[first, last]` pairs per listing; `bitmap`
+    gives base64 day bits from the window start. Responses carry an ETag derived from a
+    cheap aggregate, so unchanged calendars are answered 304 without building the payload.
+    """
+    permission_classes = [permissions.AllowAny]
+    max_ids = 50
+
+    def get(self, request):
+        raw_ids = [part.strip() for part in (request.query_params.get('ids') or '').split(',') if part.strip()]
+        try:
+            ids = sorted({int(part) for part in raw_ids})
+        except ValueError:
+            return Response({'detail': 'ids must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+        if not ids or len(ids) > self.max_ids:
+            return Response({'detail': f'Provide 1-{self.max_ids} listing ids'}, status=status.HTTP_400_BAD_REQUEST)
+        encoding = request.query_params.get('encoding') or 'ranges'
+        if encoding not in ('ranges', 'bitmap'):
+            return Response({'detail': 'encoding must be ranges or bitmap'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            months = int(request.query_params.get('months', 1))
+        except ValueError:
+            months = 1
+        start, end = availability.month_window(availability.parse_month(request.query_params.get('month'), date.today()), months)
+
+        etag = make_etag(ids, start, end, encoding, availability.batch_version(ids))
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            not_modified['ETag'] = etag
+            return not_modified
+
+        booked = availability.batch_booked_ranges(ids, start, end)
+        if encoding == 'bitmap':
+            calendars = {str(pk): availability.encode_bitmap(ranges, start, end) for pk, ranges in booked.items()}
+        else:
+            calendars = {str(pk): availability.as_inclusive(ranges) for pk, ranges in booked.items()}
+        resp = Response({
+            'from': start.isoformat(),
+            'until': (end - availability.ONE_DAY).isoformat(),
+            'encoding': encoding,
+            'listings': calendars,
+        })
+        resp['ETag'] = etag
+        resp['Cache-Control'] = 'no-cache'
+        return resp
@@ -4,3 +4,18 @@ from django.apps import AppConfig
 class MessagingConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "messaging"
+
+    def ready(self):
+        from django.db.models.signals import post_delete
+        from django.dispatch import receiver
+
+        from .models import Message, MessageThread
+        from .services import refresh_thread_summary_on_commit
+
+        @receiver(post_delete, sender=Message, dispatch_uid="messaging_thread_summary_on_delete")
+        def _refresh_thread_summary(sender, instance, origin=None, **kwargs):
+            # Sends keep the summary current; deletes (admin, user/listing cascades) rebuild it
+            # once per thread on commit. Nothing to do when the thread itself is going away.
+            if isinstance(origin, MessageThread) or getattr(origin, "model", None) is MessageThread:
+                return
+            refresh_thread_summary_on_commit(instance.thread_id)
@@ -0,0 +1,94 @@
+"""Keyset windows over a thread's message history.
+
+Message ids only grow, so `(thread_id, id)` is a stable sort key and every
+window is one range scan on `message_thread_id_idx` with a LIMIT: the newest
+`limit` messages, the `limit` before a given id (scrolling back), or the
+`limit` after one (catching up). Nothing is counted or offset, so opening a
+50k-message thread costs the same as opening a 5-message one.
+
+The full transcript is only available through `transcript_lines()`, which
+streams NDJSON from a server-side cursor instead of building one response body.
+"""
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Message
+
+DEFAULT_LIMIT = 30
+MAX_LIMIT = 100
+EXPORT_CHUNK_SIZE = 500
+
+
+def _positive(raw, cap=None):
+    value = int(raw)
+    if value <= 0:
+        raise ValueError(raw)
+    return min(value, cap) if cap else value
+
+
+def parse_window(params):
+    """(before, after, limit) from query params; raises ValueError on malformed values."""
+    before = params.get("before")
+    after = params.get("after")
+    if before and after:
+        raise ValueError("Use either 'before' or 'after', not both")
+    limit = params.get("limit")
+    try:
+        return (
+            _positive(before) if before else None,
+            _positive(after) if after else None,
+            _positive(limit, cap=MAX_LIMIT) if limit else DEFAULT_LIMIT,
+        )
+    except ValueError:
+        raise ValueError("'before', 'after' and 'limit' must be positive integers") from None
+
+
+def message_window(thread_id, before=None, after=None, limit=DEFAULT_LIMIT):
+    """Up to `limit` messages in chronological order, plus whether older/newer ones exist.
+
+    Only the side being walked is probed (by fetching one extra row); the other
+    side is known from the cursor itself: a `before` page always has newer
+    messages, an `after` page always has older ones.
+    """
+    qs = Message.objects.filter(thread_id=thread_id)
+    if after is not None:
+        rows = list(qs.filter(id__gt=after).order_by("id")[:limit + 1])
+        has_newer, has_older = len(rows) > limit, True
+        rows = rows[:limit]
+    else:
+        if before is not None:
+            qs = qs.filter(id__lt=before)
+        rows = list(qs.order_by("-id")[:limit + 1])
+        has_older, has_newer = len(rows) > limit, before is not None
+        rows = rows[:limit]
+        rows.reverse()
+    return rows, has_older, has_newer
+
+
+def window_cursor(items, has_older, has_newer, before=None, after=None):
+    """Where to continue from a window: pass `before`/`after` back as query params."""
+    return {
+        "before": items[0].id if items else before,
+        "after": items[-1].id if items else after,
+        "hasOlder": has_older,
+        "hasNewer": has_newer,
+    }
+
+
+def transcript_lines(thread_id, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield a thread's messages oldest first as NDJSON lines, one chunk in memory at a time."""
+    rows = (
+        Message.objects.filter(thread_id=thread_id)
+        .order_by("id")
+        .values("id", "sender_id", "sender__username", "text", "created_at")
+        .iterator(chunk_size=chunk_size)
+    )
+    for row in rows:
+        yield json.dumps({
+            "id": row["id"],
+            "senderId": row["sender_id"],
+            "sender": row["sender__username"],
+            "text": row["text"],
+            "createdAt": row["created_at"],
+        }, cls=DjangoJSONEncoder) + "\n"
@@ -0,0 +1,38 @@
+"""The caller's inbox as one annotated query.
+
+Every thread row carries what the list renders: the caller's own
+`ThreadParticipant` state (joined through a FilteredRelation rather than a
+per-row lookup), the denormalized last-message summary kept on
+`MessageThread` by `messaging.services.post_message`, and the first other
+participant's display name. Combined with keyset pagination on
+`(-last_updated, -id)`, an inbox page costs the same few queries whether the
+user has 5 or 5,000 conversations.
+"""
+from django.db.models import F, FilteredRelation, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce, NullIf
+
+from .models import MessageThread, ThreadParticipant
+
+
+def inbox_threads(user):
+    """Threads `user` participates in, annotated for MessageThreadListSerializer."""
+    counterpart = (
+        ThreadParticipant.objects.filter(thread=OuterRef("pk"))
+        .exclude(user_id=user.pk)
+        .order_by("id")
+    )
+    return (
+        MessageThread.objects.annotate(mine=FilteredRelation(
+            "thread_participants", condition=Q(thread_participants__user_id=user.pk),
+        ))
+        .filter(mine__isnull=False)
+        .select_related("listing")
+        .annotate(
+            my_unread_count=F("mine__unread_count"),
+            counterpart_id=Subquery(counterpart.values("user_id")[:1]),
+            counterpart_name=Subquery(counterpart.annotate(
+                display=Coalesce(NullIf("user__profile__business_name", Value("")), "user__username"),
+            ).values("display")[:1]),
+        )
+        .order_by("-last_updated", "-id")
+    )
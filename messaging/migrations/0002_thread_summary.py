@@ -0,0 +1,48 @@
+# Generated by Django 5.2.6 on 2026-10-18 01:50
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_thread_summaries(apps, schema_editor):
+    # Same expressions post_delete refreshes use, against the historical Message model
+    from messaging.services import thread_summary_values
+    MessageThread = apps.get_model('messaging', 'MessageThread')
+    MessageThread.objects.update(**thread_summary_values(apps.get_model('messaging', 'Message')))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='messagethread',
+            name='last_message',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='messaging.message'),
+        ),
+        migrations.AddField(
+            model_name='messagethread',
+            name='last_message_text',
+            field=models.CharField(blank=True, default='', max_length=140),
+        ),
+        migrations.AddField(
+            model_name='messagethread',
+            name='last_sender',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='messagethread',
+            name='message_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['thread', 'created_at'], name='message_thread_created_idx'),
+        ),
+        migrations.RunPython(backfill_thread_summaries, migrations.RunPython.noop),
+    ]
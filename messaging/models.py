@@ -21,6 +21,11 @@ class MessageThread(models.Model):
     last_updated = models.DateTimeField(auto_now=True)
     # Deprecated: kept for backwards compatibility; not used anymore
     unread_count = models.PositiveIntegerField(default=0)
+    # Summary of the newest message, written with each send (see messaging.services)
+    last_message = models.ForeignKey('Message', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    last_message_text = models.CharField(max_length=140, blank=True, default='')
+    last_sender = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    message_count = models.PositiveIntegerField(default=0)
 
     def __str__(self):
         return f"Thread for {self.listing.title if self.listing else 'General Inquiry'}"
@@ -33,6 +38,10 @@ class Message(models.Model):
 
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['thread', 'created_at'], name='message_thread_created_idx'),
+            models.Index(fields=['thread', 'id'], name='message_thread_id_idx'),
+        ]
 
     def __str__(self):
         tid = getattr(self.thread, 'pk', None)
@@ -34,7 +34,7 @@ class ContactRequestCreateSerializer(serializers.Serializer):
 
 class MessageSerializer(serializers.ModelSerializer):
     id = serializers.IntegerField(read_only=True)
-    thread_id = serializers.IntegerField(source="thread.id", read_only=True)
+    thread_id = serializers.IntegerField(read_only=True)
     sender = serializers.SerializerMethodField()
     createdAt = serializers.DateTimeField(source="created_at", read_only=True)
 
@@ -56,6 +56,8 @@ class MessageThreadListSerializer(serializers.ModelSerializer):
     avatar = serializers.SerializerMethodField()
     lastUpdated = serializers.DateTimeField(source="last_updated", read_only=True)
     unreadCount = serializers.SerializerMethodField()
+    lastMessage = serializers.SerializerMethodField()
+    counterpart = serializers.SerializerMethodField()
 
     class Meta:
         model = MessageThread
@@ -66,6 +68,8 @@ class MessageThreadListSerializer(serializers.ModelSerializer):
             "avatar",
             "lastUpdated",
             "unreadCount",
+            "lastMessage",
+            "counterpart",
         ]
 
     def get_title(self, obj) -> str:
@@ -92,6 +96,9 @@ class MessageThreadListSerializer(serializers.ModelSerializer):
         return request.build_absolute_uri(abs_url) if request else abs_url
 
     def get_unreadCount(self, obj) -> int:
+        # Annotated by messaging.inbox.inbox_threads(); the lookup below is the fallback
+        if hasattr(obj, "my_unread_count"):
+            return int(obj.my_unread_count or 0)
         request = self.context.get("request")
         user = getattr(request, "user", None)
         if not user or not getattr(user, "is_authenticated", False):
@@ -104,6 +111,25 @@ class MessageThreadListSerializer(serializers.ModelSerializer):
             return 0
 
 
+    def get_lastMessage(self, obj):
+        # Denormalized on the thread; last_updated is set to the message time on each send
+        if obj.last_message_id is None:
+            return None
+        request = self.context.get("request")
+        mine = request is not None and obj.last_sender_id == request.user.id
+        return {
+            "id": obj.last_message_id,
+            "text": obj.last_message_text,
+            "createdAt": serializers.DateTimeField().to_representation(obj.last_updated),
+            "sender": "me" if mine else "provider",
+        }
+
+    def get_counterpart(self, obj):
+        if getattr(obj, "counterpart_id", None) is None:
+            return None
+        return {"id": obj.counterpart_id, "name": obj.counterpart_name}
+
+
 class MessageThreadDetailSerializer(MessageThreadListSerializer):
     messages = serializers.SerializerMethodField()
 
@@ -113,8 +139,9 @@ class MessageThreadDetailSerializer(MessageThreadListSerializer):
     def get_messages(self, obj):
         qs = self.context.get("messages_qs")
         if qs is None:
-            MessageModel = apps.get_model('messaging', 'Message')
-            qs = MessageModel.objects.filter(thread=obj).order_by("created_at")
+            # Never the whole history: the newest window (see messaging.history)
+            from .history import message_window
+            qs, _, _ = message_window(obj.pk)
         return MessageSerializer(qs, many=True, context=self.context).data
 
 
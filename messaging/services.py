@@ -0,0 +1,93 @@
+"""Write paths shared by the REST views and the WebSocket consumer."""
+from django.db import transaction
+from django.db.models import Case, Count, F, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce, Substr
+
+from .models import Message, MessageThread, ThreadParticipant
+
+# Length of the denormalized MessageThread.last_message_text preview
+PREVIEW_CHARS = MessageThread._meta.get_field("last_message_text").max_length
+
+
+def post_message(thread_id: int, sender_id: int, text: str) -> Message:
+    """Insert a message and fan it out to the thread in one short transaction.
+
+    Three statements whatever the participant count: the INSERT, one UPDATE of
+    the thread's summary columns (`last_message*`, `message_count`,
+    `last_updated`), and a single `unread_count = unread_count + 1` UPDATE
+    over every other participant. Nothing is read first, so row locks are only
+    held for the duration of the UPDATEs.
+
+    Concurrent sends can commit out of id order; the summary columns only move
+    forward (to a higher message id) while `message_count` always increments.
+    """
+    with transaction.atomic():
+        msg = Message.objects.create(thread_id=thread_id, sender_id=sender_id, text=text)
+        newer = Q(last_message_id__isnull=True) | Q(last_message_id__lt=msg.pk)
+
+        def if_newer(value, column):
+            field = MessageThread._meta.get_field(column)
+            return Case(When(newer, then=value), default=F(column), output_field=getattr(field, "target_field", field))
+
+        MessageThread.objects.filter(pk=thread_id).update(
+            last_updated=if_newer(Value(msg.created_at), "last_updated"),
+            last_message_id=if_newer(Value(msg.pk), "last_message_id"),
+            last_message_text=if_newer(Value(text[:PREVIEW_CHARS]), "last_message_text"),
+            last_sender_id=if_newer(Value(sender_id), "last_sender_id"),
+            message_count=F("message_count") + 1,
+        )
+        ThreadParticipant.objects.filter(thread_id=thread_id).exclude(user_id=sender_id).update(
+            unread_count=F("unread_count") + 1,
+        )
+    return msg
+
+
+def thread_summary_values(message_model=Message):
+    """UPDATE expressions that rebuild a thread's summary columns from its messages."""
+    newest = message_model.objects.filter(thread=OuterRef("pk")).order_by("-created_at", "-id")
+    counts = message_model.objects.filter(thread=OuterRef("pk")).order_by().values("thread").annotate(n=Count("id")).values("n")
+    return {
+        "last_message_id": Subquery(newest.values("id")[:1]),
+        "last_message_text": Coalesce(Subquery(newest.annotate(
+            preview=Substr("text", 1, PREVIEW_CHARS),
+        ).values("preview")[:1]), Value("")),
+        "last_sender_id": Subquery(newest.values("sender_id")[:1]),
+        "message_count": Coalesce(Subquery(counts), Value(0)),
+    }
+
+
+def refresh_thread_summaries(thread_ids) -> int:
+    """Recompute the summary columns for threads whose messages were removed or edited out of band."""
+    return MessageThread.objects.filter(pk__in=list(thread_ids)).update(**thread_summary_values())
+
+
+class _PendingSummaryRefresh:
+    """Thread ids whose messages were deleted in the current transaction; refreshed once on commit."""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.thread_ids = set()
+
+    def __call__(self):
+        if getattr(self.connection, "_pending_summary_refresh", None) is self:
+            del self.connection._pending_summary_refresh
+        # Threads deleted in the same transaction simply match nothing
+        refresh_thread_summaries(self.thread_ids)
+
+
+def refresh_thread_summary_on_commit(thread_id) -> None:
+    """Queue `thread_id` for one summary rebuild after the surrounding transaction commits.
+
+    Deleting a user or listing removes many messages; batching keeps that to a
+    single UPDATE per transaction instead of one per message.
+    """
+    connection = transaction.get_connection()
+    if not connection.in_atomic_block:
+        refresh_thread_summaries([thread_id])
+        return
+    pending = getattr(connection, "_pending_summary_refresh", None)
+    # A rolled-back block drops its on_commit hook; start a new batch then
+    if pending is None or not any(hook is pending for _, hook, _ in connection.run_on_commit):
+        pending = connection._pending_summary_refresh = _PendingSummaryRefresh(connection)
+        transaction.on_commit(pending)
+    pending.thread_ids.add(thread_id)
@@ -1,3 +1,6 @@
+import json
+from unittest import mock
+
 from django.urls import reverse
 from django.contrib.auth.models import User
 from rest_framework.test import APITestCase, APIClient
@@ -5,6 +8,7 @@ from rest_framework import status
 
 from listings.models import Listing, Category
 from .models import MessageThread, Message
+from .services import post_message
 
 
 class MessagingApiTests(APITestCase):
@@ -25,8 +29,8 @@ class MessagingApiTests(APITestCase):
 		)
 		self.thread = MessageThread.objects.create(listing=self.listing)
 		self.thread.participants.add(self.user1, self.user2)
-		Message.objects.create(thread=self.thread, sender=self.user1, text="Hi")
-		Message.objects.create(thread=self.thread, sender=self.user2, text="Hello")
+		post_message(self.thread.id, self.user1.id, "Hi")
+		post_message(self.thread.id, self.user2.id, "Hello")
 
 	def auth(self, user: User) -> APIClient:
 		c = APIClient()
@@ -37,9 +41,53 @@ class MessagingApiTests(APITestCase):
 		url = "/api/v1/threads/"
 		resp = self.auth(self.user1).get(url)
 		self.assertEqual(resp.status_code, status.HTTP_200_OK)
-		self.assertTrue(isinstance(resp.data, list))
-		self.assertEqual(len(resp.data), 1)
-		self.assertEqual(resp.data[0]["id"], self.thread.id)
+		self.assertEqual(len(resp.data["results"]), 1)
+		self.assertEqual(resp.data["results"][0]["id"], self.thread.id)
+
+	def test_thread_list_revalidates_on_unread_change(self):
+		url = "/api/v1/threads/"
+		client = self.auth(self.user1)
+		etag = client.get(url)["ETag"]
+		with self.assertNumQueries(1):
+			self.assertEqual(client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+		# Another user's view of the same threads has its own validator
+		self.assertEqual(self.auth(self.user2).get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
+		self.auth(self.user2).post(f"/api/v1/threads/{self.thread.id}/messages/", {"text": "New"}, format="json")
+		resp = client.get(url, HTTP_IF_NONE_MATCH=etag)
+		self.assertEqual(resp.status_code, status.HTTP_200_OK)
+		self.assertEqual(resp.data["results"][0]["unreadCount"], 2)
+		# Joined data is covered too: listing title and the counterpart's name
+		etag = resp["ETag"]
+		Listing.objects.filter(pk=self.listing.pk).update(title="Renamed Venue")
+		self.assertEqual(client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
+		etag = client.get(url)["ETag"]
+		User.objects.filter(pk=self.user2.pk).update(username="u2-renamed")
+		resp = client.get(url, HTTP_IF_NONE_MATCH=etag)
+		self.assertEqual(resp.status_code, status.HTTP_200_OK)
+		self.assertEqual(resp.data["results"][0]["counterpart"]["name"], "u2-renamed")
+
+	def test_inbox_is_one_query_per_page(self):
+		from .models import ThreadParticipant
+		for i in range(6):
+			other = User.objects.create_user(username=f"c{i}", password="pass1234")
+			thread = MessageThread.objects.create(listing=self.listing)
+			thread.participants.add(self.user1, other)
+			post_message(thread.id, other.id, f"hello {i}" * 40)
+		ThreadParticipant.objects.filter(user=self.user1).update(unread_count=3)
+		client = self.auth(self.user1)
+		with self.assertNumQueries(2):  # validator digest + the page
+			first = client.get("/api/v1/threads/", {"page_size": 4}).data
+		rows = first["results"]
+		self.assertEqual(len(rows), 4)
+		self.assertEqual({r["unreadCount"] for r in rows}, {3})
+		self.assertEqual(rows[0]["counterpart"], {"id": User.objects.get(username="c5").id, "name": "c5"})
+		self.assertEqual(rows[0]["lastMessage"]["sender"], "provider")
+		self.assertEqual(len(rows[0]["lastMessage"]["text"]), 140)
+		second = client.get(first["next"]).data
+		ids = [r["id"] for r in rows + second["results"]]
+		self.assertEqual(len(ids), 7)
+		self.assertEqual(len(set(ids)), 7)
+		self.assertIsNone(second["next"])
 
 	def test_get_thread_detail(self):
 		url = f"/api/v1/threads/{self.thread.id}/"
@@ -54,6 +102,128 @@ class MessagingApiTests(APITestCase):
 		self.assertEqual(resp.status_code, status.HTTP_201_CREATED)
 		self.assertEqual(resp.data["text"], "How are you?")
 
+	def test_post_message_fans_out_in_constant_queries(self):
+		from .models import ThreadParticipant
+		# INSERT + two UPDATEs (+ SAVEPOINT/RELEASE inside the test transaction)
+		with self.assertNumQueries(5):
+			msg = post_message(self.thread.id, self.user1.id, "One")
+		for i in range(5):
+			self.thread.participants.add(User.objects.create_user(username=f"p{i}", password="pass1234"))
+		with self.assertNumQueries(5):
+			post_message(self.thread.id, self.user1.id, "Two")
+		unread = dict(ThreadParticipant.objects.filter(thread=self.thread).values_list("user__username", "unread_count"))
+		# setUp's two messages left one unread for each side
+		self.assertEqual(unread.pop("u1"), 1)
+		self.assertEqual(unread.pop("u2"), 3)
+		self.assertEqual(set(unread.values()), {1})
+		self.thread.refresh_from_db()
+		self.assertEqual(self.thread.last_updated, Message.objects.get(text="Two").created_at)
+		self.assertEqual(msg.thread_id, self.thread.id)
+
+	def test_late_commit_does_not_rewind_thread_summary(self):
+		# Inserted first but committing after a newer send: replay its summary UPDATE last
+		early = Message.objects.create(thread=self.thread, sender=self.user1, text="Early")
+		newest = post_message(self.thread.id, self.user2.id, "Newest")
+		with mock.patch.object(Message.objects, "create", return_value=early):
+			post_message(self.thread.id, self.user1.id, "Early")
+		self.thread.refresh_from_db()
+		self.assertEqual(self.thread.last_message_id, newest.id)
+		self.assertEqual(self.thread.last_message_text, "Newest")
+		self.assertEqual(self.thread.message_count, 4)
+
+	def test_thread_summary_tracks_sends_and_deletes(self):
+		self.thread.refresh_from_db()
+		latest = Message.objects.get(text="Hello")
+		self.assertEqual(self.thread.message_count, 2)
+		self.assertEqual(self.thread.last_message_id, latest.id)
+		self.assertEqual(self.thread.last_message_text, "Hello")
+		self.assertEqual(self.thread.last_sender_id, self.user2.id)
+		post_message(self.thread.id, self.user1.id, "x" * 500)
+		self.thread.refresh_from_db()
+		self.assertEqual(self.thread.message_count, 3)
+		self.assertEqual(self.thread.last_message_text, "x" * 140)
+		# Deleting the newest message falls back to the one before it (rebuilt on commit)
+		with self.captureOnCommitCallbacks(execute=True) as callbacks:
+			Message.objects.get(thread=self.thread, sender=self.user1, text__startswith="x").delete()
+		self.assertEqual(len(callbacks), 1)
+		self.thread.refresh_from_db()
+		self.assertEqual(self.thread.message_count, 2)
+		self.assertEqual(self.thread.last_message_id, latest.id)
+		self.assertEqual(self.thread.last_message_text, "Hello")
+		resp = self.auth(self.user1).get("/api/v1/threads/")
+		self.assertEqual(resp.data["results"][0]["lastMessage"]["text"], "Hello")
+		self.assertEqual(resp.data["results"][0]["lastMessage"]["sender"], "provider")
+
+	def test_bulk_message_delete_refreshes_each_thread_once(self):
+		for i in range(5):
+			post_message(self.thread.id, self.user1.id, f"m{i}")
+		with self.captureOnCommitCallbacks(execute=False) as callbacks:
+			Message.objects.filter(thread=self.thread, sender=self.user1).delete()
+		self.assertEqual(len(callbacks), 1)
+		# one UPDATE for the whole batch
+		with self.assertNumQueries(1):
+			callbacks[0]()
+		self.thread.refresh_from_db()
+		self.assertEqual((self.thread.message_count, self.thread.last_message_text), (1, "Hello"))
+		# Deleting the thread itself queues nothing
+		with self.captureOnCommitCallbacks(execute=False) as callbacks:
+			self.thread.delete()
+		self.assertEqual(callbacks, [])
+
+	def test_message_history_walks_by_id_without_counting(self):
+		for i in range(10):
+			post_message(self.thread.id, self.user1.id, f"m{i}")
+		client = self.auth(self.user1)
+		url = f"/api/v1/threads/{self.thread.id}/messages/list/"
+		# thread lookup, participant check, one LIMITed range scan; whatever the thread size
+		with self.assertNumQueries(3):
+			newest = client.get(url, {"limit": 5}).data
+		self.assertEqual([m["text"] for m in newest["results"]], ["m5", "m6", "m7", "m8", "m9"])
+		self.assertTrue(newest["hasOlder"])
+		self.assertFalse(newest["hasNewer"])
+		older = client.get(url, {"before": newest["before"], "limit": 5}).data
+		self.assertEqual([m["text"] for m in older["results"]], ["m0", "m1", "m2", "m3", "m4"])
+		oldest = client.get(url, {"before": older["before"], "limit": 5}).data
+		self.assertEqual([m["text"] for m in oldest["results"]], ["Hi", "Hello"])
+		self.assertFalse(oldest["hasOlder"])
+		self.assertTrue(oldest["hasNewer"])
+		post_message(self.thread.id, self.user2.id, "late")
+		newer = client.get(url, {"after": newest["after"]}).data
+		self.assertEqual([m["text"] for m in newer["results"]], ["late"])
+		self.assertFalse(newer["hasNewer"])
+		self.assertEqual(client.get(url, {"before": 1, "after": 2}).status_code, status.HTTP_400_BAD_REQUEST)
+		self.assertEqual(client.get(url, {"limit": "x"}).status_code, status.HTTP_400_BAD_REQUEST)
+		# Page-number mode is still served when asked for explicitly
+		legacy = client.get(url, {"page": "last", "page_size": 5}).data
+		self.assertEqual(legacy["count"], 13)
+		self.assertEqual(legacy["results"][-1]["text"], "late")
+
+	def test_thread_detail_is_bounded_and_transcript_streams(self):
+		from .history import DEFAULT_LIMIT
+		for i in range(DEFAULT_LIMIT + 5):
+			post_message(self.thread.id, self.user1.id, f"m{i}")
+		client = self.auth(self.user1)
+		resp = client.get(f"/api/v1/threads/{self.thread.id}/")
+		texts = [m["text"] for m in resp.data["messages"]]
+		self.assertEqual(len(texts), DEFAULT_LIMIT)
+		self.assertEqual(texts[-1], f"m{DEFAULT_LIMIT + 4}")
+		cursor = resp.data["messagesCursor"]
+		self.assertTrue(cursor["hasOlder"])
+		self.assertFalse(cursor["hasNewer"])
+		older = client.get(f"/api/v1/threads/{self.thread.id}/", {"before": cursor["before"]}).data
+		self.assertEqual([m["text"] for m in older["messages"]][:3], ["Hi", "Hello", "m0"])
+		self.assertFalse(older["messagesCursor"]["hasOlder"])
+		resp = client.get(f"/api/v1/threads/{self.thread.id}/messages/export/")
+		self.assertEqual(resp["Content-Type"], "application/x-ndjson")
+		lines = [json.loads(line) for line in b"".join(resp.streaming_content).splitlines()]
+		self.assertEqual(len(lines), DEFAULT_LIMIT + 7)
+		self.assertEqual((lines[0]["text"], lines[0]["sender"]), ("Hi", "u1"))
+		outsider = User.objects.create_user(username="lurker", password="pass1234")
+		self.assertEqual(
+			self.auth(outsider).get(f"/api/v1/threads/{self.thread.id}/messages/export/").status_code,
+			status.HTTP_403_FORBIDDEN,
+		)
+
 	def test_forbid_non_participant(self):
 		outsider = User.objects.create_user(username="outsider", password="pass1234")
 		url = f"/api/v1/threads/{self.thread.id}/"
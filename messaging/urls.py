@@ -7,6 +7,7 @@ from .views import (
     ThreadMarkReadView,
     ThreadStartView,
     ThreadMessagesListView,
+    ThreadTranscriptExportView,
 )
 
 urlpatterns = [
@@ -15,6 +16,7 @@ urlpatterns = [
     path("threads/", ThreadListView.as_view(), name="thread-list"),
     path("threads/<int:pk>/", ThreadDetailView.as_view(), name="thread-detail"),
     path("threads/<int:pk>/messages/list/", ThreadMessagesListView.as_view(), name="thread-messages-list"),
+    path("threads/<int:pk>/messages/export/", ThreadTranscriptExportView.as_view(), name="thread-messages-export"),
     path("threads/<int:pk>/messages/", ThreadMessageCreateView.as_view(), name="thread-message-create"),
     path("threads/<int:pk>/read/", ThreadMarkReadView.as_view(), name="thread-mark-read"),
 ]
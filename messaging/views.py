@@ -1,9 +1,14 @@
 from rest_framework import generics, status, permissions
 from rest_framework.response import Response
 from rest_framework.throttling import SimpleRateThrottle
+from core.conditional import ConditionalGetMixin, rows_digest
+from core.pagination import KeysetPagination
 from core.throttling import MessageSendThrottle, ThreadStartThrottle, ContactRequestUserThrottle
 
 from .models import ContactRequest, MessageThread, Message, ThreadParticipant
+from .history import message_window, parse_window, transcript_lines, window_cursor
+from .inbox import inbox_threads
+from .services import post_message
 from .serializers import (
 	ContactRequestSerializer,
 	ContactRequestCreateSerializer,
@@ -14,6 +19,7 @@ from .serializers import (
 )
 from django.db import transaction
 from django.contrib.auth.models import User
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from listings.models import Listing
 
@@ -53,22 +59,32 @@ class IsThreadParticipant(permissions.BasePermission):
 		return obj.participants.filter(id=request.user.id).exists()
 
 
-class ThreadListView(generics.ListAPIView):
+class InboxPagination(KeysetPagination):
+	page_size = 20
+
+
+class ThreadListView(ConditionalGetMixin, generics.ListAPIView):
+	"""The caller's threads, newest activity first, one annotated query per page (see messaging.inbox).
+
+	Keyset-paginated: follow `next`/`previous` (`?cursor=`), `?page_size=` up to 100.
+	"""
 	permission_classes = [permissions.IsAuthenticated]
 	serializer_class = MessageThreadListSerializer
+	pagination_class = InboxPagination
+
+	def get_etag_basis(self, request, *args, **kwargs):
+		# Every column the page renders, joined listing and counterpart included, but only for the
+		# requested keyset slice (plus the lookahead row deciding `next`), never the whole inbox
+		paginator = self.pagination_class()
+		threads = inbox_threads(request.user)
+		return [paginator.get_count(threads, request), rows_digest(
+			paginator.get_page_queryset(threads, request),
+			"id", "last_updated", "my_unread_count", "last_message_id", "last_message_text", "last_sender_id",
+			"listing_id", "listing__title", "listing__image", "counterpart_id", "counterpart_name",
+		)]
 
 	def get_queryset(self):
-		user = self.request.user
-		return (
-			MessageThread.objects.filter(participants=user)
-			.select_related("listing")
-			.order_by("-last_updated")
-		)
-
-	def list(self, request, *args, **kwargs):
-		qs = self.get_queryset()
-		serializer = self.get_serializer(qs, many=True, context={"request": request})
-		return Response(serializer.data)
+		return inbox_threads(self.request.user)
 
 
 class ThreadDetailView(generics.RetrieveAPIView):
@@ -77,31 +93,32 @@ class ThreadDetailView(generics.RetrieveAPIView):
 	lookup_field = "pk"
 
 	def get_queryset(self):
-		user = self.request.user
-		return MessageThread.objects.filter(participants=user).select_related("listing")
+		return inbox_threads(self.request.user)
 
 	def retrieve(self, request, *args, **kwargs):
 		instance = self.get_object()
-		# Optional pagination for messages
+		# Legacy page-number pagination for messages
 		try:
 			page = int(request.query_params.get("page", "0"))
 			page_size = int(request.query_params.get("page_size", "0"))
 		except ValueError:
 			page = 0
 			page_size = 0
-		messages_qs = Message.objects.filter(thread=instance).order_by("created_at")
-		total = messages_qs.count()
 		if page > 0 and page_size > 0:
 			start = (page - 1) * page_size
-			end = start + page_size
-			messages_qs = messages_qs[start:end]
-		serializer = self.get_serializer(
-			instance,
-			context={"request": request, "messages_qs": messages_qs},
-		)
+			messages_qs = Message.objects.filter(thread=instance).order_by("created_at")[start:start + page_size]
+			serializer = self.get_serializer(instance, context={"request": request, "messages_qs": messages_qs})
+			return Response({"count": instance.message_count, "results": serializer.data})
+		# Otherwise a bounded window (newest `limit` by default), never the whole history;
+		# follow `messagesCursor` via messages/list/ or use messages/export/ for the transcript
+		try:
+			before, after, limit = parse_window(request.query_params)
+		except ValueError as exc:
+			return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+		items, has_older, has_newer = message_window(instance.pk, before=before, after=after, limit=limit)
+		serializer = self.get_serializer(instance, context={"request": request, "messages_qs": items})
 		data = serializer.data
-		if page > 0 and page_size > 0:
-			data = {"count": total, "results": data}
+		data["messagesCursor"] = window_cursor(items, has_older, has_newer, before=before, after=after)
 		return Response(data)
 
 
@@ -120,17 +137,7 @@ class ThreadMessageCreateView(generics.CreateAPIView):
 		serializer = self.get_serializer(data=request.data)
 		serializer.is_valid(raise_exception=True)
 		thread = self.get_thread()
-		with transaction.atomic():
-			msg = Message.objects.create(
-				thread=thread,
-				sender=request.user,  # type: ignore[arg-type]
-				text=serializer.validated_data["text"],
-			)
-			# Increment unread count for all other participants
-			others = ThreadParticipant.objects.select_for_update().filter(thread=thread).exclude(user=request.user)
-			for tp in others:
-				tp.unread_count = (tp.unread_count or 0) + 1
-				tp.save(update_fields=["unread_count"])
+		msg = post_message(thread.pk, request.user.pk, serializer.validated_data["text"])
 		out = MessageSerializer(msg, context={"request": request}).data
 		return Response(out, status=status.HTTP_201_CREATED)
 
@@ -176,6 +183,7 @@ class ThreadStartView(generics.CreateAPIView):
 			else:
 				# Ensure ThreadParticipant exists for current user
 				ThreadParticipant.objects.get_or_create(thread=thread, user=request.user)
+		thread = inbox_threads(request.user).get(pk=thread.pk)
 		serializer = self.get_serializer(thread, context={"request": request, "messages_qs": Message.objects.none()})
 		return Response(serializer.data, status=status.HTTP_201_CREATED)
 
@@ -187,6 +195,9 @@ class ThreadMessagesListView(generics.GenericAPIView):
 	def get(self, request, *args, **kwargs):
 		thread = get_object_or_404(MessageThread, pk=self.kwargs.get("pk"))
 		self.check_object_permissions(request, thread)
+		if "page" not in request.query_params:
+			return self.history_window(request, thread)
+		# Legacy page-number mode (OFFSET based); kept for older clients
 		qs = Message.objects.filter(thread=thread).order_by("created_at")
 		try:
 			raw_page = request.query_params.get("page", "1")
@@ -194,7 +205,7 @@ class ThreadMessagesListView(generics.GenericAPIView):
 		except ValueError:
 			raw_page = "1"
 			page_size = 20
-		count = qs.count()
+		count = thread.message_count
 		num_pages = max(1, (count + page_size - 1) // page_size)
 		if raw_page == "last":
 			page = num_pages
@@ -215,3 +226,30 @@ class ThreadMessagesListView(generics.GenericAPIView):
 			"results": data,
 		})
 
+	def history_window(self, request, thread):
+		"""`?before=<id>` / `?after=<id>` / `&limit=` keyset window; newest messages by default."""
+		try:
+			before, after, limit = parse_window(request.query_params)
+		except ValueError as exc:
+			return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+		items, has_older, has_newer = message_window(thread.pk, before=before, after=after, limit=limit)
+		data = MessageSerializer(items, many=True, context={"request": request}).data
+		# Same cursor shape as thread detail's messagesCursor; pass before/after back to keep scrolling
+		return Response({
+			"results": data,
+			"limit": limit,
+			**window_cursor(items, has_older, has_newer, before=before, after=after),
+		})
+
+
+class ThreadTranscriptExportView(generics.GenericAPIView):
+	"""Stream a thread's full history as NDJSON, oldest first, without building it in memory."""
+	permission_classes = [permissions.IsAuthenticated, IsThreadParticipant]
+
+	def get(self, request, *args, **kwargs):
+		thread = get_object_or_404(MessageThread, pk=self.kwargs.get("pk"))
+		self.check_object_permissions(request, thread)
+		response = StreamingHttpResponse(transcript_lines(thread.pk), content_type="application/x-ndjson")
+		response["Content-Disposition"] = f'attachment; filename="thread-{thread.pk}.ndjson"'
+		return response
+
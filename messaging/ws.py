@@ -1,7 +1,8 @@
 from channels.generic.websocket import AsyncJsonWebsocketConsumer
 from channels.db import database_sync_to_async
 from django.contrib.auth.models import AnonymousUser
-from .models import MessageThread, Message, ThreadParticipant
+from .models import MessageThread
+from .services import post_message
 
 
 class ChatConsumer(AsyncJsonWebsocketConsumer):
@@ -55,13 +56,7 @@ class ChatConsumer(AsyncJsonWebsocketConsumer):
 
     @database_sync_to_async
     def _create_message(self, thread_pk: int, user_id: int, text: str):
-        thread = MessageThread.objects.get(pk=thread_pk)
-        msg = Message.objects.create(thread=thread, sender_id=user_id, text=text)
-        # increment unread for others
-        others = ThreadParticipant.objects.filter(thread=thread).exclude(user_id=user_id)
-        for tp in others:
-            tp.unread_count = (tp.unread_count or 0) + 1
-            tp.save(update_fields=["unread_count"])
+        msg = post_message(int(thread_pk), user_id, text)
         return {
             'id': msg.id,
             'thread_id': msg.thread_id,
@@ -0,0 +1,51 @@
+"""Listing rating aggregates maintained from reviews.
+
+`Listing` keeps `rating_sum` and `review_count`; `rating` is their rounded
+average. Review inserts, edits and deletes apply a delta with one UPDATE in the
+same transaction, so `-rating` sorting and `ratingGte` filtering stay plain
+index lookups on live data. `recompute_listing_ratings` rebuilds every listing
+from the Review table in one set-based pass.
+"""
+from decimal import Decimal
+
+from django.db.models import Case, DecimalField, F, FloatField, Value, When
+from django.db.models.functions import Cast, Greatest, Now, Round
+from django.db.models.lookups import GreaterThan
+
+from listings.models import Listing
+from listings.result_cache import bump_for_category_ids
+
+RATING_FIELD = DecimalField(max_digits=3, decimal_places=2)
+
+
+def average_rating(total, count):
+    """SQL expression for round(total / count, 2), or 0 when there are no reviews."""
+    total, count = (F(e) if isinstance(e, str) else e for e in (total, count))
+    return Case(
+        When(
+            GreaterThan(count, 0),
+            # Divide as float (SQLite would truncate numeric/int), round as numeric (Postgres
+            # has no round(double, int))
+            then=Round(Cast(Cast(total, FloatField()) / count, DecimalField(max_digits=20, decimal_places=10)), 2),
+        ),
+        default=Value(Decimal('0.00')),
+        output_field=RATING_FIELD,
+    )
+
+
+def apply_review_delta(listing_id, stars: int, count: int) -> None:
+    """Add `stars` to the listing's rating sum and `count` to its review count, atomically."""
+    new_sum = F('rating_sum') + stars
+    new_count = F('review_count') + count
+    if stars < 0 or count < 0:
+        # Seeded columns may undercount the Review table; never go below zero
+        new_sum, new_count = Greatest(new_sum, 0), Greatest(new_count, 0)
+    # All SET expressions see the pre-update row, so the average uses the new totals
+    updated = Listing.objects.filter(pk=listing_id).update(
+        rating_sum=new_sum,
+        review_count=new_count,
+        rating=average_rating(new_sum, new_count),
+        updated_at=Now(),
+    )
+    if updated:
+        bump_for_category_ids(Listing.objects.filter(pk=listing_id).values_list('category_id', flat=True))
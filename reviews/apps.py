@@ -1,6 +1,31 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
 
 
 class ReviewsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "reviews"
+
+    def ready(self):  # pragma: no cover
+        from .aggregates import apply_review_delta
+        from .models import Review
+
+        @receiver(pre_save, sender=Review)
+        def _remember_review_rating(sender, instance, raw=False, **kwargs):
+            instance._previous_rating = None
+            if instance.pk and not raw:
+                instance._previous_rating = Review.objects.filter(pk=instance.pk).values_list("rating", flat=True).first()
+
+        @receiver(post_save, sender=Review)
+        def _apply_review_saved(sender, instance, created, raw=False, **kwargs):
+            if raw:
+                return
+            if created:
+                apply_review_delta(instance.listing_id, instance.rating, 1)
+            elif instance._previous_rating is not None and instance._previous_rating != instance.rating:
+                apply_review_delta(instance.listing_id, instance.rating - instance._previous_rating, 0)
+
+        @receiver(post_delete, sender=Review)
+        def _apply_review_deleted(sender, instance, **kwargs):
+            apply_review_delta(instance.listing_id, -instance.rating, -1)
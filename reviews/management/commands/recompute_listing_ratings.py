@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Now
+
+from listings.models import Category, Listing
+from listings.result_cache import bump_listing_generations
+from reviews.aggregates import average_rating
+from reviews.models import Review
+
+
+class Command(BaseCommand):
+    help = "Recompute Listing.rating_sum / review_count / rating from the Review table in one set-based pass."
+
+    def handle(self, *args, **options):
+        per_listing = Review.objects.filter(listing=OuterRef('pk')).order_by().values('listing')
+        true_sum = Coalesce(
+            Subquery(per_listing.annotate(total=Sum('rating')).values('total'), output_field=IntegerField()),
+            Value(0),
+        )
+        true_count = Coalesce(
+            Subquery(per_listing.annotate(n=Count('id')).values('n'), output_field=IntegerField()),
+            Value(0),
+        )
+        with transaction.atomic():
+            # Only listings that actually drifted count as changed for the change feed
+            Listing.objects.annotate(true_sum=true_sum, true_count=true_count).exclude(
+                rating_sum=F('true_sum'), review_count=F('true_count'),
+            ).update(updated_at=Now())
+            Listing.objects.update(rating_sum=true_sum, review_count=true_count)
+            # Second statement so the average reads the freshly written totals
+            updated = Listing.objects.update(rating=average_rating('rating_sum', 'review_count'))
+            bump_listing_generations(Category.objects.values_list('slug', flat=True))
+        self.stdout.write(self.style.SUCCESS(f"Recomputed ratings for {updated} listing(s)."))
@@ -1,3 +1,92 @@
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
 from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from listings.models import Category, Listing
+from .models import Review
+
+
+class ListingRatingAggregateTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.category = Category.objects.create(name="Venues", slug="venues")
+        self.listing = Listing.objects.create(title="Hall", category=self.category, image="x", status="published")
+
+    def refresh(self):
+        self.listing.refresh_from_db()
+        return self.listing.rating, self.listing.review_count, self.listing.rating_sum
+
+    def test_post_review_updates_listing(self):
+        resp = self.client.post(
+            reverse("listing-reviews", args=[self.listing.id]),
+            {"name": "Guest", "rating": 4, "text": "Lovely"},
+            format="json",
+        )
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual(self.refresh(), (Decimal("4.00"), 1, 4))
+        listed = self.client.get(reverse("listing-list"), {"ratingGte": "4"}).json()["results"]
+        self.assertEqual([r["id"] for r in listed], [self.listing.id])
+
+    def test_seeded_listing_keeps_its_average_after_a_review(self):
+        seeded = Listing.objects.create(title="Seeded", category=self.category, image="x", status="published", rating=Decimal("4.9"), review_count=210)
+        self.assertEqual(seeded.rating_sum, 1029)
+        resp = self.client.post(
+            reverse("listing-reviews", args=[seeded.id]), {"name": "Guest", "rating": 5, "text": "Great"}, format="json",
+        )
+        self.assertEqual(resp.status_code, 201)
+        seeded.refresh_from_db()
+        self.assertEqual((seeded.rating, seeded.review_count, seeded.rating_sum), (Decimal("4.90"), 211, 1034))
+
+    def test_review_list_conditional_get(self):
+        url = reverse("listing-reviews", args=[self.listing.id])
+        Review.objects.create(listing=self.listing, rating=5, text="a")
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"]).status_code, 304)
+        Review.objects.create(listing=self.listing, rating=4, text="b")
+        again = self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(again.status_code, 200)
+        self.assertNotEqual(again["ETag"], first["ETag"])
+        # Edits keep the count and max id but still change the validator
+        Review.objects.filter(text="b").update(rating=1, text="edited")
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=again["ETag"]).status_code, 200)
+
+    def test_review_list_validator_covers_only_the_served_page(self):
+        url = reverse("listing-reviews", args=[self.listing.id])
+        oldest = Review.objects.create(listing=self.listing, rating=5, text="old")
+        for i in range(10):
+            Review.objects.create(listing=self.listing, rating=4, text=f"r{i}")
+        first = self.client.get(url)
+        self.assertEqual(len(first.data["results"]), 10)
+        # The oldest review sits on page 2: editing it leaves page 1 valid
+        Review.objects.filter(pk=oldest.pk).update(text="edited")
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"]).status_code, 304)
+        second = self.client.get(url, {"page": 2})
+        self.assertEqual(second.data["results"][0]["text"], "edited")
+        # Removing it changes the count page 1 reports
+        oldest.delete()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"]).status_code, 200)
+
+    def test_edit_and_delete_apply_deltas(self):
+        a = Review.objects.create(listing=self.listing, rating=5, text="a")
+        Review.objects.create(listing=self.listing, rating=4, text="b")
+        Review.objects.create(listing=self.listing, rating=4, text="c")
+        self.assertEqual(self.refresh(), (Decimal("4.33"), 3, 13))
+        a.rating = 2
+        a.save()
+        self.assertEqual(self.refresh(), (Decimal("3.33"), 3, 10))
+        a.delete()
+        self.assertEqual(self.refresh(), (Decimal("4.00"), 2, 8))
 
-# Create your tests here.
+    def test_recompute_command_resyncs_from_reviews(self):
+        Review.objects.create(listing=self.listing, rating=3, text="a")
+        other = Listing.objects.create(title="Seeded", category=self.category, image="x", rating=4.9, review_count=120)
+        Listing.objects.filter(pk=self.listing.pk).update(rating=1, review_count=9, rating_sum=9)
+        call_command("recompute_listing_ratings", stdout=StringIO())
+        self.assertEqual(self.refresh(), (Decimal("3.00"), 1, 3))
+        other.refresh_from_db()
+        self.assertEqual((other.rating, other.review_count, other.rating_sum), (Decimal("0.00"), 0, 0))
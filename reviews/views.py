@@ -3,7 +3,9 @@ from django.db.models import QuerySet
 from rest_framework import generics, status, serializers as drf_serializers
 from rest_framework.response import Response
 from rest_framework.throttling import AnonRateThrottle
+from core.conditional import ConditionalGetMixin, rows_digest
 from core.throttling import UserReviewThrottle
+from django.db import transaction
 from django.shortcuts import get_object_or_404
 
 from listings.models import Listing
@@ -15,10 +17,29 @@ class GuestReviewThrottle(AnonRateThrottle):
     scope = "guest_reviews"
 
 
-class ListingReviewListCreateView(generics.ListCreateAPIView):
+class ListingReviewListCreateView(ConditionalGetMixin, generics.ListCreateAPIView):
     throttle_classes = [GuestReviewThrottle, UserReviewThrottle]
     serializer_class = ReviewSerializer
     queryset = Review.objects.all()
+    conditional_per_user = False
+    # Stable page slices for both the listing and its validator
+    ordering = ("-created_at", "-id")
+
+    def get_etag_basis(self, request, *args, **kwargs):
+        # Reviews have no updated_at and userName comes from the joined user, so digest the
+        # rendered columns, but only of the page being served; the count covers the rest
+        try:
+            page = int(request.query_params.get(self.paginator.page_query_param, 1))
+        except ValueError:
+            return None  # "last" or garbage: let the paginator answer it
+        if page < 1:
+            return None
+        size = self.paginator.get_page_size(request)
+        reviews = Review.objects.filter(listing_id=kwargs.get("listing_id")).order_by(*self.ordering)
+        return [
+            reviews.count(),
+            rows_digest(reviews[(page - 1) * size:page * size], "id", "rating", "text", "user_name", "user__username", "created_at"),
+        ]
 
     def get_serializer_class(self) -> Type[drf_serializers.Serializer]:
         if self.request and self.request.method == "POST":
@@ -27,20 +48,22 @@ class ListingReviewListCreateView(generics.ListCreateAPIView):
 
     def get_queryset(self) -> QuerySet[Review]:
         listing = get_object_or_404(Listing, pk=self.kwargs.get("listing_id"))
-        return Review.objects.filter(listing=listing).order_by("-created_at")
+        return Review.objects.filter(listing=listing).order_by(*self.ordering)
 
     def create(self, request, *args, **kwargs):
         listing = get_object_or_404(Listing, pk=kwargs.get("listing_id"))
         ser = ReviewCreateSerializer(data=request.data)
         ser.is_valid(raise_exception=True)
         data: Dict[str, Any] = ser.validated_data  # type: ignore[assignment]
-        review = Review.objects.create(
-            listing=listing,
-            user=request.user if request.user and request.user.is_authenticated else None,
-            user_name=data.get("name", "").strip(),
-            rating=data["rating"],
-            text=data["text"],
-        )
+        # Listing rating/review_count are updated by the Review post_save handler in this transaction
+        with transaction.atomic():
+            review = Review.objects.create(
+                listing=listing,
+                user=request.user if request.user and request.user.is_authenticated else None,
+                user_name=data.get("name", "").strip(),
+                rating=data["rating"],
+                text=data["text"],
+            )
         out = ReviewSerializer(review)
         headers = self.get_success_headers(out.data)
         return Response(out.data, status=status.HTTP_201_CREATED, headers=headers)
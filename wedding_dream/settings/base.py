@@ -188,17 +188,36 @@ MEDIA_STORAGE_BACKEND = env.str('MEDIA_STORAGE_BACKEND', default='local')  # typ
 # Supabase (optional) — used when MEDIA_STORAGE_BACKEND=supabase
 # For public buckets, media URL will be constructed as:
 #   {SUPABASE_URL}/storage/v1/object/public/{SUPABASE_BUCKET}/{path}
-# For private buckets you will need to implement signed URL generation.
+# For private buckets (SUPABASE_PRIVATE_BUCKET) URLs are batch-signed and cached by listings.signed_urls.
 SUPABASE_URL = env.str('SUPABASE_URL', default='')  # type: ignore[arg-type]
 SUPABASE_BUCKET = env.str('SUPABASE_BUCKET', default='')  # type: ignore[arg-type]
 SUPABASE_ANON_KEY = env.str('SUPABASE_ANON_KEY', default='')  # type: ignore[arg-type]
 SUPABASE_SERVICE_ROLE_KEY = env.str('SUPABASE_SERVICE_ROLE_KEY', default='')  # type: ignore[arg-type]
 SUPABASE_PRIVATE_BUCKET = env.bool('SUPABASE_PRIVATE_BUCKET', default=False)  # type: ignore[arg-type]
 SUPABASE_SIGNED_URL_TTL = env.int('SUPABASE_SIGNED_URL_TTL', default=3600)  # seconds
+# Cached signatures are dropped this long before expiry; keep it above LISTING_PAGE_CACHE_TTL
+SUPABASE_SIGNED_URL_REFRESH_MARGIN = env.int('SUPABASE_SIGNED_URL_REFRESH_MARGIN', default=900)  # type: ignore[arg-type]
+
+# Storage HTTP client (listings.storage_client): pooled connections per process, and a breaker
+# that fails storage calls fast for COOLDOWN seconds after THRESHOLD consecutive failures
+STORAGE_HTTP_POOL_SIZE = env.int('STORAGE_HTTP_POOL_SIZE', default=10)  # type: ignore[arg-type]
+STORAGE_BREAKER_THRESHOLD = env.int('STORAGE_BREAKER_THRESHOLD', default=5)  # type: ignore[arg-type]
+STORAGE_BREAKER_COOLDOWN = env.int('STORAGE_BREAKER_COOLDOWN', default=30)  # type: ignore[arg-type]
 
 # Image upload constraints
 MAX_UPLOAD_IMAGE_MB = env.int('MAX_UPLOAD_IMAGE_MB', default=5)
 ALLOWED_IMAGE_TYPES = set(filter(None, [t.strip() for t in env.str('ALLOWED_IMAGE_TYPES', default='image/jpeg,image/png,image/webp').split(',')]))
+# Multipart files above this are spooled to disk instead of held in worker memory
+FILE_UPLOAD_MAX_MEMORY_SIZE = env.int('FILE_UPLOAD_MAX_MEMORY_SIZE', default=1024 * 1024)  # type: ignore[arg-type]
+# Resumable upload sessions keep their parts in media storage; abandoned sessions expire after the TTL
+UPLOAD_SESSION_TTL_HOURS = env.int('UPLOAD_SESSION_TTL_HOURS', default=24)  # type: ignore[arg-type]
+# Lifetime (seconds) of direct-to-storage upload targets and their finalize tokens
+DIRECT_UPLOAD_TTL = env.int('DIRECT_UPLOAD_TTL', default=900)  # type: ignore[arg-type]
+
+# Public listing result pages (search + featured); invalidated by generation counters, 0 disables
+LISTING_PAGE_CACHE_TTL = env.int('LISTING_PAGE_CACHE_TTL', default=600)  # type: ignore[arg-type]
+# /listings/changes/ holds back rows modified this recently so late commits are not skipped
+LISTING_CHANGES_SETTLE_SECONDS = env.int('LISTING_CHANGES_SETTLE_SECONDS', default=2)  # type: ignore[arg-type]
 
 LANGUAGE_CODE = "en-us"
 TIME_ZONE = "UTC"
@@ -221,4 +240,8 @@ CELERY_BEAT_SCHEDULE = {
         "task": "core.tasks.cleanup_temp_files",
         "schedule": crontab(minute=0),  # every hour
     },
+    "purge-stale-upload-sessions-hourly": {
+        "task": "listings.tasks.purge_stale_upload_sessions",
+        "schedule": crontab(minute=30),
+    },
 }
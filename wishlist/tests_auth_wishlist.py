@@ -70,3 +70,14 @@ class AuthWishlistTests(TestCase):
         self.assertEqual(res.status_code, 401)
         res = self.client.post("/api/v1/wishlist", {"listing_id": self.listing.id}, format="json")
         self.assertEqual(res.status_code, 401)
+
+    def test_wishlist_etag_follows_listing_title(self):
+        self.auth_user()
+        self.client.post("/api/v1/wishlist", {"listing_id": self.listing.id}, format="json")
+        etag = self.client.get("/api/v1/wishlist")["ETag"]
+        self.assertEqual(self.client.get("/api/v1/wishlist", HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.listing.title = "Renamed Venue"
+        self.listing.save()
+        res = self.client.get("/api/v1/wishlist", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json()[0]["listing_title"], "Renamed Venue")
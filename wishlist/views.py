@@ -2,18 +2,24 @@ from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
 from listings.models import Listing
+from core.conditional import ConditionalGetMixin, rows_digest
 from core.throttling import WishlistModifyThrottle
 from .models import WishlistItem
 from .serializers import WishlistItemSerializer
 
 
-class WishlistListCreateView(generics.GenericAPIView):
+class WishlistListCreateView(ConditionalGetMixin, generics.ListCreateAPIView):
 	permission_classes = [permissions.IsAuthenticated]
 	throttle_classes = [WishlistModifyThrottle]
+	serializer_class = WishlistItemSerializer
+	pagination_class = None
 
-	def get(self, request):
-		items = WishlistItem.objects.filter(user=request.user).select_related("listing").order_by("-added_at")
-		return Response(WishlistItemSerializer(items, many=True).data)
+	def get_queryset(self):
+		return WishlistItem.objects.filter(user=self.request.user).select_related("listing").order_by("-added_at")
+
+	def get_etag_basis(self, request, *args, **kwargs):
+		# Exactly what the serializer renders, joined listing title included
+		return rows_digest(self.get_queryset(), "id", "listing_id", "listing__title", "added_at")
 
 	def post(self, request):
 		listing_id = request.data.get("listing_id")